@@ -1,14 +1,46 @@
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Tuple
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
-import httpx
+import asyncio
+import json
 import logging
 import os
-import redis
+import time
 
 # Import DeepSeek LLM generator
 from deepseek_generator import create_deepseek_generator
+from context_packer import TokenCounter, pack_context
+from context_store import ContextStore
+from deadline import Deadline
+from http_clients import PDF_PROCESSOR_TIMEOUT, pdf_processor_client, register_shutdown
+from retrieval_client import RetrievalError, RetrievalTimeout, create_retrieval
+from response_cache import LLM_CACHE_ENABLED, LLMResponseCache
+from semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticAnswerCache
+from sentence_ranker import rank_sentences
+from stream_publisher import StreamPublisher
+from session_retrieval import (
+    SESSION_CANDIDATES,
+    SESSION_RETRIEVAL_ENABLED,
+    is_follow_up,
+    rescore,
+)
+from metrics import (
+    ACTION_SECONDS,
+    ANSWERS_TOTAL,
+    CONTEXT_TOKENS,
+    DEGRADED_ANSWERS_TOTAL,
+    PDF_PROCESSOR_REQUEST_SECONDS,
+    InstrumentedRedis,
+    start_metrics_server,
+)
+from tracing import (
+    SamplingProfiler,
+    finish_profile,
+    should_profile,
+    span,
+    start_trace,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,25 +53,54 @@ USE_LLM = os.getenv("LLM_TYPE", "").lower() == "deepseek_api"
 MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "5"))
 MAX_RELEVANT_SENTENCES = int(os.getenv("MAX_RELEVANT_SENTENCES", "2"))
 CONTEXT_SUMMARY_WORDS = int(os.getenv("CONTEXT_SUMMARY_WORDS", "100"))
+TRACE_TTL_SECONDS = int(os.getenv("TRACE_TTL_SECONDS", "300"))
+# Partial answers are published here while the LLM streams (see web-ui /api/chat/stream)
+CHAT_STREAM_CHANNEL = "chat-stream:{}"
 
 # Initialize Redis client
 try:
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    redis_client = InstrumentedRedis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
     logger.info("Redis client initialized")
 except Exception as e:
     logger.error(f"Failed to initialize Redis: {e}")
     redis_client = None
 
+# Semantic answer cache for repeated and paraphrased questions
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED and redis_client is not None:
+    semantic_cache = SemanticAnswerCache(redis_client)
+
+# Question embedding and search, in-process or through the pdf-processor API (RETRIEVAL_MODE)
+retrieval = create_retrieval(redis_client)
+
+# Retrieval context lives in Redis; the tracker slot only holds a reference to it
+context_store = ContextStore(redis_client) if redis_client is not None else None
+
+# Full searches keep their candidate chunks with the context, re-scored for short follow-ups
+session_retrieval = SESSION_RETRIEVAL_ENABLED and context_store is not None
+
+# Tokenizer used to fit retrieved context into the prompt budget
+token_counter = TokenCounter()
+
 # Initialize DeepSeek LLM generator if enabled
 deepseek_generator = None
 if USE_LLM:
     try:
-        deepseek_generator = create_deepseek_generator()
+        response_cache = None
+        if LLM_CACHE_ENABLED and redis_client is not None:
+            response_cache = LLMResponseCache(redis_client)
+        deepseek_generator = create_deepseek_generator(response_cache, token_counter)
         logger.info("DeepSeek LLM generator initialized")
     except Exception as e:
         logger.error(f"Failed to initialize DeepSeek generator: {e}")
         deepseek_generator = None
 
+# Expose Prometheus metrics on a side port
+start_metrics_server()
+
+# Close the shared HTTP connection pools when the action server stops
+register_shutdown()
+
 class ActionAnswerQuestion(Action):
     """Custom action to answer questions using RAG"""
     
@@ -50,6 +111,37 @@ class ActionAnswerQuestion(Action):
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
+        # Continue the trace started by the web UI (passed as message metadata)
+        metadata = tracker.latest_message.get("metadata") or {}
+        trace = start_trace(metadata.get("trace_id"))
+        profiler = None
+        if should_profile(metadata.get("profile")):
+            profiler = SamplingProfiler()
+            profiler.start()
+        
+        try:
+            with ACTION_SECONDS.labels(self.name()).time():
+                return await self._answer(dispatcher, tracker)
+        finally:
+            if profiler is not None:
+                finish_profile(profiler, trace, "action-server")
+            await asyncio.to_thread(self.publish_trace, trace)
+    
+    def publish_trace(self, trace) -> None:
+        """Store this turn's spans in Redis so the caller can merge them into its Server-Timing"""
+        trace.add_span("action", trace.elapsed_ms())
+        logger.info(f"trace={trace.trace_id} {trace.server_timing()}")
+        if redis_client is None:
+            return
+        try:
+            redis_client.set(f"trace:{trace.trace_id}", json.dumps(trace.spans), ex=TRACE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Failed to publish trace {trace.trace_id}: {e}")
+    
+    async def _answer(self, dispatcher: CollectingDispatcher, tracker: Tracker) -> List[Dict[Text, Any]]:
+        """Retrieve context for the latest user message and answer it"""
+        # One end-to-end budget (ANSWER_SLO_SECONDS) for search and generation
+        deadline = Deadline()
         try:
             # Get the user's question
             user_message = tracker.latest_message.get('text', '')
@@ -59,75 +151,215 @@ class ActionAnswerQuestion(Action):
                 return []
             
             logger.info(f"Processing question: {user_message}")
+            # "no_cache" in the message metadata forces a fresh answer (results are still cached)
+            metadata = tracker.latest_message.get("metadata") or {}
+            bypass_cache = bool(metadata.get("no_cache"))
             
-            # Check if there are any documents in the knowledge base
-            async with httpx.AsyncClient() as client:
-                # Search for relevant documents
-                search_response = await client.get(
-                    f"http://{PDF_PROCESSOR_HOST}:{PDF_PROCESSOR_PORT}/search",
-                    params={"query": user_message, "max_results": MAX_SEARCH_RESULTS}
-                )
-                
-                if search_response.status_code != 200:
-                    dispatcher.utter_message(text="Sorry, I'm having trouble accessing the knowledge base. Please try again later.")
+            # A short message after an answered question is re-scored against that question's candidates
+            session = None
+            if session_retrieval and is_follow_up(user_message):
+                session = await asyncio.to_thread(self.load_context, tracker)
+                if session is not None and not session.get("candidates"):
+                    session = None
+            # Answer repeated or paraphrased questions from the semantic cache
+            question = None
+            if semantic_cache is not None or session is not None:
+                with span("embed"):
+                    question = await retrieval.embed(user_message, deadline.timeout(PDF_PROCESSOR_TIMEOUT))
+            # Follow-ups depend on the conversation, so they are not answered from (or added to) the shared cache
+            use_semantic_cache = semantic_cache is not None and session is None
+            if use_semantic_cache and question is not None and not bypass_cache:
+                with span("cache_lookup"):
+                    entry = await asyncio.to_thread(
+                        semantic_cache.lookup, question["model"], question["embedding"], question["generation"]
+                    )
+                if entry is not None:
+                    logger.info(f"Semantic cache hit ({entry['similarity']:.3f}): {entry['question']}")
+                    ANSWERS_TOTAL.labels("cache").inc()
+                    dispatcher.utter_message(text=f"{entry['answer']}\n\n📚 Sources: {', '.join(entry['sources'])}")
+                    return await self.remember_context(user_message, entry["chunk_ids"], entry["context"],
+                                                       entry["sources"])
+            
+            # Re-score the previous turn's candidates before searching the whole corpus
+            results = None
+            question_embedding = None
+            follow_up = None
+            if session is not None and question is not None:
+                with span("session_rescore"):
+                    results = rescore(session, question["embedding"], question["generation"], MAX_SEARCH_RESULTS)
+                question_embedding = question["embedding"]
+                if results is not None:
+                    # Later follow-ups keep re-scoring the set of the question they follow
+                    follow_up = {key: session[key] for key in ("candidates", "anchor", "generation")}
+            
+            if results is None:
+                # Search for relevant documents (retrieving a wider set to keep for follow-ups)
+                try:
+                    with span("search"):
+                        search_data = await retrieval.search(
+                            user_message,
+                            max(SESSION_CANDIDATES, MAX_SEARCH_RESULTS) if session_retrieval else MAX_SEARCH_RESULTS,
+                            include_sentences=True,
+                            include_embeddings=session_retrieval,
+                            timeout=deadline.timeout(PDF_PROCESSOR_TIMEOUT)
+                        )
+                except RetrievalTimeout:
+                    DEGRADED_ANSWERS_TOTAL.labels("search_timeout").inc()
+                    dispatcher.utter_message(text="Sorry, searching the knowledge base is taking too long right now. Please try again in a moment.")
                     return []
-                
-                search_data = search_response.json()
-                results = search_data.get("results", [])
-                
-                if not results:
-                    dispatcher.utter_message(text="I couldn't find any relevant information in the uploaded documents. Please make sure you have uploaded PDFs that might contain the answer to your question.")
+                except RetrievalError as e:
+                    logger.error(f"Search failed: {e}")
+                    dispatcher.utter_message(text="Sorry, I'm having trouble accessing the knowledge base. Please try again later.")
                     return []
                 
-                # Extract relevant context
-                context_parts = []
-                sources = set()
-                
-                for result in results:
-                    context_parts.append(result["content"])
-                    filename = result["metadata"].get("filename", "Unknown")
-                    sources.add(filename)
-                
-                context = " ".join(context_parts)
-                
-                # Generate answer using DeepSeek LLM or fallback
-                if USE_LLM and deepseek_generator:
-                    answer = await self.generate_llm_answer(user_message, context)
+                found = search_data.get("results", [])
+                question_embedding = search_data.get("query_embedding")
+                if session_retrieval and found and question_embedding is not None:
+                    follow_up = {
+                        "candidates": found,
+                        "anchor": question_embedding,
+                        "generation": search_data.get("generation")
+                    }
+                results = found[:MAX_SEARCH_RESULTS]
+            
+            if not results:
+                dispatcher.utter_message(text="I couldn't find any relevant information in the uploaded documents. Please make sure you have uploaded PDFs that might contain the answer to your question.")
+                return []
+            
+            # Pack the most relevant sentences into the context token budget
+            with span("pack_context"):
+                packed = pack_context(results, token_counter)
+            CONTEXT_TOKENS.observe(packed.tokens)
+            context = packed.text
+            results = packed.results
+            if not results:
+                dispatcher.utter_message(text="I couldn't find any relevant information in the uploaded documents. Please make sure you have uploaded PDFs that might contain the answer to your question.")
+                return []
+            sources = set()
+            
+            for result in results:
+                filename = result["metadata"].get("filename", "Unknown")
+                sources.add(filename)
+            
+            # Generate answer using DeepSeek LLM or fallback
+            with span("generate"):
+                if USE_LLM and deepseek_generator and deadline.allows_llm_call():
+                    answer, answer_source = await self.generate_llm_answer(
+                        user_message, context, metadata.get("stream_id"), bypass_cache, deadline
+                    )
                 else:
-                    answer = self.generate_simple_answer(user_message, context)
-                
-                # Format response with sources
-                source_list = ", ".join(sources)
-                response = f"{answer}\n\n📚 Sources: {source_list}"
-                
-                dispatcher.utter_message(text=response)
-                
-                # Store context in slot for potential follow-up questions
-                return [SlotSet("context", context)]
-                
+                    if USE_LLM and deepseek_generator:
+                        # Search used up the budget: answer extractively rather than late
+                        logger.warning(f"{deadline.remaining():.2f}s left of the answer deadline, skipping the LLM")
+                        DEGRADED_ANSWERS_TOTAL.labels("budget").inc()
+                    answer = self.generate_simple_answer(user_message, context, results, question_embedding)
+                    answer_source = "extractive"
+                    ANSWERS_TOTAL.labels("extractive").inc()
+                if answer_source == "fallback":
+                    # LLM unavailable: rank the indexed sentences instead of the generic fallback
+                    answer = self.generate_simple_answer(user_message, context, results, question_embedding)
+            
+            # Format response with sources
+            source_list = ", ".join(sources)
+            response = f"{answer}\n\n📚 Sources: {source_list}"
+            
+            dispatcher.utter_message(text=response)
+            chunk_ids = [result.get("id") for result in results]
+            
+            # Fallback answers (LLM unavailable) are not cached so the LLM is retried next time
+            if use_semantic_cache and question is not None and answer_source != "fallback":
+                await asyncio.to_thread(
+                    semantic_cache.store, question["model"], question["embedding"], question["generation"],
+                    user_message, answer, sorted(sources), chunk_ids, context
+                )
+            
+            # Keep a reference to the context (and candidates) for potential follow-up questions
+            return await self.remember_context(user_message, chunk_ids, context, sorted(sources), follow_up)
+            
         except Exception as e:
             logger.error(f"Error in ActionAnswerQuestion: {e}")
             dispatcher.utter_message(text="Sorry, I encountered an error while processing your question. Please try again.")
             return []
     
-    async def generate_llm_answer(self, question: str, context: str) -> str:
-        """Generate answer using DeepSeek LLM"""
+    async def remember_context(self, question: str, chunk_ids: List[str], context: str,
+                               sources: List[str], follow_up: Dict[Text, Any] = None) -> List[Dict[Text, Any]]:
+        """
+        Store the turn's retrieval context and reference it from the tracker
+
+        Args:
+            question: User's question
+            chunk_ids: IDs of the chunks the context was packed from
+            context: Packed context text
+            sources: Source file names
+            follow_up: candidates, anchor and generation of the full search, kept
+                to re-score follow-ups (see ContextStore.save)
+
+        Returns:
+            Events setting the context_ref slot (none if Redis is unavailable)
+        """
+        if context_store is None:
+            return []
+        ref = await asyncio.to_thread(context_store.save, question, chunk_ids, context, sources, **(follow_up or {}))
+        return [SlotSet("context_ref", ref)] if ref else []
+    
+    @staticmethod
+    def load_context(tracker: Tracker) -> Dict[Text, Any]:
+        """
+        Resolve the context of the previous answer, if it is still stored
+        
+        Returns:
+            Dict with question, chunk_ids, context and sources (and the
+            candidates of a full search), or None
+        """
+        if context_store is None:
+            return None
+        return context_store.load(tracker.get_slot("context_ref"))
+    
+    async def generate_llm_answer(self, question: str, context: str, stream_id: str = None,
+                                  bypass_cache: bool = False, deadline: Deadline = None) -> Tuple[str, str]:
+        """
+        Generate answer using DeepSeek LLM; returns (answer, source)
+        
+        When the caller passed a stream_id, tokens are published to Redis as
+        they arrive (off the event loop, see stream_publisher.py) so it can
+        show the answer before the turn completes. The complete answer is
+        still returned to Rasa as usual.
+        """
         try:
             logger.info("Generating answer using DeepSeek LLM")
-            answer = await deepseek_generator.generate_answer(question, context)
-            return answer
+            if stream_id and redis_client is not None:
+                publisher = StreamPublisher(redis_client, CHAT_STREAM_CHANNEL.format(stream_id))
+                try:
+                    return await deepseek_generator.stream_answer(
+                        question, context, publisher.publish, bypass_cache=bypass_cache, deadline=deadline
+                    )
+                finally:
+                    # Every token reaches the channel before the action returns
+                    await publisher.close()
+            return await deepseek_generator.generate_answer_with_source(
+                question, context, bypass_cache=bypass_cache, deadline=deadline
+            )
         except Exception as e:
             logger.error(f"Error generating LLM answer: {e}")
             # Fallback to simple generation
-            return self.generate_simple_answer(question, context)
+            return self.generate_simple_answer(question, context), "fallback"
     
-    def generate_simple_answer(self, question: str, context: str) -> str:
+    def generate_simple_answer(self, question: str, context: str,
+                               results: List[Dict[Text, Any]] = None,
+                               question_embedding: List[float] = None) -> str:
         """
         Generate an answer based on the question and context
-        This is a simple implementation - in production, you might want to use
-        a language model like GPT or a local LLM for better answer generation
+        With search results, sentences are ranked from the precomputed sentence
+        index (BM25 plus embedding similarity); otherwise keyword overlap with
+        the raw context is used
         """
         try:
+            if results:
+                with span("extractive"):
+                    best = rank_sentences(question, results, MAX_RELEVANT_SENTENCES, question_embedding)
+                if best:
+                    return f"Based on the uploaded documents: {' '.join(best)}"
+            
             # Simple keyword-based answer generation
             # This is a basic implementation - you can enhance this with LLMs
             
@@ -227,38 +459,42 @@ class ActionListPdfs(Action):
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"http://{PDF_PROCESSOR_HOST}:{PDF_PROCESSOR_PORT}/documents")
-                
-                if response.status_code != 200:
-                    dispatcher.utter_message(text="Sorry, I couldn't retrieve the document list. Please try again later.")
-                    return []
-                
-                data = response.json()
-                documents = data.get("documents", [])
-                
-                if not documents:
-                    dispatcher.utter_message(text="No documents have been uploaded yet. Upload some PDFs to get started!")
-                    return []
+            client = pdf_processor_client()
+            start = time.perf_counter()
+            response = await client.get("/documents")
+            PDF_PROCESSOR_REQUEST_SECONDS.labels("documents", str(response.status_code)).observe(
+                time.perf_counter() - start
+            )
+            
+            if response.status_code != 200:
+                dispatcher.utter_message(text="Sorry, I couldn't retrieve the document list. Please try again later.")
+                return []
+            
+            data = response.json()
+            documents = data.get("documents", [])
+            
+            if not documents:
+                dispatcher.utter_message(text="No documents have been uploaded yet. Upload some PDFs to get started!")
+                return []
+            
+            # Format document list
+            doc_list = "📚 **Uploaded Documents:**\n\n"
+            for doc in documents:
+                status = doc.get("status", "unknown")
+                filename = doc.get("filename", "Unknown")
+                chunks = doc.get("chunks_count", 0)
                 
-                # Format document list
-                doc_list = "📚 **Uploaded Documents:**\n\n"
-                for doc in documents:
-                    status = doc.get("status", "unknown")
-                    filename = doc.get("filename", "Unknown")
-                    chunks = doc.get("chunks_count", 0)
-                    
-                    status_emoji = "✅" if status == "completed" else "⏳" if status == "processing" else "❌"
-                    doc_list += f"{status_emoji} **{filename}** ({status})"
-                    
-                    if status == "completed" and chunks:
-                        doc_list += f" - {chunks} chunks"
-                    
-                    doc_list += "\n"
+                status_emoji = "✅" if status == "completed" else "⏳" if status == "processing" else "❌"
+                doc_list += f"{status_emoji} **{filename}** ({status})"
                 
-                dispatcher.utter_message(text=doc_list)
-                return []
+                if status == "completed" and chunks:
+                    doc_list += f" - {chunks} chunks"
                 
+                doc_list += "\n"
+            
+            dispatcher.utter_message(text=doc_list)
+            return []
+            
         except Exception as e:
             logger.error(f"Error in ActionListPdfs: {e}")
             dispatcher.utter_message(text="Sorry, I encountered an error while retrieving the document list.")
@@ -276,16 +512,22 @@ class ActionClearKnowledgeBase(Action):
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(f"http://{PDF_PROCESSOR_HOST}:{PDF_PROCESSOR_PORT}/documents")
-                
-                if response.status_code == 200:
-                    dispatcher.utter_message(text="✅ All documents have been cleared from the knowledge base!")
-                else:
-                    dispatcher.utter_message(text="❌ Failed to clear the knowledge base. Please try again later.")
-                
-                return []
-                
+            client = pdf_processor_client()
+            start = time.perf_counter()
+            response = await client.delete("/documents")
+            PDF_PROCESSOR_REQUEST_SECONDS.labels("clear", str(response.status_code)).observe(
+                time.perf_counter() - start
+            )
+            
+            if response.status_code == 200:
+                dispatcher.utter_message(text="✅ All documents have been cleared from the knowledge base!")
+                # The previous answer's context refers to deleted chunks
+                return [SlotSet("context_ref", None)]
+            else:
+                dispatcher.utter_message(text="❌ Failed to clear the knowledge base. Please try again later.")
+            
+            return []
+            
         except Exception as e:
             logger.error(f"Error in ActionClearKnowledgeBase: {e}")
             dispatcher.utter_message(text="Sorry, I encountered an error while clearing the knowledge base.")
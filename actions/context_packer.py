@@ -0,0 +1,155 @@
+"""
+Token-budgeted context packing
+Builds the LLM context from search results: chunks are taken in relevance
+order, split into sentences, and packed until a token budget is reached.
+Sentences already present in the context verbatim (the CHUNK_OVERLAP spans
+shared by neighbouring chunks) are skipped, and chunks are cut at sentence
+boundaries rather than mid-word. Sentences are split like the sentence
+index (shared/sentences.py): single line breaks do not end a sentence, so
+table rows and short facts ("Sugar 12g") stay with their text.
+"""
+
+import logging
+import math
+import os
+import re
+from typing import Any, Dict, List, NamedTuple
+
+from sentences import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Token budget for retrieved context in the prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# tokenizer.json path (or Hugging Face repo id) of the LLM's tokenizer
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "")
+WORD_OR_SYMBOL = re.compile(r"\w+|[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+
+
+class TokenCounter:
+    """Counts tokens with the LLM's tokenizer, or approximates BPE counts without it"""
+
+    def __init__(self, tokenizer: str = None):
+        """
+        Initialize token counter
+
+        Args:
+            tokenizer: Path to a tokenizer.json or a Hugging Face repo id;
+                empty to use the approximation
+        """
+        self.tokenizer = None
+        name = tokenizer if tokenizer is not None else CONTEXT_TOKENIZER
+        if not name:
+            return
+        try:
+            from tokenizers import Tokenizer
+            if os.path.exists(name):
+                self.tokenizer = Tokenizer.from_file(name)
+            else:
+                self.tokenizer = Tokenizer.from_pretrained(name)
+            logger.info(f"Counting context tokens with tokenizer {name}")
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {name} ({e}); approximating token counts")
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        # BPE vocabularies average roughly four characters per word piece
+        return sum(math.ceil(len(piece) / 4) for piece in WORD_OR_SYMBOL.findall(text))
+
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int
+    results: List[Dict[str, Any]]  # search results that contributed text, in relevance order
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _truncate_words(text: str, counter: TokenCounter, budget: int) -> str:
+    """Longest prefix of whole words that fits the budget"""
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if counter.count(" ".join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def pack_context(results: List[Dict[str, Any]], counter: TokenCounter,
+                 budget: int = None) -> PackedContext:
+    """
+    Pack search results into a context that fits a token budget
+
+    Args:
+        results: Search results with "content" and optional "similarity"
+        counter: Token counter for the target LLM
+        budget: Maximum context tokens (defaults to CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        PackedContext with the context text, its token count and the
+        results it was built from
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    ranked = sorted(results, key=lambda result: result.get("similarity", 0.0), reverse=True)
+
+    passages = []
+    used = []
+    seen = set()   # normalized sentences packed so far, for overlap detection
+    tokens = 0
+    separator_tokens = counter.count("\n\n")
+
+    for result in ranked:
+        if tokens >= budget:
+            break
+        kept = []
+        for sentence in split_sentences(result.get("content", "")):
+            key = _normalize(sentence)
+            # Overlap spans reappear verbatim in neighbouring chunks; only exact repeats are dropped
+            if key in seen:
+                continue
+            cost = counter.count(sentence) + (separator_tokens if not kept and passages else 0)
+            if tokens + cost > budget:
+                if not passages and not kept:
+                    # A single sentence longer than the budget: cut it at a word boundary
+                    truncated = _truncate_words(sentence, counter, budget)
+                    if truncated:
+                        kept.append(truncated)
+                        tokens = counter.count(truncated)
+                # Trim the chunk at the last sentence that fits
+                break
+            kept.append(sentence)
+            seen.add(key)
+            tokens += cost
+        if kept:
+            passages.append(" ".join(kept))
+            used.append(result)
+
+    return PackedContext("\n\n".join(passages), tokens, used)
+
+
+def fit_to_budget(text: str, counter: TokenCounter, budget: int = None) -> str:
+    """
+    Trim already-packed context to a token budget at a sentence boundary
+
+    Args:
+        text: Context text
+        counter: Token counter for the target LLM
+        budget: Maximum context tokens (defaults to CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        The text unchanged if it fits, otherwise its leading sentences that do
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    if counter.count(text) <= budget:
+        return text
+    return pack_context([{"content": text}], counter, budget).text
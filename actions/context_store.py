@@ -0,0 +1,105 @@
+"""
+Retrieval context by reference
+The retrieved chunk IDs and packed context of a turn are kept in Redis under a
+short key with a TTL, and only that key is stored in the tracker slot. Rasa
+serializes the tracker for every action call, so keeping the context text out
+of its events keeps long conversations cheap. A full search also stores its
+wider candidate set with the question embedding, so a follow-up question
+resolves the reference and is re-scored against those candidates
+(session_retrieval.py) instead of searching the whole corpus again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_REF_TTL_SECONDS = int(os.getenv("CONTEXT_REF_TTL_SECONDS", "3600"))
+CONTEXT_KEY = "rag-context:{}"
+
+
+class ContextStore:
+    """Stores a turn's retrieval context in Redis and hands out a reference to it"""
+
+    def __init__(self, redis_client, ttl_seconds: int = None):
+        """
+        Initialize context store
+
+        Args:
+            redis_client: Synchronous Redis client (decode_responses=True)
+            ttl_seconds: How long a context stays resolvable after its last save
+        """
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds or CONTEXT_REF_TTL_SECONDS
+
+    @staticmethod
+    def reference(question: str, chunk_ids: List[str], context: str) -> str:
+        """Short content-derived reference, so the same retrieval maps to the same key"""
+        payload = json.dumps([question, chunk_ids, context], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def save(self, question: str, chunk_ids: List[str], context: str, sources: List[str],
+             candidates: Optional[List[Dict[str, Any]]] = None, anchor: Optional[List[float]] = None,
+             generation: Optional[int] = None) -> Optional[str]:
+        """
+        Store a turn's retrieval context
+
+        Args:
+            question: Question the context was retrieved for
+            chunk_ids: IDs of the retrieved chunks, in relevance order
+            context: Packed context text
+            sources: Source file names
+            candidates: Search results with "embedding" (base64 float32), kept
+                to re-score follow-ups
+            anchor: Embedding of the question the candidates were retrieved for
+            generation: Knowledge-base generation of the search
+
+        Returns:
+            The reference to put in the tracker slot, or None if Redis failed
+        """
+        ref = self.reference(question, chunk_ids, context)
+        entry = {
+            "question": question,
+            "chunk_ids": chunk_ids,
+            "context": context,
+            "sources": sources,
+            "created": time.time(),
+        }
+        candidates = [candidate for candidate in candidates or [] if candidate.get("embedding")]
+        if candidates and anchor is not None:
+            entry.update(candidates=candidates, anchor=anchor, generation=generation)
+        try:
+            self.redis_client.set(CONTEXT_KEY.format(ref), json.dumps(entry), ex=self.ttl_seconds)
+            return ref
+        except Exception as e:
+            logger.warning(f"Failed to store retrieval context: {e}")
+            return None
+
+    def load(self, ref: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a reference
+
+        Args:
+            ref: Reference from the tracker slot
+
+        Returns:
+            The stored entry (question, chunk_ids, context, sources, created,
+            and candidates, anchor and generation after a full search), or None
+            if the reference is empty, expired or unreadable
+        """
+        if not ref:
+            return None
+        try:
+            key = CONTEXT_KEY.format(ref)
+            raw = self.redis_client.get(key)
+            if raw:
+                # Conversations that keep asking follow-ups keep their context
+                self.redis_client.expire(key, self.ttl_seconds)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Failed to load retrieval context {ref}: {e}")
+            return None
@@ -0,0 +1,55 @@
+"""
+Per-turn deadlines
+Each answer turn gets one end-to-end latency budget (ANSWER_SLO_SECONDS).
+Search and generation derive their timeouts from what is left of it, and the
+turn degrades to an extractive answer rather than overrunning.
+"""
+
+import os
+import time
+from typing import Optional
+
+# End-to-end latency objective for answering one question
+ANSWER_SLO_SECONDS = float(os.getenv("ANSWER_SLO_SECONDS", "20"))
+# Kept back for building and sending the (possibly extractive) answer
+DEADLINE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESERVE_SECONDS", "0.25"))
+# Below this much remaining time an LLM call is not worth starting
+LLM_MIN_BUDGET_SECONDS = float(os.getenv("LLM_MIN_BUDGET_SECONDS", "2.0"))
+
+
+class Deadline:
+    """Absolute deadline for one turn, measured on the monotonic clock"""
+
+    def __init__(self, seconds: float = None):
+        """
+        Start the clock
+
+        Args:
+            seconds: Budget for the turn (defaults to ANSWER_SLO_SECONDS)
+        """
+        self.budget = seconds if seconds is not None else ANSWER_SLO_SECONDS
+        self.expires_at = time.monotonic() + self.budget
+
+    def remaining(self) -> float:
+        """Seconds left before the answer must be sent"""
+        return max(self.expires_at - time.monotonic() - DEADLINE_RESERVE_SECONDS, 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """
+        Timeout for a downstream call
+
+        Args:
+            cap: The call's own timeout, if it has one
+
+        Returns:
+            The smaller of cap and the remaining budget
+        """
+        remaining = self.remaining()
+        return min(cap, remaining) if cap is not None else remaining
+
+    def allows_llm_call(self) -> bool:
+        """Whether enough budget is left to make an LLM call worthwhile"""
+        return self.remaining() >= LLM_MIN_BUDGET_SECONDS
@@ -5,9 +5,36 @@ External API integration using DeepSeek's official API
 
 import httpx
 import asyncio
+import json
 import logging
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from context_packer import TokenCounter, fit_to_budget
+from deadline import LLM_MIN_BUDGET_SECONDS, Deadline
+from http_clients import llm_client
+from llm_control import (
+    FAILED,
+    OK,
+    REJECTED,
+    AdaptiveLimiter,
+    CircuitBreaker,
+    LatencyTracker,
+    SingleFlight,
+    classify_status,
+    parse_retry_after,
+)
+from metrics import (
+    ANSWERS_TOTAL,
+    DEEPSEEK_ANSWER_SECONDS,
+    DEEPSEEK_REQUEST_SECONDS,
+    DEEPSEEK_TOKENS_TOTAL,
+    DEEPSEEK_TTFT_SECONDS,
+    DEGRADED_ANSWERS_TOTAL,
+    LLM_HEDGED_TOTAL,
+)
+from response_cache import LLMResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +47,11 @@ class DeepSeekAPIGenerator:
                  model_name: str = "deepseek-chat",
                  temperature: float = 0.1,
                  max_tokens: int = 500,
-                 timeout: float = 30.0):
+                 timeout: float = 30.0,
+                 client: Optional[httpx.AsyncClient] = None,
+                 response_cache=None,
+                 token_counter: Optional[TokenCounter] = None,
+                 context_token_budget: Optional[int] = None):
         """
         Initialize DeepSeek API generator
         
@@ -31,6 +62,12 @@ class DeepSeekAPIGenerator:
             temperature: Response creativity (0.0-1.0)
             max_tokens: Maximum response length
             timeout: Request timeout in seconds
+            client: HTTP client to use; defaults to the process-wide
+                keep-alive (HTTP/2 when available) LLM client
+            response_cache: Optional LLMResponseCache for identical requests
+            token_counter: Counts context tokens for the prompt budget
+            context_token_budget: Maximum context tokens per prompt
+                (defaults to CONTEXT_TOKEN_BUDGET)
         """
         self.api_key = api_key
         self.base_url = base_url.rstrip('/')
@@ -38,6 +75,18 @@ class DeepSeekAPIGenerator:
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.timeout = timeout
+        self.client = client
+        self.response_cache = response_cache
+        self.token_counter = token_counter or TokenCounter()
+        self.context_token_budget = context_token_budget
+        
+        # Load control shared by every turn handled by this process
+        self.single_flight = SingleFlight()
+        self.limiter = AdaptiveLimiter()
+        self.circuit_breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+        # Streaming calls are hedged on time to first token rather than total latency
+        self.ttft_latency = LatencyTracker()
         
         if not self.api_key or self.api_key == "your_deepseek_api_key_here":
             logger.warning("DeepSeek API key not configured. LLM features will be disabled.")
@@ -46,7 +95,12 @@ class DeepSeekAPIGenerator:
             self.enabled = True
             logger.info(f"Initialized DeepSeek API generator: {model_name} @ {base_url}")
     
-    async def generate_answer(self, question: str, context: str, max_retries: int = 3) -> str:
+    def _client(self) -> httpx.AsyncClient:
+        """HTTP client for API calls; connections are reused across calls and retries"""
+        return self.client or llm_client(self.timeout)
+    
+    async def generate_answer(self, question: str, context: str, max_retries: int = 3,
+                              bypass_cache: bool = False, deadline: Optional[Deadline] = None) -> str:
         """
         Generate intelligent answer using DeepSeek API
         
@@ -54,82 +108,477 @@ class DeepSeekAPIGenerator:
             question: User's question
             context: Retrieved document context
             max_retries: Maximum retry attempts
+            bypass_cache: Always call the API, ignoring cached responses
+            deadline: Turn deadline; attempts, retries and waits stay within it
             
         Returns:
             Generated answer string
         """
         
-        if not self.enabled:
-            return self._fallback_response(question, context)
+        answer, _ = await self.generate_answer_with_source(question, context, max_retries, bypass_cache, deadline)
+        return answer
+    
+    async def generate_answer_with_source(self, question: str, context: str,
+                                          max_retries: int = 3,
+                                          bypass_cache: bool = False,
+                                          deadline: Optional[Deadline] = None) -> Tuple[str, str]:
+        """
+        Generate an answer and report how it was produced
         
-        # Create optimized messages for DeepSeek Chat API
-        messages = self._build_messages(question, context)
+        Args:
+            question: User's question
+            context: Retrieved document context
+            max_retries: Maximum retry attempts
+            bypass_cache: Always call the API, ignoring cached responses
+            deadline: Turn deadline; attempts, retries and waits stay within it
+            
+        Returns:
+            Tuple of (answer, source) where source is "llm" or "fallback"
+        """
+        
+        with DEEPSEEK_ANSWER_SECONDS.time():
+            if not self.enabled:
+                return self._fallback_response(question, context), "fallback"
+            
+            # Create optimized messages for DeepSeek Chat API
+            messages = self._build_messages(question, context)
+            request_key = self._request_key(messages)
+            cached = await asyncio.to_thread(self._cached_response, request_key, bypass_cache)
+            if cached is not None:
+                return cached, "llm"
+            
+            # Identical requests already in flight share one upstream call
+            try:
+                return await self.single_flight.do(
+                    request_key,
+                    lambda: self._generate_answer(question, context, messages, request_key, max_retries, deadline),
+                    timeout=deadline.remaining() if deadline is not None else None
+                )
+            except asyncio.TimeoutError:
+                return self._deadline_fallback(question, context)
+    
+    def _request_key(self, messages) -> str:
+        """Identity of a generation request, for coalescing and the response cache"""
+        return LLMResponseCache.key(messages, self.model_name, self.temperature, self.max_tokens)
+    
+    def _cached_response(self, request_key: str, bypass_cache: bool) -> Optional[str]:
+        """Previously generated answer for an identical request, if any"""
+        if self.response_cache is None or bypass_cache:
+            return None
+        answer = self.response_cache.get(request_key)
+        if answer is not None:
+            ANSWERS_TOTAL.labels("llm_cache").inc()
+        return answer
+    
+    def _cache_response(self, request_key: str, answer: str) -> None:
+        if self.response_cache is not None:
+            self.response_cache.set(request_key, answer)
+    
+    def _deadline_fallback(self, question: str, context: str) -> Tuple[str, str]:
+        logger.warning("Answer deadline reached, using fallback response")
+        DEGRADED_ANSWERS_TOTAL.labels("deadline").inc()
+        return self._fallback_response(question, context), "fallback"
+    
+    async def _begin_attempt(self, deadline: Optional[Deadline]) -> bool:
+        """Wait for a slot from the limiter unless the circuit breaker is open or time is up"""
+        if deadline is not None and not deadline.allows_llm_call():
+            logger.warning("Too little of the answer deadline left for a DeepSeek call")
+            DEGRADED_ANSWERS_TOTAL.labels("deadline").inc()
+            return False
+        if not self.circuit_breaker.allow():
+            logger.warning("DeepSeek API circuit open, skipping call")
+            return False
+        try:
+            wait = deadline.remaining() - LLM_MIN_BUDGET_SECONDS if deadline is not None else None
+            await asyncio.wait_for(self.limiter.acquire(), wait)
+        except asyncio.TimeoutError:
+            logger.warning("No DeepSeek call slot free within the answer deadline")
+            DEGRADED_ANSWERS_TOTAL.labels("deadline").inc()
+            self.circuit_breaker.record(REJECTED)  # release a half-open probe
+            return False
+        return True
+    
+    async def _wait_before_retry(self, attempt: int, retry_after: Optional[float],
+                                 deadline: Optional[Deadline]) -> bool:
+        """Back off before the next attempt; False if that would leave too little time for it"""
+        delay = self.limiter.backoff(attempt, retry_after)
+        if deadline is not None and deadline.remaining() - delay < LLM_MIN_BUDGET_SECONDS:
+            return False
+        await asyncio.sleep(delay)
+        return True
+    
+    def _attempt_timeout(self, deadline: Optional[Deadline]) -> float:
+        return deadline.timeout(self.timeout) if deadline is not None else self.timeout
+    
+    async def _post(self, messages: list, timeout: float) -> httpx.Response:
+        return await self._client().post(
+            f"{self.base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": self.model_name,
+                "messages": messages,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "stream": False,
+                "stop": None
+            },
+            timeout=timeout
+        )
+    
+    async def _hedged(self, send: Callable[[float], Awaitable[httpx.Response]],
+                      delay: Optional[float], timeout: float) -> httpx.Response:
+        """
+        Send a request; if it is slower than the usual tail latency, send a
+        second identical request and use whichever succeeds first
+        
+        Args:
+            send: Starts the request with the given timeout and returns its response
+            delay: Seconds to wait before hedging (None while there is too little data)
+            timeout: Timeout of the original request
+            
+        Returns:
+            The winning response; the losing one is cancelled or closed
+        """
+        first = asyncio.ensure_future(send(timeout))
+        if delay is None or delay >= timeout:
+            return await first
+        
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        # Hedging only uses spare capacity; it must not add load to a struggling API
+        if done or self.circuit_breaker.state != CircuitBreaker.CLOSED or not self.limiter.try_acquire():
+            return await first
+        
+        hedge = asyncio.ensure_future(send(timeout - delay))
+        hedge_outcome = "cancelled"
+        winner = None
+        try:
+            pending = {first, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code == 200:
+                        LLM_HEDGED_TOTAL.labels("hedge" if task is hedge else "original").inc()
+                        if task is hedge:
+                            hedge_outcome = OK
+                        winner = task
+                        for other in pending:
+                            other.cancel()
+                        return task.result()
+            # Neither succeeded: report the original request's result
+            winner = first
+            return first.result()
+        finally:
+            for task in (first, hedge):
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                if not task.cancelled() and task.exception() is None:
+                    # Streamed responses hold their connection until closed
+                    await task.result().aclose()
+            if hedge.done() and not hedge.cancelled():
+                if hedge.exception() is not None:
+                    hedge_outcome = FAILED
+                elif hedge_outcome != OK:
+                    hedge_outcome = classify_status(hedge.result().status_code)
+            await self.limiter.release(hedge_outcome)
+    
+    async def _hedged_post(self, messages: list, timeout: float) -> httpx.Response:
+        """Non-streaming completion, hedged after the usual tail of total latency"""
+        return await self._hedged(lambda t: self._post(messages, t), self.latency.hedge_delay(), timeout)
+    
+    async def _open_stream(self, messages: list, timeout: float) -> httpx.Response:
+        """
+        Start a streaming completion and read it up to the first content token
+        
+        Returns:
+            The response (closed by the caller) with the lines read so far in
+            response.head_lines and the rest of the stream in response.lines
+        """
+        client = self._client()
+        request = client.build_request(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": self.model_name,
+                "messages": messages,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "stream": True,
+                "stream_options": {"include_usage": True}
+            },
+            timeout=timeout
+        )
+        response = await client.send(request, stream=True)
+        response.head_lines, response.lines = [], None
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                return response
+            response.lines = response.aiter_lines()
+            # Breaking out of the loop leaves the iterator open for the caller
+            async for line in response.lines:
+                response.head_lines.append(line)
+                done, delta, _ = self._parse_stream_line(line)
+                if done or delta:
+                    break
+            return response
+        except BaseException:
+            await response.aclose()
+            raise
+    
+    async def _hedged_open_stream(self, messages: list, timeout: float) -> httpx.Response:
+        """Streaming completion, hedged after the usual tail of time to first token"""
+        return await self._hedged(lambda t: self._open_stream(messages, t), self.ttft_latency.hedge_delay(), timeout)
+    
+    @staticmethod
+    def _parse_stream_line(line: str) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+        """Parse one SSE line of a streamed completion into (done, content delta, chunk)"""
+        if not line.startswith("data:"):
+            return False, None, None
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return True, None, None
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+        return False, delta, chunk
+    
+    async def _end_attempt(self, outcome: str, retry_after: Optional[float]) -> None:
+        await self.limiter.release(outcome, retry_after)
+        self.circuit_breaker.record(outcome)
+    
+    async def _generate_answer(self, question: str, context: str, messages: list,
+                               request_key: str, max_retries: int,
+                               deadline: Optional[Deadline] = None) -> Tuple[str, str]:
+        """Call the API with retries, falling back to an extractive answer"""
         
         for attempt in range(max_retries):
+            if not await self._begin_attempt(deadline):
+                break
+            start = time.perf_counter()
+            status = "error"
+            outcome = FAILED
+            retry_after = None
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": self.model_name,
-                            "messages": messages,
-                            "temperature": self.temperature,
-                            "max_tokens": self.max_tokens,
-                            "stream": False,
-                            "stop": None
-                        }
-                    )
+                response = await self._hedged_post(messages, self._attempt_timeout(deadline))
+                status = str(response.status_code)
+                outcome = classify_status(response.status_code)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                
+                if response.status_code == 200:
+                    self.latency.record(time.perf_counter() - start)
+                    result = response.json()
+                    self._record_usage(result)
                     
-                    if response.status_code == 200:
-                        result = response.json()
+                    if "choices" in result and len(result["choices"]) > 0:
+                        generated_text = result["choices"][0]["message"]["content"].strip()
                         
-                        if "choices" in result and len(result["choices"]) > 0:
-                            generated_text = result["choices"][0]["message"]["content"].strip()
-                            
-                            if generated_text:
-                                return self._clean_response(generated_text)
-                            else:
-                                logger.warning(f"Empty response from DeepSeek API (attempt {attempt + 1})")
+                        if generated_text:
+                            ANSWERS_TOTAL.labels("llm").inc()
+                            answer = self._clean_response(generated_text)
+                            await asyncio.to_thread(self._cache_response, request_key, answer)
+                            return answer, "llm"
                         else:
-                            logger.error(f"Invalid response format from DeepSeek API (attempt {attempt + 1})")
+                            logger.warning(f"Empty response from DeepSeek API (attempt {attempt + 1})")
                     else:
-                        error_msg = f"DeepSeek API error: {response.status_code}"
-                        if response.status_code == 401:
-                            error_msg += " - Invalid API key"
-                        elif response.status_code == 429:
-                            error_msg += " - Rate limit exceeded"
-                        elif response.status_code == 500:
-                            error_msg += " - Server error"
-                        
-                        logger.error(f"{error_msg} (attempt {attempt + 1})")
+                        logger.error(f"Invalid response format from DeepSeek API (attempt {attempt + 1})")
+                else:
+                    self._log_api_error(response.status_code, attempt)
+                    
+                    # If it's an auth error, don't retry
+                    if response.status_code == 401:
+                        break
                         
-                        # If it's an auth error, don't retry
-                        if response.status_code == 401:
-                            break
-                            
+            except asyncio.CancelledError:
+                # Every caller gave up (SingleFlight): free the slot without judging the API
+                status = "cancelled"
+                outcome = REJECTED
+                raise
             except httpx.TimeoutException:
+                status = "timeout"
                 logger.warning(f"DeepSeek API request timeout (attempt {attempt + 1})")
             except Exception as e:
                 logger.error(f"DeepSeek API generation error (attempt {attempt + 1}): {e}")
+            finally:
+                DEEPSEEK_REQUEST_SECONDS.labels(status).observe(time.perf_counter() - start)
+                await self._end_attempt(outcome, retry_after)
             
             if attempt < max_retries - 1:
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                # Honour Retry-After, otherwise exponential backoff with jitter
+                if not await self._wait_before_retry(attempt, retry_after, deadline):
+                    break
         
         # Fallback response
         logger.warning("All DeepSeek API attempts failed, using fallback response")
-        return self._fallback_response(question, context)
+        return self._fallback_response(question, context), "fallback"
+    
+    async def stream_answer(self, question: str, context: str,
+                            on_event: Callable[[Dict[str, Any]], Awaitable[None]],
+                            max_retries: int = 3,
+                            bypass_cache: bool = False,
+                            deadline: Optional[Deadline] = None) -> Tuple[str, str]:
+        """
+        Generate an answer with a streaming completion, relaying tokens as they arrive
+        
+        Args:
+            question: User's question
+            context: Retrieved document context
+            on_event: Awaited with {"type": "delta", "text": ...} for every
+                content token and {"type": "reset"} when a partially streamed
+                attempt failed and is being retried
+            max_retries: Maximum retry attempts
+            bypass_cache: Always call the API, ignoring cached responses
+            deadline: Turn deadline; attempts, retries and waits stay within it
+            
+        Returns:
+            Tuple of (complete answer, source) where source is "llm" or "fallback"
+        """
+        
+        with DEEPSEEK_ANSWER_SECONDS.time():
+            if not self.enabled:
+                return self._fallback_response(question, context), "fallback"
+            
+            messages = self._build_messages(question, context)
+            request_key = self._request_key(messages)
+            cached = await asyncio.to_thread(self._cached_response, request_key, bypass_cache)
+            if cached is not None:
+                # Delivered in one piece; there is nothing to wait for
+                await on_event({"type": "delta", "text": cached})
+                return cached, "llm"
+            
+            # Joining an identical in-flight request: its tokens go to its own caller,
+            # so this one receives the finished answer in one piece
+            leading = not self.single_flight.in_flight(request_key)
+            try:
+                answer, source = await self.single_flight.do(
+                    request_key,
+                    lambda: self._stream_answer(question, context, messages, request_key, on_event,
+                                                max_retries, deadline),
+                    timeout=deadline.remaining() if deadline is not None else None
+                )
+            except asyncio.TimeoutError:
+                if leading:
+                    await on_event({"type": "reset"})
+                return self._deadline_fallback(question, context)
+            if not leading:
+                await on_event({"type": "delta", "text": answer})
+            return answer, source
+    
+    async def _stream_answer(self, question: str, context: str, messages: list, request_key: str,
+                             on_event: Callable[[Dict[str, Any]], Awaitable[None]],
+                             max_retries: int, deadline: Optional[Deadline] = None) -> Tuple[str, str]:
+        """Stream from the API with retries, falling back to an extractive answer"""
+        
+        for attempt in range(max_retries):
+            if not await self._begin_attempt(deadline):
+                break
+            start = time.perf_counter()
+            status = "error"
+            outcome = FAILED
+            retry_after = None
+            parts = []
+            try:
+                # The original request is hedged if no token arrives within the usual tail
+                response = await self._hedged_open_stream(messages, self._attempt_timeout(deadline))
+                try:
+                    status = str(response.status_code)
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    
+                    if response.status_code != 200:
+                        outcome = classify_status(response.status_code)
+                        self._log_api_error(response.status_code, attempt)
+                        if response.status_code == 401:
+                            break
+                    else:
+                        async def consume(line: str) -> bool:
+                            done, delta, chunk = self._parse_stream_line(line)
+                            if chunk is not None:
+                                self._record_usage(chunk)
+                            if delta:
+                                if not parts:
+                                    ttft = time.perf_counter() - start
+                                    DEEPSEEK_TTFT_SECONDS.observe(ttft)
+                                    self.ttft_latency.record(ttft)
+                                parts.append(delta)
+                                await on_event({"type": "delta", "text": delta})
+                            return done
+                        
+                        finished = False
+                        for line in response.head_lines:
+                            finished = await consume(line) or finished
+                        if not finished:
+                            async for line in response.lines:
+                                if await consume(line):
+                                    break
+                        # Only a stream that ran to completion counts as a healthy call
+                        outcome = OK
+                        
+                        generated_text = "".join(parts).strip()
+                        if generated_text:
+                            ANSWERS_TOTAL.labels("llm").inc()
+                            answer = self._clean_response(generated_text)
+                            await asyncio.to_thread(self._cache_response, request_key, answer)
+                            return answer, "llm"
+                        logger.warning(f"Empty streamed response from DeepSeek API (attempt {attempt + 1})")
+                finally:
+                    await response.aclose()
+            
+            except asyncio.CancelledError:
+                # Every caller gave up (SingleFlight): free the slot without judging the API
+                status = "cancelled"
+                outcome = REJECTED
+                raise
+            except httpx.TimeoutException:
+                status = "timeout"
+                logger.warning(f"DeepSeek API stream timeout (attempt {attempt + 1})")
+            except Exception as e:
+                logger.error(f"DeepSeek API streaming error (attempt {attempt + 1}): {e}")
+            finally:
+                DEEPSEEK_REQUEST_SECONDS.labels(status).observe(time.perf_counter() - start)
+                await self._end_attempt(outcome, retry_after)
+            
+            if parts:
+                await on_event({"type": "reset"})
+            if attempt < max_retries - 1:
+                if not await self._wait_before_retry(attempt, retry_after, deadline):
+                    break
+        
+        logger.warning("All DeepSeek API streaming attempts failed, using fallback response")
+        return self._fallback_response(question, context), "fallback"
+    
+    def _log_api_error(self, status_code: int, attempt: int) -> None:
+        error_msg = f"DeepSeek API error: {status_code}"
+        if status_code == 401:
+            error_msg += " - Invalid API key"
+        elif status_code == 429:
+            error_msg += " - Rate limit exceeded"
+        elif status_code == 500:
+            error_msg += " - Server error"
+        
+        logger.error(f"{error_msg} (attempt {attempt + 1})")
+    
+    def _record_usage(self, result: Dict[str, Any]) -> None:
+        """Count prompt and completion tokens reported by the API"""
+        usage = result.get("usage") or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                DEEPSEEK_TOKENS_TOTAL.labels(kind.replace("_tokens", "")).inc(usage[kind])
     
     def _build_messages(self, question: str, context: str) -> list:
         """Build optimized messages for DeepSeek Chat API"""
         
-        # Truncate context if too long (keep within token limits)
-        max_context_length = 2000
-        if len(context) > max_context_length:
-            context = context[:max_context_length] + "..."
+        # Keep within the token budget, cutting at a sentence boundary (callers
+        # normally pass context already packed with pack_context)
+        context = fit_to_budget(context, self.token_counter, self.context_token_budget)
         
         system_message = """You are a helpful AI assistant that answers questions based on provided document context.
 
@@ -180,6 +629,7 @@ Please provide a helpful answer based on the context above."""
         """Generate fallback response when API fails"""
         
         logger.info("Using fallback response generation")
+        ANSWERS_TOTAL.labels("fallback").inc()
         
         # Simple extractive summarization as fallback
         sentences = context.split('.')[:3]  # First 3 sentences
@@ -201,49 +651,50 @@ Please provide a helpful answer based on the context above."""
             }
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout * 0.33) as client:
-                # Test with a simple request
-                test_messages = [
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": "Say 'Hello' if you can hear me."}
-                ]
-                
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model_name,
-                        "messages": test_messages,
-                        "max_tokens": 10,
-                        "temperature": 0
+            client = self._client()
+            # Test with a simple request
+            test_messages = [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": "Say 'Hello' if you can hear me."}
+            ]
+            
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model_name,
+                    "messages": test_messages,
+                    "max_tokens": 10,
+                    "temperature": 0
+                },
+                timeout=self.timeout * 0.33
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                if "choices" in result and len(result["choices"]) > 0:
+                    return {
+                        "status": "healthy",
+                        "message": "API is accessible and responsive",
+                        "api_accessible": True,
+                        "model": self.model_name
                     }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if "choices" in result and len(result["choices"]) > 0:
-                        return {
-                            "status": "healthy",
-                            "message": "API is accessible and responsive",
-                            "api_accessible": True,
-                            "model": self.model_name
-                        }
-                    else:
-                        return {
-                            "status": "error",
-                            "message": "Invalid response format",
-                            "api_accessible": True
-                        }
                 else:
                     return {
                         "status": "error",
-                        "message": f"API returned status {response.status_code}",
-                        "api_accessible": False
+                        "message": "Invalid response format",
+                        "api_accessible": True
                     }
-                    
+            else:
+                return {
+                    "status": "error",
+                    "message": f"API returned status {response.status_code}",
+                    "api_accessible": False
+                }
+                
         except Exception as e:
             return {
                 "status": "error",
@@ -252,8 +703,14 @@ Please provide a helpful answer based on the context above."""
             }
 
 # Factory function for easy initialization
-def create_deepseek_generator() -> DeepSeekAPIGenerator:
-    """Create DeepSeek API generator with environment configuration"""
+def create_deepseek_generator(response_cache=None, token_counter=None) -> DeepSeekAPIGenerator:
+    """
+    Create DeepSeek API generator with environment configuration
+    
+    Args:
+        response_cache: Optional LLMResponseCache shared by all turns
+        token_counter: Optional TokenCounter shared with the context packer
+    """
     
     api_key = os.getenv("DEEPSEEK_API_KEY", "")
     
@@ -266,5 +723,7 @@ def create_deepseek_generator() -> DeepSeekAPIGenerator:
         model_name=os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
         temperature=float(os.getenv("LLM_TEMPERATURE", "0.1")),
         max_tokens=int(os.getenv("LLM_MAX_TOKENS", "500")),
-        timeout=float(os.getenv("LLM_TIMEOUT", "30.0"))
+        timeout=float(os.getenv("LLM_TIMEOUT", "30.0")),
+        response_cache=response_cache,
+        token_counter=token_counter
     )
\ No newline at end of file
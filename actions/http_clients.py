@@ -0,0 +1,100 @@
+"""
+Process-wide HTTP clients for the action server
+Actions and the DeepSeek generator share long-lived async clients so that
+keep-alive connections (and TLS sessions to the LLM endpoint) are reused
+across chat turns instead of being set up for every request.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PDF_PROCESSOR_HOST = os.getenv("PDF_PROCESSOR_HOST", "localhost")
+PDF_PROCESSOR_PORT = int(os.getenv("PDF_PROCESSOR_PORT", "8001"))
+PDF_PROCESSOR_TIMEOUT = float(os.getenv("PDF_PROCESSOR_TIMEOUT", "5.0"))
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# name -> (client, event loop it was created on)
+_clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def _get_client(name: str, **kwargs) -> httpx.AsyncClient:
+    """Return the named client, creating it on first use in the running event loop"""
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(name)
+    if entry is not None:
+        client, client_loop = entry
+        # Connections are bound to the loop that opened them
+        if client_loop is loop and not client.is_closed:
+            return client
+    client = httpx.AsyncClient(limits=_limits(), **kwargs)
+    _clients[name] = (client, loop)
+    return client
+
+
+def pdf_processor_client() -> httpx.AsyncClient:
+    """Shared client for the pdf-processor service"""
+    return _get_client(
+        "pdf_processor",
+        base_url=f"http://{PDF_PROCESSOR_HOST}:{PDF_PROCESSOR_PORT}",
+        timeout=PDF_PROCESSOR_TIMEOUT
+    )
+
+
+def llm_client(timeout: float) -> httpx.AsyncClient:
+    """
+    Shared client for the LLM API
+
+    Uses HTTP/2 when enabled and the h2 package is installed, so concurrent
+    turns are multiplexed over one TLS connection.
+
+    Args:
+        timeout: Default request timeout in seconds
+    """
+    http2 = LLM_HTTP2 and HTTP2_AVAILABLE
+    if LLM_HTTP2 and not HTTP2_AVAILABLE and "llm" not in _clients:
+        logger.warning("h2 is not installed; using HTTP/1.1 for the LLM API")
+    return _get_client("llm", http2=http2, timeout=timeout)
+
+
+async def close_clients(*_args) -> None:
+    """Close all shared clients (registered as a server stop listener)"""
+    for name, (client, _) in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close HTTP client {name}: {e}")
+    _clients.clear()
+    logger.info("HTTP clients closed")
+
+
+def register_shutdown() -> None:
+    """Close the clients when the rasa_sdk Sanic server stops"""
+    try:
+        from sanic import Sanic
+        Sanic.get_app("rasa_sdk").register_listener(close_clients, "before_server_stop")
+    except Exception as e:
+        logger.debug(f"Could not register HTTP client shutdown listener: {e}")
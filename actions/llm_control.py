@@ -0,0 +1,302 @@
+"""
+Load control for LLM API calls
+Identical in-flight requests are coalesced into one upstream call, the number
+of concurrent calls adapts to the API (additive increase, multiplicative
+decrease on 429s and errors, pauses for Retry-After), and a circuit breaker
+stops calling a degraded API so answers fall back immediately.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import (
+    LLM_CIRCUIT_STATE,
+    LLM_COALESCED_TOTAL,
+    LLM_CONCURRENCY_LIMIT,
+    LLM_IN_FLIGHT,
+    LLM_REJECTED_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "8"))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "32"))
+# Requests per second (token bucket); 0 disables rate limiting
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "10"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Send a second, identical request when the first is slower than this percentile
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+
+# Outcomes of one upstream call
+OK = "ok"                # API answered
+OVERLOADED = "overload"  # 429: back off and shrink the concurrency limit
+FAILED = "error"         # 5xx, timeout or connection error
+REJECTED = "rejected"    # other 4xx: our request was bad, the API is fine
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_status(status_code: int) -> str:
+    """Map an HTTP status to a call outcome"""
+    if status_code < 400:
+        return OK
+    if status_code == 429:
+        return OVERLOADED
+    if status_code >= 500:
+        return FAILED
+    return REJECTED
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        # Callers still waiting on each running call
+        self._waiters: Dict[asyncio.Future, int] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None) -> Any:
+        """
+        Run factory() unless a call with this key is already running, then await its result
+
+        Args:
+            key: Identity of the call
+            factory: Creates the awaitable for the leading call
+            timeout: Longest this caller waits; raises asyncio.TimeoutError when
+                exceeded. The shared call keeps running for the other callers and
+                is cancelled when the last one gives up
+
+        Returns:
+            The result of the (shared) call
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        else:
+            LLM_COALESCED_TOTAL.inc()
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # A cancelled or timed-out caller must not cancel the call others are waiting on
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Nobody wants the result any more: stop the call (and its streaming)
+                    # instead of letting it hold a limiter slot; new callers start afresh
+                    if self._calls.get(key) is task:
+                        del self._calls[key]
+                    task.cancel()
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit plus an optional token-bucket rate limit"""
+
+    def __init__(self, initial: int = None, minimum: int = None, maximum: int = None,
+                 rate: float = None, burst: int = None):
+        """
+        Initialize limiter
+
+        Args:
+            initial: Starting concurrency limit
+            minimum: Lowest limit after decreases
+            maximum: Highest limit after increases
+            rate: Sustained requests per second (0 for no rate limit)
+            burst: Token bucket capacity
+        """
+        self.minimum = minimum or LLM_CONCURRENCY_MIN
+        self.maximum = maximum or LLM_CONCURRENCY_MAX
+        self.limit = float(min(max(initial or LLM_CONCURRENCY_INITIAL, self.minimum), self.maximum))
+        self.rate = rate if rate is not None else LLM_RATE_LIMIT
+        self.burst = burst or LLM_RATE_BURST
+        self.tokens = float(self.burst)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the server's event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _take_token(self) -> None:
+        while self.rate > 0:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def acquire(self) -> None:
+        """Wait for any Retry-After pause, a rate token and a free concurrency slot"""
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        await self._take_token()
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        LLM_IN_FLIGHT.set(self.in_flight)
+
+    def try_acquire(self) -> bool:
+        """Take a concurrency slot only if one is free right now (used for hedged requests)"""
+        if self.in_flight >= int(self.limit) or time.monotonic() < self.paused_until:
+            return False
+        self.in_flight += 1
+        LLM_IN_FLIGHT.set(self.in_flight)
+        return True
+
+    async def release(self, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        Free the slot and adapt the limit to the call's outcome
+
+        Args:
+            outcome: OK, OVERLOADED, FAILED or REJECTED
+            retry_after: Seconds the API asked us to wait, if any
+        """
+        if outcome == OK:
+            # Additive increase: about +1 per limit's worth of successful calls
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        elif outcome in (OVERLOADED, FAILED):
+            self.limit = max(self.minimum, self.limit / 2)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(retry_after, LLM_BACKOFF_MAX))
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+        LLM_IN_FLIGHT.set(self.in_flight)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retrying: Retry-After if given, else full-jitter exponential"""
+        if retry_after is not None:
+            return min(retry_after, LLM_BACKOFF_MAX)
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedging delay"""
+
+    def __init__(self, percentile: float = None, min_samples: int = None, window: int = None):
+        """
+        Initialize latency tracker
+
+        Args:
+            percentile: Latency percentile after which a request is hedged
+            min_samples: Samples needed before hedging starts
+            window: Number of recent latencies kept
+        """
+        self.percentile = percentile or LLM_HEDGE_PERCENTILE
+        self.min_samples = min_samples or LLM_HEDGE_MIN_SAMPLES
+        self.samples = deque(maxlen=window or LLM_HEDGE_WINDOW)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data"""
+        if not LLM_HEDGE_ENABLED or len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after a cool-down one probe call may close it again"""
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int = None, reset_seconds: float = None):
+        """
+        Initialize circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open before a probe
+        """
+        self.failure_threshold = failure_threshold or LLM_BREAKER_FAILURES
+        self.reset_seconds = reset_seconds or LLM_BREAKER_RESET_SECONDS
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        LLM_CIRCUIT_STATE.set(self.state)
+
+    def _set_state(self, state: int) -> None:
+        if state != self.state:
+            logger.warning(f"LLM circuit breaker {['closed', 'half-open', 'open'][self.state]} -> "
+                           f"{['closed', 'half-open', 'open'][state]}")
+        self.state = state
+        LLM_CIRCUIT_STATE.set(state)
+
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        LLM_REJECTED_TOTAL.inc()
+        return False
+
+    def record(self, outcome: str) -> None:
+        """Update the state with a call's outcome"""
+        if outcome == REJECTED:
+            # The API is healthy; release a probe without changing state
+            self.probing = False
+            return
+        if outcome == OK:
+            self.failures = 0
+            self.probing = False
+            self._set_state(self.CLOSED)
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.probing = False
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
@@ -0,0 +1,113 @@
+"""
+Prometheus metrics for the Rasa action server
+The action server runs inside rasa_sdk's Sanic app, so metrics are exposed
+on a separate port by prometheus_client's own HTTP server.
+"""
+
+import logging
+import os
+import time
+
+import redis
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("ACTION_METRICS_PORT", "9102"))
+
+# Request latency buckets (seconds) shared by the stage histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+ACTION_SECONDS = Histogram(
+    "action_run_seconds",
+    "Custom action run time",
+    ["action"],
+    buckets=LATENCY_BUCKETS
+)
+PDF_PROCESSOR_REQUEST_SECONDS = Histogram(
+    "pdf_processor_request_seconds",
+    "Latency of calls from the action server to the pdf-processor",
+    ["endpoint", "status"],
+    buckets=LATENCY_BUCKETS
+)
+DEEPSEEK_REQUEST_SECONDS = Histogram(
+    "deepseek_request_seconds",
+    "Latency of individual DeepSeek API attempts",
+    ["status"],
+    buckets=LATENCY_BUCKETS
+)
+DEEPSEEK_ANSWER_SECONDS = Histogram(
+    "deepseek_answer_seconds",
+    "Total answer generation time including retries and fallback",
+    buckets=LATENCY_BUCKETS
+)
+DEEPSEEK_TTFT_SECONDS = Histogram(
+    "deepseek_time_to_first_token_seconds",
+    "Time from sending a streaming request to the first content token",
+    buckets=LATENCY_BUCKETS
+)
+DEEPSEEK_TOKENS_TOTAL = Counter(
+    "deepseek_tokens_total",
+    "Tokens reported by the DeepSeek API usage field",
+    ["kind"]
+)
+LLM_CONCURRENCY_LIMIT = Gauge("llm_concurrency_limit", "Current adaptive limit on concurrent LLM requests")
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "LLM requests currently in flight")
+LLM_CIRCUIT_STATE = Gauge("llm_circuit_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open)")
+LLM_COALESCED_TOTAL = Counter("llm_coalesced_total", "Answer requests served by joining an identical in-flight LLM call")
+LLM_REJECTED_TOTAL = Counter("llm_rejected_total", "LLM calls skipped by the circuit breaker")
+LLM_HEDGED_TOTAL = Counter("llm_hedged_total", "Hedged LLM requests by which request won", ["winner"])
+DEGRADED_ANSWERS_TOTAL = Counter(
+    "degraded_answers_total",
+    "Turns answered extractively or cut short to meet the answer deadline",
+    ["reason"]
+)
+CONTEXT_TOKENS = Histogram(
+    "context_tokens",
+    "Tokens of retrieved context packed into the prompt",
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+)
+# In-process retrieval (RETRIEVAL_MODE=local), recorded through the Retriever's
+# instrumentation hooks (see retrieval_client.py)
+LOCAL_RETRIEVAL_SECONDS = Histogram(
+    "local_retrieval_seconds",
+    "In-process query embedding and Chroma call latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+ANSWERS_TOTAL = Counter("answers_total", "Answers produced by source", ["source"])
+CACHE_REQUESTS_TOTAL = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+REDIS_SECONDS = Histogram(
+    "redis_command_seconds",
+    "Redis command latency",
+    ["command"],
+    buckets=LATENCY_BUCKETS
+)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records the latency of every command"""
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            command = str(args[0]).lower() if args else "unknown"
+            REDIS_SECONDS.labels(command).observe(time.perf_counter() - start)
+
+
+_server_started = False
+
+
+def start_metrics_server() -> None:
+    """Expose /metrics on METRICS_PORT once per process"""
+    global _server_started
+    if _server_started:
+        return
+    try:
+        start_http_server(METRICS_PORT)
+        _server_started = True
+        logger.info(f"Metrics server listening on port {METRICS_PORT}")
+    except OSError as e:
+        logger.warning(f"Could not start metrics server on port {METRICS_PORT}: {e}")
@@ -0,0 +1,105 @@
+"""
+Exact-match LLM response cache
+Completions are keyed by a hash of the request that produced them (built
+messages, model, temperature and max_tokens), so an identical question over
+identical retrieved context is answered without calling the API again. At
+low temperatures these answers are effectively deterministic.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics import CACHE_REQUESTS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+ENTRY_KEY = "llm-cache:entry:{}"   # digest -> completion text (expires after the TTL)
+LRU_KEY = "llm-cache:lru"          # digest scored by last use
+
+
+class LLMResponseCache:
+    """Redis-backed completion cache with a TTL and least-recently-used eviction"""
+
+    def __init__(self, redis_client, ttl_seconds: int = None, max_entries: int = None):
+        """
+        Initialize LLM response cache
+
+        Args:
+            redis_client: Synchronous Redis client (decode_responses=True)
+            ttl_seconds: Maximum age of an entry
+            max_entries: Entries kept; least recently used are evicted
+        """
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds or LLM_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or LLM_CACHE_MAX_ENTRIES
+
+    @staticmethod
+    def key(messages: List[Dict[str, Any]], model: str, temperature: float, max_tokens: int) -> str:
+        """
+        Hash the generation request
+
+        Args:
+            messages: Chat messages sent to the API
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+
+        Returns:
+            Hex digest identifying the request
+        """
+        request = {
+            "messages": messages,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for a request key, or None"""
+        try:
+            answer = self.redis_client.get(ENTRY_KEY.format(key))
+            if answer is None:
+                CACHE_REQUESTS_TOTAL.labels("llm", "miss").inc()
+                return None
+            self.redis_client.zadd(LRU_KEY, {key: time.time()})
+            CACHE_REQUESTS_TOTAL.labels("llm", "hit").inc()
+            return answer
+        except Exception as e:
+            logger.warning(f"LLM response cache lookup failed: {e}")
+            CACHE_REQUESTS_TOTAL.labels("llm", "error").inc()
+            return None
+
+    def set(self, key: str, answer: str) -> None:
+        """
+        Cache a completion
+
+        Args:
+            key: Request key from key()
+            answer: Completion text
+        """
+        now = time.time()
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.set(ENTRY_KEY.format(key), answer, ex=self.ttl_seconds)
+            pipe.zadd(LRU_KEY, {key: now})
+            # Entries unused for longer than the TTL have expired on their own
+            pipe.zremrangebyscore(LRU_KEY, 0, now - self.ttl_seconds)
+            pipe.zcard(LRU_KEY)
+            size = pipe.execute()[-1]
+
+            if size > self.max_entries:
+                evicted = [member for member, _ in self.redis_client.zpopmin(LRU_KEY, size - self.max_entries)]
+                if evicted:
+                    self.redis_client.delete(*[ENTRY_KEY.format(digest) for digest in evicted])
+        except Exception as e:
+            logger.warning(f"LLM response cache store failed: {e}")
@@ -0,0 +1,244 @@
+"""
+Knowledge-base retrieval for the action server
+By default questions are embedded and searched through the pdf-processor's
+HTTP API. With RETRIEVAL_MODE=local the pdf-processor's retrieval module is
+imported from RETRIEVAL_LIBRARY_PATH and run in-process against Chroma, with
+one embedding model shared by all actions. That takes the action server ->
+pdf-processor hop and its JSON round trip off the critical path. If the
+library or the model cannot be loaded, retrieval falls back to HTTP.
+
+Both modes return the /search and /embed response shapes.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from http_clients import PDF_PROCESSOR_TIMEOUT, pdf_processor_client
+from metrics import LOCAL_RETRIEVAL_SECONDS, PDF_PROCESSOR_REQUEST_SECONDS
+from tracing import TRACE_HEADER, current_trace, parse_server_timing, span
+
+logger = logging.getLogger(__name__)
+
+# "http" (pdf-processor API) or "local" (in-process)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "http").lower()
+# Directory holding the pdf-processor modules (retrieval.py, embeddings.py, ...)
+RETRIEVAL_LIBRARY_PATH = os.getenv("RETRIEVAL_LIBRARY_PATH", "/opt/retrieval")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+# Bumped by the pdf-processor whenever indexed content changes (index_io.KB_GENERATION_KEY)
+KB_GENERATION_KEY = "kb:generation"
+
+
+class RetrievalTimeout(Exception):
+    """Retrieval did not finish within the turn's budget"""
+
+
+class RetrievalError(Exception):
+    """Retrieval failed"""
+
+
+class HTTPRetrieval:
+    """Retrieval through the pdf-processor API"""
+
+    mode = "http"
+
+    async def embed(self, text: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Embed a question with the knowledge-base model
+
+        Args:
+            text: Question
+            timeout: Seconds allowed for the request
+
+        Returns:
+            Dict with embedding, model and knowledge-base generation, or None
+            if the question could not be embedded
+        """
+        client = pdf_processor_client()
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await client.get(
+                "/embed",
+                params={"text": text},
+                headers={TRACE_HEADER: current_trace().trace_id},
+                timeout=timeout or PDF_PROCESSOR_TIMEOUT
+            )
+            status = str(response.status_code)
+            if response.status_code != 200:
+                return None
+            return response.json()
+        except Exception as e:
+            logger.warning(f"Failed to embed question: {e}")
+            return None
+        finally:
+            PDF_PROCESSOR_REQUEST_SECONDS.labels("embed", status).observe(time.perf_counter() - start)
+
+    async def search(self, query: str, max_results: int, include_sentences: bool = False,
+                     include_embeddings: bool = False, timeout: float = None) -> Dict[str, Any]:
+        """
+        Search the knowledge base
+
+        Args:
+            query: Question
+            max_results: Number of nearest chunks to query
+            include_sentences: Attach sentence indexes and the query embedding
+            include_embeddings: Attach chunk embeddings and the query embedding
+            timeout: Seconds allowed for the request
+
+        Returns:
+            The /search response
+
+        Raises:
+            RetrievalTimeout: The request timed out
+            RetrievalError: The pdf-processor answered with an error
+        """
+        client = pdf_processor_client()
+        params = {"query": query, "max_results": max_results}
+        if include_sentences:
+            params["include_sentences"] = "true"
+        if include_embeddings:
+            params["include_embeddings"] = "true"
+        start = time.perf_counter()
+        try:
+            response = await client.get(
+                "/search",
+                params=params,
+                headers={TRACE_HEADER: current_trace().trace_id},
+                timeout=timeout or PDF_PROCESSOR_TIMEOUT
+            )
+        except httpx.TimeoutException as e:
+            PDF_PROCESSOR_REQUEST_SECONDS.labels("search", "timeout").observe(time.perf_counter() - start)
+            raise RetrievalTimeout(str(e)) from e
+        except httpx.HTTPError as e:
+            PDF_PROCESSOR_REQUEST_SECONDS.labels("search", "error").observe(time.perf_counter() - start)
+            raise RetrievalError(str(e)) from e
+        PDF_PROCESSOR_REQUEST_SECONDS.labels("search", str(response.status_code)).observe(
+            time.perf_counter() - start
+        )
+        for pdf_span in parse_server_timing(response.headers.get("Server-Timing")):
+            if pdf_span["name"] != "total":
+                current_trace().add_span(f"pdf_{pdf_span['name']}", pdf_span["dur"])
+
+        if response.status_code != 200:
+            raise RetrievalError(f"pdf-processor /search returned {response.status_code}")
+        return response.json()
+
+
+class LocalRetrievalInstrumentation:
+    """
+    Records in-process retrieval in the action server's metrics and trace
+    (the pdf-processor's instrumentation.Instrumentation hooks)
+    """
+
+    def span(self, name: str):
+        return span(name)
+
+    def chroma_call(self, operation: str):
+        return LOCAL_RETRIEVAL_SECONDS.labels(f"chroma_{operation}").time()
+
+    def embedded(self, texts: List[str], seconds: float) -> None:
+        LOCAL_RETRIEVAL_SECONDS.labels("embed").observe(seconds)
+
+    def search_results(self, count: int) -> None:
+        pass
+
+
+class LocalRetrieval:
+    """In-process retrieval with the pdf-processor's retrieval module"""
+
+    mode = "local"
+
+    def __init__(self, redis_client):
+        """
+        Load the embedding model and connect to Chroma
+
+        Args:
+            redis_client: Synchronous Redis client, for the knowledge-base generation
+                and the sentence indexes
+        """
+        if RETRIEVAL_LIBRARY_PATH not in sys.path:
+            # Appended so the action server's own modules win where names clash (metrics, tracing)
+            sys.path.append(RETRIEVAL_LIBRARY_PATH)
+        import chromadb
+        from embeddings import EmbeddingManager
+        from retrieval import Retriever
+
+        self.redis_client = redis_client
+        instrumentation = LocalRetrievalInstrumentation()
+        self.retriever = Retriever(
+            EmbeddingManager(instrumentation=instrumentation),
+            chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT),
+            redis_client=redis_client,
+            instrumentation=instrumentation
+        )
+        # Query vectors must have the collection's width (same EMBEDDING_DIMENSIONS as the pdf-processor)
+        self.retriever.check_dimensions()
+
+    def generation(self) -> int:
+        """Current knowledge-base generation"""
+        if self.redis_client is None:
+            return 0
+        return int(self.redis_client.get(KB_GENERATION_KEY) or 0)
+
+    async def _run(self, function, *args, timeout: float = None):
+        # Model inference and the Chroma client are blocking; keep them off the event loop
+        return await asyncio.wait_for(asyncio.to_thread(function, *args), timeout or PDF_PROCESSOR_TIMEOUT)
+
+    async def embed(self, text: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Same as HTTPRetrieval.embed, in-process"""
+        try:
+            embedding = await self._run(self.retriever.embed_query, text, timeout=timeout)
+            return {
+                "embedding": embedding.tolist(),
+                "model": self.retriever.model_name,
+                "generation": self.generation()
+            }
+        except Exception as e:
+            logger.warning(f"Failed to embed question: {e}")
+            return None
+
+    async def search(self, query: str, max_results: int, include_sentences: bool = False,
+                     include_embeddings: bool = False, timeout: float = None) -> Dict[str, Any]:
+        """Same as HTTPRetrieval.search, in-process"""
+        try:
+            results, query_embedding = await self._run(
+                self.retriever.search, query, max_results, include_sentences, include_embeddings,
+                timeout=timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise RetrievalTimeout("in-process search timed out") from e
+        except Exception as e:
+            raise RetrievalError(str(e)) from e
+
+        response = {"results": results, "query": query, "generation": self.generation()}
+        if include_sentences or include_embeddings:
+            response["query_embedding"] = query_embedding.tolist()
+        return response
+
+
+def create_retrieval(redis_client=None):
+    """
+    Create the retrieval backend for RETRIEVAL_MODE
+
+    Args:
+        redis_client: Synchronous Redis client (used in local mode)
+
+    Returns:
+        LocalRetrieval, or HTTPRetrieval when configured or when the
+        in-process library cannot be loaded
+    """
+    if RETRIEVAL_MODE == "local":
+        try:
+            retrieval = LocalRetrieval(redis_client)
+            logger.info(f"Retrieving in-process with {retrieval.retriever.model_name} from {RETRIEVAL_LIBRARY_PATH}")
+            return retrieval
+        except Exception as e:
+            logger.error(f"In-process retrieval unavailable ({e}); using the pdf-processor API")
+    return HTTPRetrieval()
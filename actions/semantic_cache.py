@@ -0,0 +1,206 @@
+"""
+Semantic answer cache
+Stores (question embedding, retrieved chunk IDs, answer) in Redis so repeated
+and paraphrased questions are answered without search or the LLM. Lookups
+are a single matrix-vector product against an in-process mirror of the
+cached embeddings; entries are only served for the knowledge-base generation
+they were produced from. Entries are namespaced by embedding model and
+dimension, so a model or EMBEDDING_DIMENSIONS change starts an empty
+namespace, and the namespace's keys expire SEMANTIC_CACHE_TTL_SECONDS after
+the last store.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import CACHE_REQUESTS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+
+
+class SemanticAnswerCache:
+    """Nearest-neighbour answer cache shared by all action server processes through Redis"""
+
+    def __init__(self, redis_client, threshold: float = None, max_entries: int = None,
+                 ttl_seconds: int = None):
+        """
+        Initialize semantic answer cache
+
+        Args:
+            redis_client: Synchronous Redis client (decode_responses=True)
+            threshold: Minimum cosine similarity between questions for a hit
+            max_entries: Entries kept per embedding model and dimension; least recently used are evicted
+            ttl_seconds: Maximum age of an entry
+        """
+        self.redis_client = redis_client
+        self.threshold = threshold if threshold is not None else SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = max_entries or SEMANTIC_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or SEMANTIC_CACHE_TTL_SECONDS
+
+        # Local mirror of the cached question embeddings, per embedding model and dimension
+        self._mirrors: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    @staticmethod
+    def _keys(model: str, dimensions: int) -> Dict[str, str]:
+        prefix = f"answer-cache:{model}:{dimensions}"
+        return {
+            "entries": f"{prefix}:entries",        # id -> JSON entry
+            "embeddings": f"{prefix}:embeddings",  # id -> float32 embedding (hex)
+            "lru": f"{prefix}:lru",                # id scored by last use
+            "version": f"{prefix}:version",        # bumped on every insert/removal
+        }
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _sync_mirror(self, model: str, dimensions: int) -> Dict[str, Any]:
+        """Bring the local embedding matrix up to date with Redis, fetching only new entries"""
+        keys = self._keys(model, dimensions)
+        mirror = self._mirrors.setdefault(
+            (model, dimensions), {"version": None, "vectors": {}, "ids": [], "matrix": None}
+        )
+        version = self.redis_client.get(keys["version"])
+        if version == mirror["version"]:
+            return mirror
+
+        ids = set(self.redis_client.hkeys(keys["embeddings"]))
+        vectors = {i: v for i, v in mirror["vectors"].items() if i in ids}
+        missing = sorted(ids - vectors.keys())
+        unreadable = []
+        if missing:
+            for entry_id, value in zip(missing, self.redis_client.hmget(keys["embeddings"], missing)):
+                vector = np.frombuffer(bytes.fromhex(value), dtype=np.float32) if value else None
+                if vector is not None and vector.shape[0] == dimensions:
+                    vectors[entry_id] = vector
+                else:
+                    unreadable.append(entry_id)
+        if unreadable:
+            # A vector of another size would make the matrix unusable for every lookup
+            self._remove(model, dimensions, unreadable)
+            version = self.redis_client.get(keys["version"])
+
+        mirror["vectors"] = vectors
+        mirror["ids"] = list(vectors)
+        mirror["matrix"] = np.vstack(list(vectors.values())) if vectors else None
+        mirror["version"] = version
+        return mirror
+
+    def lookup(self, model: str, embedding, generation: int) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a question
+
+        Args:
+            model: Embedding model the question was embedded with
+            embedding: Question embedding
+            generation: Current knowledge-base generation
+
+        Returns:
+            The cached entry (question, answer, sources, chunk_ids, context,
+            similarity), or None
+        """
+        try:
+            query = self._normalize(embedding)
+            dimensions = query.shape[0]
+            mirror = self._sync_mirror(model, dimensions)
+            if mirror["matrix"] is None or not mirror["ids"]:
+                CACHE_REQUESTS_TOTAL.labels("semantic", "miss").inc()
+                return None
+
+            similarities = mirror["matrix"] @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                CACHE_REQUESTS_TOTAL.labels("semantic", "miss").inc()
+                return None
+
+            keys = self._keys(model, dimensions)
+            entry_id = mirror["ids"][best]
+            raw = self.redis_client.hget(keys["entries"], entry_id)
+            entry = json.loads(raw) if raw else None
+            if (entry is None or entry["generation"] != generation
+                    or time.time() - entry["created"] > self.ttl_seconds):
+                # Answered from a knowledge base that has since changed, or expired
+                self._remove(model, dimensions, [entry_id])
+                CACHE_REQUESTS_TOTAL.labels("semantic", "stale").inc()
+                return None
+
+            self.redis_client.zadd(keys["lru"], {entry_id: time.time()})
+            CACHE_REQUESTS_TOTAL.labels("semantic", "hit").inc()
+            entry["similarity"] = similarity
+            return entry
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            CACHE_REQUESTS_TOTAL.labels("semantic", "error").inc()
+            return None
+
+    def store(self, model: str, embedding, generation: int, question: str, answer: str,
+              sources: List[str], chunk_ids: List[str], context: str) -> None:
+        """
+        Cache an answer
+
+        Args:
+            model: Embedding model the question was embedded with
+            embedding: Question embedding
+            generation: Knowledge-base generation the answer was produced from
+            question: Original question
+            answer: Answer text (without the sources line)
+            sources: Source file names
+            chunk_ids: IDs of the retrieved chunks the answer is based on
+            context: Retrieved context, restored for follow-up questions
+        """
+        vector = self._normalize(embedding)
+        dimensions = vector.shape[0]
+        keys = self._keys(model, dimensions)
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        entry = {
+            "question": question,
+            "answer": answer,
+            "sources": sources,
+            "chunk_ids": chunk_ids,
+            "context": context,
+            "generation": generation,
+            "created": now,
+        }
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hset(keys["entries"], entry_id, json.dumps(entry))
+            pipe.hset(keys["embeddings"], entry_id, vector.tobytes().hex())
+            pipe.zadd(keys["lru"], {entry_id: now})
+            pipe.incr(keys["version"])
+            # Every entry is older than the TTL once the namespace has not been written for that long
+            for key in keys.values():
+                pipe.expire(key, self.ttl_seconds)
+            pipe.zcard(keys["lru"])
+            size = pipe.execute()[-1]
+
+            if size > self.max_entries:
+                evicted = [member for member, _ in self.redis_client.zpopmin(keys["lru"], size - self.max_entries)]
+                self._remove(model, dimensions, evicted)
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed: {e}")
+
+    def _remove(self, model: str, dimensions: int, entry_ids: List[str]) -> None:
+        if not entry_ids:
+            return
+        keys = self._keys(model, dimensions)
+        pipe = self.redis_client.pipeline()
+        pipe.hdel(keys["entries"], *entry_ids)
+        pipe.hdel(keys["embeddings"], *entry_ids)
+        pipe.zrem(keys["lru"], *entry_ids)
+        pipe.incr(keys["version"])
+        pipe.execute()
@@ -0,0 +1,125 @@
+"""
+Extractive answers from the precomputed sentence index
+The pdf-processor stores each chunk's sentence offsets, hashed token IDs and
+sentence embeddings in Redis (see pdf-processor/sentence_index.py) and
+attaches them to search results on request.
+Sentences of all retrieved chunks are scored together with vectorized BM25
+and, when the question embedding is available, cosine similarity.
+
+Segmentation and tokenization come from the shared sentences module, which
+built the index.
+"""
+
+import base64
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from sentences import split_sentences, token_ids
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Weight of embedding similarity against normalized BM25 (0 = BM25 only)
+SENTENCE_EMBEDDING_WEIGHT = float(os.getenv("SENTENCE_EMBEDDING_WEIGHT", "0.5"))
+
+
+def _decode(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Sentences, token IDs and (if indexed) embeddings of one search result"""
+    content = result.get("content", "")
+    index = result.get("sentence_index")
+    if index:
+        try:
+            spans = json.loads(index["sentence_spans"])
+            ids = np.frombuffer(base64.b64decode(index["sentence_tokens"]), dtype=np.uint32)
+            codes = np.frombuffer(base64.b64decode(index["sentence_embeddings"]), dtype=np.int8)
+            scales = np.frombuffer(base64.b64decode(index["sentence_scales"]), dtype=np.float32)
+            embeddings = codes.reshape(len(spans), -1) if spans and codes.size else None
+            return {
+                "sentences": [content[start:end] for start, end, _ in spans],
+                "lengths": [n for _, _, n in spans],
+                "ids": ids,
+                "embeddings": embeddings,
+                "scales": scales,
+            }
+        except Exception as e:
+            logger.warning(f"Unreadable sentence index for {result.get('id')}: {e}")
+
+    # Chunks ingested before the index existed are segmented on the fly
+    sentences = split_sentences(content)
+    ids = [token_ids(sentence) for sentence in sentences]
+    return {
+        "sentences": sentences,
+        "lengths": [len(i) for i in ids],
+        "ids": np.concatenate(ids) if ids else np.empty(0, np.uint32),
+        "embeddings": None,
+        "scales": None,
+    }
+
+
+def rank_sentences(question: str, results: List[Dict[str, Any]], top_k: int,
+                   question_embedding: Optional[List[float]] = None) -> List[str]:
+    """
+    Pick the sentences of the retrieved chunks that best answer a question
+
+    Args:
+        question: User's question
+        results: Search results, with "sentence_index" when precomputed
+        top_k: Number of sentences to return
+        question_embedding: Question embedding from the same model, if available
+
+    Returns:
+        Up to top_k sentences, best first
+    """
+    decoded = [_decode(result) for result in results]
+
+    # Overlapping chunks repeat sentences; keep the first occurrence of each
+    sentences, lengths, id_parts, vectors, scales, seen = [], [], [], [], [], set()
+    use_embeddings = question_embedding is not None and all(d["embeddings"] is not None for d in decoded)
+    for d in decoded:
+        offset = 0
+        for i, (sentence, length) in enumerate(zip(d["sentences"], d["lengths"])):
+            ids = d["ids"][offset:offset + length]
+            offset += length
+            key = " ".join(sentence.lower().split())
+            if key in seen or not length:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+            lengths.append(length)
+            id_parts.append(ids)
+            if use_embeddings:
+                vectors.append(d["embeddings"][i])
+                scales.append(d["scales"][i])
+    if not sentences:
+        return []
+
+    # BM25 over the retrieved sentences as the corpus
+    lengths = np.asarray(lengths, dtype=np.float32)
+    all_ids = np.concatenate(id_parts)
+    owner = np.repeat(np.arange(len(sentences)), lengths.astype(np.int64))
+    query = np.unique(token_ids(question))
+    hit = np.isin(all_ids, query)
+    tf = np.zeros((len(sentences), len(query)), dtype=np.float32)
+    np.add.at(tf, (owner[hit], np.searchsorted(query, all_ids[hit])), 1.0)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(sentences) - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / lengths.mean())
+    scores = (idf * tf * (BM25_K1 + 1) / (tf + norm[:, None])).sum(axis=1)
+    if scores.max() > 0:
+        scores = scores / scores.max()
+
+    if use_embeddings and SENTENCE_EMBEDDING_WEIGHT > 0:
+        codes = np.vstack(vectors).astype(np.float32)
+        q = np.asarray(question_embedding, dtype=np.float32)
+        if q.shape[0] == codes.shape[1]:
+            q = q / (np.linalg.norm(q) or 1.0)
+            similarity = (codes @ q) * np.asarray(scales, dtype=np.float32)
+            scores = (1 - SENTENCE_EMBEDDING_WEIGHT) * scores + SENTENCE_EMBEDDING_WEIGHT * similarity
+
+    best = np.argsort(-scores, kind="stable")[:top_k]
+    return [sentences[i] for i in best]
@@ -0,0 +1,101 @@
+"""
+Per-session retrieval reuse for follow-up questions
+A full search keeps a wider candidate set (SESSION_CANDIDATES chunks with their
+embeddings) with the turn's retrieval context (context_store.py), which the
+tracker references. Short follow-ups that lean on the previous turn ("what
+about the price?", "is it vegan?") are re-scored
+against that set with the question the set was retrieved for as an anchor,
+and only run a new full-corpus search when no candidate covers them well
+enough.
+"""
+
+import base64
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from metrics import CACHE_REQUESTS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+SESSION_RETRIEVAL_ENABLED = os.getenv("SESSION_RETRIEVAL_ENABLED", "true").lower() == "true"
+# Chunks retrieved (and kept for follow-ups) by a full search
+SESSION_CANDIDATES = int(os.getenv("SESSION_CANDIDATES", "15"))
+# Messages with at most this many words are treated as follow-ups
+FOLLOWUP_MAX_WORDS = int(os.getenv("FOLLOWUP_MAX_WORDS", "8"))
+# Ellipsis ("what about ...", "and ...") or a pronoun referring back to the previous turn;
+# short messages without one are standalone questions (and may be answered from the semantic cache)
+FOLLOWUP_MARKERS = re.compile(
+    r"^\s*(and|also|but|or|so|what about|how about|what else)\b"
+    r"|\b(it|its|it's|that|this|these|those|they|them|their|theirs|ones|same|else|instead|too|either)\b",
+    re.IGNORECASE
+)
+# Weight of the previous question in the follow-up query vector
+FOLLOWUP_ANCHOR_WEIGHT = float(os.getenv("FOLLOWUP_ANCHOR_WEIGHT", "0.5"))
+# Same scale as the pdf-processor's SIMILARITY_THRESHOLD (1 - squared L2 distance)
+FOLLOWUP_MIN_SIMILARITY = float(os.getenv("FOLLOWUP_MIN_SIMILARITY", os.getenv("SIMILARITY_THRESHOLD", "0.7")))
+FOLLOWUP_MIN_RESULTS = int(os.getenv("FOLLOWUP_MIN_RESULTS", "1"))
+
+
+def is_follow_up(message: str) -> bool:
+    """Whether a message is short and refers back to the previous turn"""
+    return 0 < len(message.split()) <= FOLLOWUP_MAX_WORDS and FOLLOWUP_MARKERS.search(message) is not None
+
+
+def _decode_embedding(value: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(value), dtype=np.float32)
+
+
+def rescore(session: Dict[str, Any], question_embedding: List[float], generation: int,
+            max_results: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Answer a follow-up from the conversation's candidates
+
+    Args:
+        session: Context entry (ContextStore.load) with candidates, anchor and generation
+        question_embedding: Embedding of the follow-up
+        generation: Current knowledge-base generation
+        max_results: Number of results to return
+
+    Returns:
+        Candidates above FOLLOWUP_MIN_SIMILARITY, best first, with updated
+        "similarity" and "distance"; None when the set is stale or covers
+        the follow-up poorly (run a full search instead)
+    """
+    if session.get("generation") != generation:
+        CACHE_REQUESTS_TOTAL.labels("retrieval", "stale").inc()
+        return None
+    try:
+        candidates = session["candidates"]
+        matrix = np.vstack([_decode_embedding(candidate["embedding"]) for candidate in candidates])
+        question = np.asarray(question_embedding, dtype=np.float32)
+        anchor = np.asarray(session["anchor"], dtype=np.float32)
+        if question.shape[0] != matrix.shape[1] or anchor.shape != question.shape:
+            CACHE_REQUESTS_TOTAL.labels("retrieval", "stale").inc()
+            return None
+    except Exception as e:
+        logger.warning(f"Unreadable session candidates: {e}")
+        CACHE_REQUESTS_TOTAL.labels("retrieval", "error").inc()
+        return None
+
+    # Short follow-ups carry little topic on their own; lean on the question they follow
+    query = question + FOLLOWUP_ANCHOR_WEIGHT * anchor
+    query *= (np.linalg.norm(question) or 1.0) / (np.linalg.norm(query) or 1.0)
+    # Same similarity as the pdf-processor search: 1 - squared L2 distance
+    distances = ((matrix - query) ** 2).sum(axis=1)
+    similarities = 1.0 - distances
+
+    order = np.argsort(distances, kind="stable")
+    kept = [i for i in order if similarities[i] >= FOLLOWUP_MIN_SIMILARITY][:max_results]
+    if len(kept) < FOLLOWUP_MIN_RESULTS:
+        CACHE_REQUESTS_TOTAL.labels("retrieval", "poor_coverage").inc()
+        return None
+
+    CACHE_REQUESTS_TOTAL.labels("retrieval", "hit").inc()
+    return [
+        dict(candidates[i], distance=float(distances[i]), similarity=float(similarities[i]))
+        for i in kept
+    ]
@@ -0,0 +1,70 @@
+"""
+Relays a streamed answer to the web UI through Redis pub/sub
+The action server's Redis client is synchronous, so publishing every token
+from the Sanic event loop would block all other conversations for a round
+trip per token. Events are queued instead, and one background task
+publishes everything queued so far in a single pipelined round trip on a
+worker thread; tokens that arrive while a publish is in flight go out
+together with the next one, in order.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StreamPublisher:
+    """Publishes streaming events to one channel without blocking the event loop"""
+
+    def __init__(self, redis_client, channel: str):
+        """
+        Initialize stream publisher
+
+        Args:
+            redis_client: Synchronous Redis client
+            channel: Pub/sub channel the caller is subscribed to
+        """
+        self.redis_client = redis_client
+        self.channel = channel
+        self.closed = False
+        self._pending: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """Queue an event; ignored once the publisher is closed"""
+        if self.closed:
+            return
+        self._pending.append(json.dumps(event))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush())
+
+    async def close(self, discard: bool = False) -> None:
+        """
+        Stop accepting events and wait until the queued ones are published
+
+        Args:
+            discard: Drop the events not yet published instead (the caller
+                has already been told to discard the partial answer)
+        """
+        self.closed = True
+        if discard:
+            self._pending = []
+        if self._task is not None:
+            await self._task
+
+    async def _flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._send, batch)
+            except Exception as e:
+                logger.warning(f"Failed to publish partial answer: {e}")
+
+    def _send(self, batch: List[str]) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for message in batch:
+            pipe.publish(self.channel, message)
+        pipe.execute()
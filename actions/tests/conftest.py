@@ -0,0 +1,11 @@
+"""
+Put the action server modules (and the shared modules the image copies in)
+on the import path, as in the container's working directory
+"""
+
+import os
+import sys
+
+ACTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(ACTIONS_DIR), "shared"))
+sys.path.insert(0, ACTIONS_DIR)
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+
+import deadline as deadline_module
+import deepseek_generator
+from deadline import Deadline
+from deepseek_generator import DeepSeekAPIGenerator
+from llm_control import SingleFlight
+
+TOKEN_LINE = b'data: {"choices": [{"delta": {"content": "word "}}]}\n\n'
+
+
+def test_single_flight_cancels_the_call_when_the_last_caller_gives_up():
+    single_flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        first = asyncio.create_task(single_flight.do("key", call, timeout=0.05))
+        second = asyncio.create_task(single_flight.do("key", call, timeout=0.1))
+        for caller in (first, second):
+            try:
+                await caller
+            except asyncio.TimeoutError:
+                pass
+            # The call keeps running while the second caller still waits
+            if caller is first:
+                assert not cancelled.is_set()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert not single_flight.in_flight("key")
+
+    asyncio.run(run())
+
+
+def test_no_tokens_are_published_after_the_deadline(monkeypatch):
+    monkeypatch.setattr(deadline_module, "DEADLINE_RESERVE_SECONDS", 0.0)
+    monkeypatch.setattr(deadline_module, "LLM_MIN_BUDGET_SECONDS", 0.1)
+    monkeypatch.setattr(deepseek_generator, "LLM_MIN_BUDGET_SECONDS", 0.1)
+
+    async def endless_stream():
+        while True:
+            yield TOKEN_LINE
+            await asyncio.sleep(0.02)
+
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=endless_stream()))
+        async with httpx.AsyncClient(transport=transport) as client:
+            generator = DeepSeekAPIGenerator(api_key="test", client=client)
+            events = []
+
+            async def on_event(event):
+                events.append(event)
+
+            answer, source = await generator.stream_answer("question", "context", on_event,
+                                                           deadline=Deadline(0.4))
+            assert source == "fallback"
+            published = len(events)
+            await asyncio.sleep(0.2)
+
+            assert len(events) == published
+            assert events[-1] == {"type": "reset"}
+            assert any(event["type"] == "delta" for event in events)
+            assert generator.limiter.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,38 @@
+import fakeredis
+import numpy as np
+
+from semantic_cache import SemanticAnswerCache
+
+
+def store(cache, embedding, answer):
+    cache.store("model", embedding, 1, "question", answer, ["menu.pdf"], ["a_0"], "context")
+
+
+def test_entries_of_another_dimension_do_not_disable_the_cache():
+    cache = SemanticAnswerCache(fakeredis.FakeRedis(decode_responses=True))
+    store(cache, [1.0, 0.0, 0.0], "three")
+    store(cache, [1.0, 0.0, 0.0, 0.0], "four")
+
+    assert cache.lookup("model", [1.0, 0.0, 0.0], 1)["answer"] == "three"
+    assert cache.lookup("model", [1.0, 0.0, 0.0, 0.0], 1)["answer"] == "four"
+
+
+def test_vectors_of_the_wrong_size_are_evicted():
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    cache = SemanticAnswerCache(redis_client)
+    store(cache, [1.0, 0.0, 0.0], "three")
+    # Written under the 3-dimensional namespace by an older version
+    redis_client.hset("answer-cache:model:3:embeddings", "stray", np.ones(5, dtype=np.float32).tobytes().hex())
+
+    assert cache.lookup("model", [1.0, 0.0, 0.0], 1)["answer"] == "three"
+    assert not redis_client.hexists("answer-cache:model:3:embeddings", "stray")
+
+
+def test_stored_keys_expire():
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    cache = SemanticAnswerCache(redis_client, ttl_seconds=600)
+    store(cache, [1.0, 0.0, 0.0], "three")
+
+    keys = redis_client.keys("answer-cache:*")
+    assert len(keys) == 4
+    assert all(0 < redis_client.ttl(key) <= 600 for key in keys)
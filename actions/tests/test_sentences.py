@@ -0,0 +1,28 @@
+from context_packer import TokenCounter, pack_context
+from sentence_ranker import rank_sentences
+from sentences import sentence_spans, split_sentences
+
+TABLE = "Nutrition per serving:\nSugar 12g\nFat 3g\n\nServe chilled. Keeps for 3 days!"
+
+
+def test_single_line_breaks_stay_inside_a_sentence():
+    assert split_sentences(TABLE) == [
+        "Nutrition per serving:\nSugar 12g\nFat 3g",
+        "Serve chilled.",
+        "Keeps for 3 days!",
+    ]
+
+
+def test_fragments_without_words_are_dropped_and_short_facts_kept():
+    assert split_sentences("5g\n\n---\n\n...") == ["5g"]
+
+
+def test_index_spans_match_the_split_sentences():
+    assert [TABLE[start:end] for start, end in sentence_spans(TABLE)] == split_sentences(TABLE)
+
+
+def test_context_packer_and_ranker_use_the_index_sentences():
+    results = [{"content": TABLE, "similarity": 0.9, "metadata": {}}]
+    packed = pack_context(results, TokenCounter(), budget=1000)
+    assert packed.text == " ".join(split_sentences(TABLE))
+    assert rank_sentences("how much sugar", results, 1) == ["Nutrition per serving:\nSugar 12g\nFat 3g"]
@@ -0,0 +1,30 @@
+import fakeredis
+import numpy as np
+
+from semantic_cache import SemanticAnswerCache
+from session_retrieval import is_follow_up
+
+
+def test_short_standalone_question_is_not_a_follow_up():
+    assert not is_follow_up("What are your opening hours?")
+    assert not is_follow_up("Do you deliver?")
+
+
+def test_anaphora_and_ellipsis_are_follow_ups():
+    assert is_follow_up("what about the price?")
+    assert is_follow_up("Is it vegan?")
+    assert is_follow_up("and for dessert?")
+    assert not is_follow_up("what about it " + "word " * 10)
+
+
+def test_short_standalone_second_question_hits_the_semantic_cache():
+    cache = SemanticAnswerCache(fakeredis.FakeRedis(decode_responses=True))
+    first = np.array([1.0, 0.0, 0.1], dtype=np.float32)
+    cache.store("model", first, 1, "When do you open?", "At 9am.", ["hours.pdf"], ["a_0"], "Open 9am-5pm.")
+
+    # Second turn of the conversation: short, but standalone, so it goes to the cache
+    second_question = "What are your opening hours?"
+    assert not is_follow_up(second_question)
+    entry = cache.lookup("model", [1.0, 0.0, 0.12], 1)
+    assert entry is not None
+    assert entry["answer"] == "At 9am."
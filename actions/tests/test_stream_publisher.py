@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import fakeredis
+
+from stream_publisher import StreamPublisher
+
+
+def subscribe(redis_client, channel):
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe(channel)
+    pubsub.get_message()  # subscribe confirmation
+    return pubsub
+
+
+def received(pubsub):
+    events = []
+    while (message := pubsub.get_message(ignore_subscribe_messages=True)) is not None:
+        events.append(json.loads(message["data"]))
+    return events
+
+
+def test_events_are_published_in_order_before_close_returns():
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    pubsub = subscribe(redis_client, "chat-stream:1")
+
+    async def stream():
+        publisher = StreamPublisher(redis_client, "chat-stream:1")
+        for i in range(50):
+            await publisher.publish({"type": "delta", "text": str(i)})
+        await publisher.close()
+        await publisher.publish({"type": "delta", "text": "late"})
+
+    asyncio.run(stream())
+    assert [event["text"] for event in received(pubsub)] == [str(i) for i in range(50)]
+
+
+def test_close_with_discard_drops_queued_events():
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    pubsub = subscribe(redis_client, "chat-stream:1")
+
+    async def stream():
+        publisher = StreamPublisher(redis_client, "chat-stream:1")
+        await publisher.publish({"type": "delta", "text": "first"})
+        await asyncio.sleep(0)  # the background task takes the first event
+        await publisher.publish({"type": "delta", "text": "queued"})
+        await publisher.close(discard=True)
+
+    asyncio.run(stream())
+    # The first event was already handed to the worker thread; the queued one is dropped
+    assert [event["text"] for event in received(pubsub)] == ["first"]
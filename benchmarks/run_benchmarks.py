@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for ingestion and search
+Runs the pdf-processor pipeline in-process against local stand-ins
+(in-memory Chroma, fakeredis) on synthetic PDFs and writes machine-readable
+results that can be compared across commits.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --pages 1,10,100 --concurrency 1,8,32 --embedder hash
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.join(ROOT, "pdf-processor"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import write_synthetic_pdf  # noqa: E402
+
+
+class HashingEmbedder:
+    """
+    Model-free stand-in for EmbeddingManager
+    Hashes word unigrams into a fixed-size vector; used to benchmark the
+    pipeline around the model (or on machines without the model cached).
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.model_name = f"hashing-{dimensions}"
+        self.embedding_dimensions = dimensions
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.embedding_dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+                embeddings[row, int.from_bytes(digest, "little") % self.embedding_dimensions] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def install_stand_ins(service, embedder) -> None:
+    """Replace the service's external dependencies with in-process stand-ins"""
+    import chromadb
+    import fakeredis
+    from chromadb.config import Settings
+    from dedup import ChunkDeduplicator
+    from pdf_processor import PDFProcessor
+    from progress import ProgressBroker
+    from quantization import EmbeddingQuantizer
+
+    redis_server = fakeredis.FakeServer()
+    service.redis_client = fakeredis.FakeRedis(server=redis_server, decode_responses=True)
+    service.progress_broker = ProgressBroker(fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True))
+    service.chroma_client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+    service.chroma_client.get_or_create_collection(service.COLLECTION_NAME)
+    service.embedding_manager = embedder
+    service.embedding_quantizer = EmbeddingQuantizer()
+    service.pdf_processor = PDFProcessor()
+    if service.DEDUP_ENABLED:
+        service.chunk_deduplicator = ChunkDeduplicator(service.redis_client)
+    # /search goes through the retriever, which init_redis/init_chroma/init_embeddings wire up
+    service.retriever.redis_client = service.redis_client
+    service.retriever.chroma_client = service.chroma_client
+    service.retriever.embedding_manager = embedder
+    for state in service.readiness.values():
+        state["ready"] = True
+
+
+def bench_extraction(processor, workdir: str, page_counts: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    for pages in page_counts:
+        path = os.path.join(workdir, f"extract_{pages}.pdf")
+        write_synthetic_pdf(path, pages, seed=pages)
+        start = time.perf_counter()
+        text = processor.extract_text_from_pdf(path)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "pages": pages,
+            "seconds": round(elapsed, 4),
+            "pages_per_s": round(pages / elapsed, 2),
+            "characters": len(text),
+        })
+    return results
+
+
+def bench_chunking(processor, text: str, repeats: int) -> Dict[str, Any]:
+    chunks = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        chunks = processor.chunk_text(text)
+    elapsed = time.perf_counter() - start
+    megabytes = len(text.encode("utf-8")) * repeats / (1024 * 1024)
+    return {
+        "megabytes": round(megabytes, 3),
+        "seconds": round(elapsed, 4),
+        "mb_per_s": round(megabytes / elapsed, 3),
+        "chunks_per_document": len(chunks),
+    }
+
+
+def bench_embeddings(embedder, chunks: List[str], batch_sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    embedder.generate_embeddings(chunks[:2])  # warm-up
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(chunks), batch_size):
+            embedder.generate_embeddings(chunks[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        results.append({
+            "batch_size": batch_size,
+            "texts": len(chunks),
+            "seconds": round(elapsed, 4),
+            "embeddings_per_s": round(len(chunks) / elapsed, 2),
+        })
+    return results
+
+
+async def bench_ingestion(service, workdir: str, documents: int, pages: int) -> Dict[str, Any]:
+    paths = []
+    for i in range(documents):
+        path = os.path.join(workdir, f"ingest_{i}.pdf")
+        write_synthetic_pdf(path, pages, seed=1000 + i)
+        paths.append(path)
+
+    start = time.perf_counter()
+    for path in paths:
+        file_id = str(uuid.uuid4())
+        service.redis_client.hset(f"pdf:{file_id}", mapping={
+            "filename": os.path.basename(path), "status": "processing", "file_path": path
+        })
+        await service.process_pdf_background(file_id, path, os.path.basename(path))
+    elapsed = time.perf_counter() - start
+
+    chunks = service.chroma_client.get_collection(service.COLLECTION_NAME).count()
+    return {
+        "documents": documents,
+        "pages_per_document": pages,
+        "seconds": round(elapsed, 3),
+        "docs_per_min": round(documents / elapsed * 60, 2),
+        "chunks_stored": chunks,
+        "chunks_per_s": round(chunks / elapsed, 2),
+    }
+
+
+async def bench_search(service, queries: List[str], levels: List[int], requests_per_level: int) -> List[Dict[str, Any]]:
+    import httpx
+
+    results = []
+    async with httpx.AsyncClient(app=service.app, base_url="http://benchmark") as client:
+        await client.get("/search", params={"query": queries[0]})  # warm-up
+        for concurrency in levels:
+            latencies: List[float] = []
+            errors = 0
+            pending = iter(range(requests_per_level))
+
+            async def worker():
+                nonlocal errors
+                for i in pending:
+                    start = time.perf_counter()
+                    response = await client.get("/search", params={"query": queries[i % len(queries)]})
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            results.append({
+                "concurrency": concurrency,
+                "requests": requests_per_level,
+                "errors": errors,
+                "throughput_rps": round(requests_per_level / elapsed, 2),
+                **percentiles(latencies),
+            })
+    return results
+
+
+def flatten(results: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten a results document into comparable metric keys"""
+    flat = {}
+    for item in results["extraction"]:
+        flat[f"extraction.{item['pages']}p.pages_per_s"] = item["pages_per_s"]
+    flat["chunking.mb_per_s"] = results["chunking"]["mb_per_s"]
+    for item in results["embeddings"]:
+        flat[f"embeddings.b{item['batch_size']}.embeddings_per_s"] = item["embeddings_per_s"]
+    flat["ingestion.docs_per_min"] = results["ingestion"]["docs_per_min"]
+    for item in results["search"]:
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            flat[f"search.c{item['concurrency']}.{key}"] = item[key]
+    return flat
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    old, new = flatten(previous), flatten(current)
+    print(f"\nComparison against {previous['meta']['git_revision']} ({previous['meta']['timestamp']})")
+    print(f"{'metric':<45}{'before':>12}{'after':>12}{'change':>10}")
+    for key in sorted(new):
+        if key in old and old[key]:
+            change = (new[key] - old[key]) / old[key] * 100
+            print(f"{key:<45}{old[key]:>12.3f}{new[key]:>12.3f}{change:>+9.1f}%")
+
+
+def parse_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+async def run(args) -> Dict[str, Any]:
+    # pdf-processor/main.py is imported under a different name to avoid clashing with main() below
+    service = importlib.import_module("main")
+    from embeddings import EmbeddingManager
+
+    embedder = HashingEmbedder() if args.embedder == "hash" else EmbeddingManager()
+    install_stand_ins(service, embedder)
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        print("Extraction...")
+        extraction = bench_extraction(service.pdf_processor, workdir, parse_list(args.pages))
+
+        sample_path = os.path.join(workdir, "sample.pdf")
+        write_synthetic_pdf(sample_path, max(parse_list(args.pages)), seed=7)
+        sample_text = service.pdf_processor.extract_text_from_pdf(sample_path)
+
+        print("Chunking...")
+        chunking = bench_chunking(service.pdf_processor, sample_text, args.chunk_repeats)
+
+        print("Embeddings...")
+        chunks = service.pdf_processor.chunk_text(sample_text)[:args.embed_texts]
+        embeddings = bench_embeddings(embedder, chunks, parse_list(args.batch_sizes))
+
+        print("Ingestion...")
+        ingestion = await bench_ingestion(service, workdir, args.documents, args.ingest_pages)
+
+        print("Search...")
+        rng = random.Random(args.seed)
+        queries = [" ".join(chunk.split()[:8]) for chunk in rng.sample(chunks, min(50, len(chunks)))]
+        search = await bench_search(service, queries, parse_list(args.concurrency), args.search_requests)
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedder": embedder.model_name,
+            "args": vars(args),
+        },
+        "extraction": extraction,
+        "chunking": chunking,
+        "embeddings": embeddings,
+        "ingestion": ingestion,
+        "search": search,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingestion and search benchmarks")
+    parser.add_argument("--pages", default="1,10,50", help="Page counts for the extraction benchmark")
+    parser.add_argument("--chunk-repeats", type=int, default=20)
+    parser.add_argument("--embed-texts", type=int, default=256)
+    parser.add_argument("--batch-sizes", default="1,32,128")
+    parser.add_argument("--documents", type=int, default=10, help="Documents for the ingestion benchmark")
+    parser.add_argument("--ingest-pages", type=int, default=10)
+    parser.add_argument("--concurrency", default="1,4,16", help="Concurrency levels for /search")
+    parser.add_argument("--search-requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="Use the real embedding model or a hashing stand-in")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results path (default: benchmarks/results/<timestamp>-<rev>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    # Latencies of failed requests would measure the error path, not search
+    errors = sum(item["errors"] for item in results["search"])
+    if errors:
+        sys.exit(f"Search benchmark failed: {errors} requests did not return 200; no results written")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(ROOT, "benchmarks", "results", f"{stamp}-{results['meta']['git_revision']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({k: v for k, v in results.items() if k != "meta"}, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
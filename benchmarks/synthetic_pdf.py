@@ -0,0 +1,106 @@
+"""
+Synthetic PDF generator for benchmarks
+Writes small, valid text PDFs (Helvetica, one content stream per page)
+without any third-party dependency, so PyPDF2 extraction can be measured
+on documents of any page count.
+"""
+
+import random
+from typing import List
+
+VOCABULARY = (
+    "sipsty juice smoothie bottle organic mango orange apple lemon ginger mint "
+    "delivery order shipping return refund warranty price discount subscription "
+    "ingredient sugar vitamin calorie protein fiber storage fridge temperature "
+    "customer support account payment invoice store online product catalogue "
+    "fresh natural blend flavour recipe size litre pack box label allergen "
+    "the a of and to in for with on is are from by at per each every our your"
+).split()
+
+LINES_PER_PAGE = 60
+WORDS_PER_LINE = 12
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_page_lines(rng: random.Random, lines: int = LINES_PER_PAGE) -> List[str]:
+    """Generate one page of sentence text wrapped to fixed-width lines"""
+    words = []
+    while len(words) < lines * WORDS_PER_LINE:
+        words.extend(_sentence(rng).split())
+    return [" ".join(words[i:i + WORDS_PER_LINE]) for i in range(0, lines * WORDS_PER_LINE, WORDS_PER_LINE)]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """
+    Build a PDF document from lines of text
+
+    Args:
+        pages: One list of text lines per page
+
+    Returns:
+        PDF file content
+    """
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    next_id = 4
+    for lines in pages:
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        kids.append(page_id)
+
+        stream = "BT /F1 10 Tf 12 TL 40 770 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects[content_id] = (
+            f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1")
+        )
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode("latin-1")
+
+    objects[2] = (
+        f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+    ).encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n".encode("latin-1") + objects[obj_id] + b"\nendobj\n"
+
+    size = max(objects) + 1
+    xref_offset = len(out)
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode("latin-1")
+    for obj_id in range(1, size):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def write_synthetic_pdf(path: str, pages: int, seed: int = 0) -> List[List[str]]:
+    """
+    Write a synthetic PDF with the given number of pages
+
+    Args:
+        path: Output file path
+        pages: Number of pages
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        The generated lines per page
+    """
+    rng = random.Random(seed)
+    content = [generate_page_lines(rng) for _ in range(pages)]
+    with open(path, "wb") as f:
+        f.write(build_pdf(content))
+    return content
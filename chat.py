@@ -2,18 +2,35 @@
 
 """
 Interactive chat client for Rasa RAG Chatbot
-A simple Python script to chat with the bot in terminal
+A simple Python script to chat with the bot in terminal, plus a load
+generation mode that replays conversations from many simulated users.
+
+Usage:
+    python chat.py [rasa_url] [sender_id]
+    python chat.py --stream http://localhost:8002   # stream answers via the web UI
+    python chat.py --load loadtest_conversations.json --rate 20 --duration 60
 """
 
-import requests
+import argparse
+import asyncio
 import json
+import random
 import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import httpx
+import requests
 
 class RasaChatClient:
-    def __init__(self, rasa_url="http://localhost:5005", sender_id="user"):
+    def __init__(self, rasa_url="http://localhost:5005", sender_id="user", stream_url=None):
         self.rasa_url = rasa_url
         self.sender_id = sender_id
         self.webhook_url = f"{rasa_url}/webhooks/rest/webhook"
+        # Web UI base URL; when set, answers are streamed token by token
+        self.stream_url = stream_url
         
     def send_message(self, message):
         """Send message to Rasa and get response"""
@@ -39,6 +56,74 @@ class RasaChatClient:
         except Exception as e:
             return [{"text": f"Error: {str(e)}"}]
     
+    def stream_message(self, message):
+        """
+        Send message through the web UI streaming endpoint
+        
+        Yields (event, data) pairs as they arrive: "delta" tokens, "reset",
+        the final "message" with the Rasa responses, then "done" or "error".
+        """
+        with httpx.stream(
+            "POST",
+            f"{self.stream_url}/api/chat/stream",
+            params={"message": message, "sender": self.sender_id},
+            timeout=httpx.Timeout(10.0, read=None)
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                yield "error", {"detail": f"Server returned {response.status_code}"}
+                return
+            event, data = "message", ""
+            for line in response.iter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data += line[5:].strip()
+                elif not line and data:
+                    yield event, json.loads(data)
+                    event, data = "message", ""
+    
+    def send_message_streaming(self, message):
+        """Print the answer as it streams in and return the final responses"""
+        streamed = ""
+        responses = []
+        try:
+            for event, data in self.stream_message(message):
+                if event == "delta":
+                    if not streamed:
+                        print("🤖 Bot: ", end="", flush=True)
+                    streamed += data["text"]
+                    print(data["text"], end="", flush=True)
+                elif event == "reset" and streamed:
+                    print("\n↻ retrying...")
+                    streamed = ""
+                elif event == "message":
+                    responses = data["responses"]
+                elif event == "done" and data.get("ttft_ms") is not None:
+                    print(f"\n⏱  first token {data['ttft_ms']:.0f} ms, total {data['total_ms']:.0f} ms", end="")
+                elif event == "error":
+                    return [{"text": f"Error: {data['detail']}"}]
+        except httpx.ConnectError:
+            return [{"text": "Error: Could not connect to the web UI. Is it running?"}]
+        except Exception as e:
+            return [{"text": f"Error: {str(e)}"}]
+        
+        if not streamed:
+            return responses
+        print()
+        # The streamed answer is already on screen; show only what the final message adds (sources)
+        remaining = []
+        for response in responses:
+            text = response.get("text", "")
+            if streamed and text.startswith(streamed.strip()):
+                text = text[len(streamed.strip()):].strip()
+                streamed = ""
+                if not text:
+                    continue
+                response = dict(response, text=text)
+            remaining.append(response)
+        return remaining
+    
     def chat(self):
         """Start interactive chat session"""
         print("🤖 Rasa RAG Chatbot")
@@ -61,7 +146,10 @@ class RasaChatClient:
                     continue
                 
                 # Send message to bot
-                responses = self.send_message(user_message)
+                if self.stream_url:
+                    responses = self.send_message_streaming(user_message)
+                else:
+                    responses = self.send_message(user_message)
                 
                 # Display bot responses
                 for response in responses:
@@ -77,19 +165,218 @@ class RasaChatClient:
         except Exception as e:
             print(f"\n❌ Error: {e}")
 
+def load_conversations(path):
+    """
+    Load conversations to replay
+    
+    Accepts a scripted file ({"conversations": [{"name": ..., "turns": [{"text": ..., "intent": ...}]}]})
+    or recorded Rasa trackers (a tracker or list of trackers with an "events" list), where
+    user turns and their predicted intents are taken from the "user" events.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    
+    if isinstance(data, dict):
+        data = data.get("conversations", [data])
+    
+    conversations = []
+    for i, item in enumerate(data):
+        if "events" in item:
+            turns = [
+                {
+                    "text": event.get("text", ""),
+                    "intent": ((event.get("parse_data") or {}).get("intent") or {}).get("name") or "unlabeled"
+                }
+                for event in item["events"]
+                if event.get("event") == "user" and event.get("text")
+            ]
+            name = item.get("sender_id", f"recorded-{i}")
+        else:
+            turns = [
+                {"text": turn["text"], "intent": turn.get("intent", "unlabeled")}
+                if isinstance(turn, dict) else {"text": turn, "intent": "unlabeled"}
+                for turn in item.get("turns", [])
+            ]
+            name = item.get("name", f"scripted-{i}")
+        if turns:
+            conversations.append({"name": name, "turns": turns})
+    
+    return conversations
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class LoadGenerator:
+    """Open-loop load generator replaying multi-turn conversations against the Rasa webhook"""
+    
+    def __init__(self, rasa_url: str, conversations: List[Dict[str, Any]],
+                 rate: float = 5.0, duration: float = 60.0, think_time: float = 1.0,
+                 timeout: float = 30.0, max_connections: int = 1000, seed: int = None):
+        """
+        Initialize load generator
+        
+        Args:
+            rasa_url: Base URL of the Rasa server
+            conversations: Conversations to replay (see load_conversations)
+            rate: New conversations started per second (Poisson arrivals)
+            duration: Seconds during which new conversations are started
+            think_time: Mean pause between turns of one conversation, in seconds
+            timeout: Per-request timeout in seconds
+            max_connections: Connection pool size
+            seed: Random seed for reproducible arrival schedules
+        """
+        self.webhook_url = f"{rasa_url}/webhooks/rest/webhook"
+        self.conversations = conversations
+        self.rate = rate
+        self.duration = duration
+        self.think_time = think_time
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.rng = random.Random(seed)
+        self.run_id = uuid.uuid4().hex[:8]
+        
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.conversations_started = 0
+        self.conversations_completed = 0
+    
+    async def _send(self, client: httpx.AsyncClient, sender_id: str, turn: Dict[str, str]) -> None:
+        intent = turn["intent"]
+        start = time.perf_counter()
+        try:
+            response = await client.post(self.webhook_url, json={"sender": sender_id, "message": turn["text"]})
+            if response.status_code != 200:
+                self.errors[intent] += 1
+                return
+            response.json()
+        except Exception:
+            self.errors[intent] += 1
+            return
+        self.latencies[intent].append((time.perf_counter() - start) * 1000)
+    
+    async def _conversation(self, client: httpx.AsyncClient, number: int) -> None:
+        conversation = self.conversations[number % len(self.conversations)]
+        sender_id = f"load-{self.run_id}-{number}"
+        for i, turn in enumerate(conversation["turns"]):
+            if i and self.think_time > 0:
+                await asyncio.sleep(self.rng.expovariate(1.0 / self.think_time))
+            await self._send(client, sender_id, turn)
+        self.conversations_completed += 1
+    
+    async def run(self) -> Dict[str, Any]:
+        """Start conversations at the configured arrival rate and wait for all of them to finish"""
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            tasks = []
+            started = time.perf_counter()
+            next_arrival = started
+            
+            # Open loop: arrivals follow the schedule regardless of how slow responses are
+            while next_arrival - started < self.duration:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._conversation(client, self.conversations_started)))
+                self.conversations_started += 1
+                next_arrival += self.rng.expovariate(self.rate)
+            
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+        
+        return self.report(elapsed)
+    
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Summarize per-intent latency percentiles, error rates and throughput"""
+        intents = {}
+        for intent in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[intent])
+            total = len(values) + self.errors[intent]
+            intents[intent] = {
+                "requests": total,
+                "errors": self.errors[intent],
+                "error_rate": round(self.errors[intent] / total, 4) if total else 0.0,
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "max_ms": round(values[-1], 1) if values else 0.0,
+            }
+        
+        requests_total = sum(i["requests"] for i in intents.values())
+        errors_total = sum(i["errors"] for i in intents.values())
+        all_values = sorted(v for values in self.latencies.values() for v in values)
+        return {
+            "run_id": self.run_id,
+            "arrival_rate": self.rate,
+            "duration_s": round(elapsed, 1),
+            "conversations_started": self.conversations_started,
+            "conversations_completed": self.conversations_completed,
+            "requests": requests_total,
+            "errors": errors_total,
+            "error_rate": round(errors_total / requests_total, 4) if requests_total else 0.0,
+            "throughput_rps": round(requests_total / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(all_values, 50), 1),
+            "p95_ms": round(percentile(all_values, 95), 1),
+            "p99_ms": round(percentile(all_values, 99), 1),
+            "intents": intents,
+        }
+
+
+def print_load_report(report):
+    """Print a load test report as a table"""
+    print(f"\n📈 Load test {report['run_id']}: {report['conversations_started']} conversations "
+          f"at {report['arrival_rate']}/s over {report['duration_s']}s")
+    print(f"   {report['requests']} requests, {report['throughput_rps']} req/s, "
+          f"error rate {report['error_rate']:.2%}")
+    print(f"   overall p50 {report['p50_ms']} ms | p95 {report['p95_ms']} ms | p99 {report['p99_ms']} ms\n")
+    print(f"{'intent':<28}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for intent, stats in report["intents"].items():
+        print(f"{intent:<28}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
 def main():
     """Main function"""
     # Parse command line arguments
-    rasa_url = "http://localhost:5005"
-    sender_id = "user"
+    parser = argparse.ArgumentParser(description="Chat with the Rasa RAG chatbot or load test it")
+    parser.add_argument("rasa_url", nargs="?", default="http://localhost:5005")
+    parser.add_argument("sender_id", nargs="?", default="user")
+    parser.add_argument("--stream", metavar="WEB_UI_URL",
+                        help="Stream answers token by token through the web UI (e.g. http://localhost:8002)")
+    parser.add_argument("--load", metavar="FILE", help="Replay conversations from a script or recorded trackers")
+    parser.add_argument("--rate", type=float, default=5.0, help="New conversations per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep starting conversations")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between turns")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, help="Random seed for the arrival schedule")
+    parser.add_argument("--report", metavar="FILE", help="Write the load test report as JSON")
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1:
-        rasa_url = sys.argv[1]
-    if len(sys.argv) > 2:
-        sender_id = sys.argv[2]
+    if args.load:
+        conversations = load_conversations(args.load)
+        if not conversations:
+            print(f"❌ No conversations found in {args.load}")
+            sys.exit(1)
+        
+        generator = LoadGenerator(
+            args.rasa_url, conversations,
+            rate=args.rate, duration=args.duration, think_time=args.think_time,
+            timeout=args.timeout, seed=args.seed
+        )
+        report = asyncio.run(generator.run())
+        print_load_report(report)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+        return
     
     # Create chat client and start chatting
-    client = RasaChatClient(rasa_url, sender_id)
+    client = RasaChatClient(args.rasa_url, args.sender_id, stream_url=args.stream)
     client.chat()
 
 if __name__ == "__main__":
@@ -0,0 +1,286 @@
+"""
+DeepSeek-compatible LLM stub
+A local OpenAI/DeepSeek-style /v1/chat/completions endpoint for offline
+end-to-end testing and benchmarking of the LLM path. Point the action server
+at it with DEEPSEEK_BASE_URL=http://llm-stub:8003/v1 (any API key works unless
+STUB_API_KEY is set).
+
+Answers are built deterministically from the prompt's context. Latency is
+drawn from a configurable distribution, streamed tokens are paced at a token
+rate, and 429s (with Retry-After), 500s, hung requests and mid-stream
+disconnects can be injected at configurable rates. GET/POST /stub/config reads
+and changes the behaviour at runtime; /stub/stats counts what was served, so
+retries, coalescing and caching can be measured as upstream calls.
+
+Usage:
+    uvicorn main:app --port 8003
+    STUB_LATENCY_MS=1500 STUB_RATE_429=0.1 uvicorn main:app --port 8003
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="DeepSeek API Stub", version="1.0.0")
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Behaviour; every key can be changed at runtime through POST /stub/config
+config: Dict[str, Any] = {
+    # Time to first token: distribution, median/mean and spread (lognormal sigma,
+    # normal stddev as a fraction of the mean, uniform +/- fraction), capped
+    "latency_distribution": os.getenv("STUB_LATENCY_DISTRIBUTION", "lognormal"),
+    "latency_ms": float(os.getenv("STUB_LATENCY_MS", "800")),
+    "latency_spread": float(os.getenv("STUB_LATENCY_SPREAD", "0.5")),
+    "latency_max_ms": float(os.getenv("STUB_LATENCY_MAX_MS", "30000")),
+    # Generation speed after the first token (non-streaming responses wait for all tokens)
+    "tokens_per_second": float(os.getenv("STUB_TOKENS_PER_SECOND", "40")),
+    "completion_tokens": int(os.getenv("STUB_COMPLETION_TOKENS", "120")),
+    # Fault injection (probabilities per request)
+    "rate_429": float(os.getenv("STUB_RATE_429", "0")),
+    "rate_500": float(os.getenv("STUB_RATE_500", "0")),
+    "rate_timeout": float(os.getenv("STUB_RATE_TIMEOUT", "0")),
+    "rate_disconnect": float(os.getenv("STUB_RATE_DISCONNECT", "0")),
+    "retry_after_seconds": float(os.getenv("STUB_RETRY_AFTER_SECONDS", "1")),
+    # A "timed out" request hangs this long before the connection is closed
+    "hang_seconds": float(os.getenv("STUB_HANG_SECONDS", "120")),
+    # Concurrent requests beyond this get 429 (0 = unlimited), like a rate-limited API
+    "max_concurrency": int(os.getenv("STUB_MAX_CONCURRENCY", "0")),
+    "api_key": os.getenv("STUB_API_KEY", ""),
+}
+
+rng = random.Random(int(os.getenv("STUB_SEED")) if os.getenv("STUB_SEED") else None)
+
+stats: Dict[str, Any] = {}
+in_flight = 0
+
+WORD = re.compile(r"\S+")
+
+
+def reset_stats() -> None:
+    stats.clear()
+    stats.update({"requests": 0, "streamed": 0, "status": {}, "injected": {}, "peak_in_flight": 0,
+                  "prompt_tokens": 0, "completion_tokens": 0})
+
+
+reset_stats()
+
+
+def _count(bucket: str, key: str) -> None:
+    stats[bucket][key] = stats[bucket].get(key, 0) + 1
+
+
+def sample_latency() -> float:
+    """Seconds to the first token, drawn from the configured distribution"""
+    mean = config["latency_ms"] / 1000
+    spread = config["latency_spread"]
+    distribution = config["latency_distribution"]
+    if distribution == "fixed":
+        value = mean
+    elif distribution == "uniform":
+        value = rng.uniform(mean * (1 - spread), mean * (1 + spread))
+    elif distribution == "normal":
+        value = rng.gauss(mean, mean * spread)
+    elif distribution == "exponential":
+        value = rng.expovariate(1 / mean) if mean > 0 else 0.0
+    else:
+        # lognormal with median latency_ms: a long right tail like real APIs
+        value = mean * math.exp(rng.gauss(0, spread))
+    return min(max(value, 0.0), config["latency_max_ms"] / 1000)
+
+
+def build_answer(messages: List[Dict[str, Any]], max_tokens: int) -> List[str]:
+    """
+    Deterministic answer for a prompt, as a list of tokens (words)
+
+    Uses the context part of the last user message, so answers look like
+    extractive RAG answers and identical prompts get identical answers.
+    """
+    prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if "Context:" in prompt:
+        prompt = prompt.split("Context:", 1)[1]
+    words = WORD.findall(prompt) or ["No", "context", "was", "provided."]
+    length = max(1, min(max_tokens, config["completion_tokens"]))
+    tokens = ["Based", "on", "the", "documents,"] + [words[i % len(words)] for i in range(length)]
+    return tokens[:length]
+
+
+def error_response(status_code: int, message: str, headers: Dict[str, str] = None) -> JSONResponse:
+    """Error body in the OpenAI format"""
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": "stub_error", "code": status_code}},
+        headers=headers
+    )
+
+
+def completion_chunk(completion_id: str, model: str, delta: Dict[str, Any],
+                     finish_reason: Optional[str] = None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy"}
+
+
+@app.get("/stub/config")
+async def get_config():
+    return config
+
+
+@app.post("/stub/config")
+async def update_config(request: Request):
+    """Change stub behaviour; unknown keys are rejected"""
+    updates = await request.json()
+    unknown = set(updates) - set(config)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown settings: {', '.join(sorted(unknown))}")
+    if updates.get("latency_distribution", config["latency_distribution"]) not in DISTRIBUTIONS:
+        raise HTTPException(status_code=400, detail=f"latency_distribution must be one of {', '.join(DISTRIBUTIONS)}")
+    for key, value in updates.items():
+        config[key] = type(config[key])(value)
+    if "seed" in request.query_params:
+        rng.seed(int(request.query_params["seed"]))
+    logger.info(f"Stub config updated: {updates}")
+    return config
+
+
+@app.get("/stub/stats")
+async def get_stats():
+    return dict(stats, in_flight=in_flight)
+
+
+@app.delete("/stub/stats")
+async def clear_stats():
+    reset_stats()
+    return {"message": "Stats reset"}
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI/DeepSeek chat completions, streaming or not"""
+    global in_flight
+    stats["requests"] += 1
+
+    if config["api_key"] and request.headers.get("Authorization") != f"Bearer {config['api_key']}":
+        _count("status", "401")
+        return error_response(401, "Invalid API key")
+
+    body = await request.json()
+    messages = body.get("messages") or []
+    model = body.get("model", "deepseek-chat")
+    stream = bool(body.get("stream"))
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    # Fault injection, in the order a real API would fail
+    if config["max_concurrency"] and in_flight >= config["max_concurrency"]:
+        _count("status", "429")
+        _count("injected", "capacity")
+        return error_response(429, "Rate limit exceeded", {"Retry-After": f"{config['retry_after_seconds']:g}"})
+    draw = rng.random()
+    if draw < config["rate_429"]:
+        _count("status", "429")
+        _count("injected", "429")
+        return error_response(429, "Rate limit exceeded", {"Retry-After": f"{config['retry_after_seconds']:g}"})
+    draw -= config["rate_429"]
+    if draw < config["rate_500"]:
+        _count("status", "500")
+        _count("injected", "500")
+        return error_response(500, "Internal server error")
+    draw -= config["rate_500"]
+    hang = draw < config["rate_timeout"]
+    disconnect = not hang and rng.random() < config["rate_disconnect"]
+
+    tokens = build_answer(messages, int(body.get("max_tokens") or config["completion_tokens"]))
+    prompt_tokens = sum(len(WORD.findall(m.get("content") or "")) for m in messages)
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+             "total_tokens": prompt_tokens + len(tokens)}
+    latency = sample_latency()
+    token_interval = 1 / config["tokens_per_second"] if config["tokens_per_second"] > 0 else 0.0
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+    in_flight += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], in_flight)
+
+    if hang:
+        # The client's timeout should fire first
+        _count("injected", "timeout")
+        try:
+            await asyncio.sleep(config["hang_seconds"])
+        finally:
+            in_flight -= 1
+        _count("status", "504")
+        return error_response(504, "Upstream timeout")
+
+    if not stream:
+        try:
+            await asyncio.sleep(latency + token_interval * len(tokens))
+        finally:
+            in_flight -= 1
+        _count("status", "200")
+        stats["prompt_tokens"] += usage["prompt_tokens"]
+        stats["completion_tokens"] += usage["completion_tokens"]
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    async def events():
+        global in_flight
+        try:
+            await asyncio.sleep(latency)
+            yield completion_chunk(completion_id, model, {"role": "assistant", "content": ""})
+            # Disconnect somewhere in the middle of the answer
+            cut = rng.randint(1, max(1, len(tokens) - 1)) if disconnect else None
+            for i, token in enumerate(tokens):
+                if cut is not None and i == cut:
+                    _count("injected", "disconnect")
+                    # Raising aborts the chunked response, so the client sees a broken connection
+                    raise ConnectionAbortedError("Injected disconnect")
+                yield completion_chunk(completion_id, model, {"content": token if i == 0 else f" {token}"})
+                if token_interval:
+                    await asyncio.sleep(token_interval)
+            yield completion_chunk(completion_id, model, {}, "stop")
+            if include_usage:
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["prompt_tokens"] += usage["prompt_tokens"]
+            stats["completion_tokens"] += usage["completion_tokens"]
+        finally:
+            in_flight -= 1
+
+    _count("status", "200")
+    stats["streamed"] += 1
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
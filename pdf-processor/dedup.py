@@ -0,0 +1,286 @@
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Redis key layout of the persistent MinHash-LSH index
+SIGNATURE_KEY = "dedup:sig:{}"            # canonical chunk id -> signature (hex)
+BAND_KEY = "dedup:band:{}:{}"             # band number, band hash -> set of canonical chunk ids
+REFERENCES_KEY = "dedup:refs:{}"          # canonical chunk id -> set of referencing chunk ids
+REFERENCE_KEY = "dedup:ref:{}"            # referencing chunk id -> hash (canonical, file_id, filename, chunk_id)
+FILE_REFERENCES_KEY = "dedup:file:{}:refs"  # file id -> set of its referencing chunk ids
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def lsh_parameters(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Choose the number of bands and rows per band for a similarity threshold
+
+    Two signatures share at least one band with probability
+    1 - (1 - s^r)^b; its steepest point is near (1/b)^(1/r), which is
+    placed as close to the threshold as the divisors of num_perm allow.
+
+    Args:
+        num_perm: Signature length
+        threshold: Jaccard similarity above which chunks are duplicates
+
+    Returns:
+        Tuple of (bands, rows)
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class ChunkDeduplicator:
+    def __init__(self, redis_client, threshold: float = None, num_perm: int = None,
+                 shingle_size: int = None, seed: int = 1):
+        """
+        Initialize near-duplicate chunk detection backed by a MinHash-LSH index in Redis
+
+        Args:
+            redis_client: Redis client (decode_responses=True) holding the index
+            threshold: Estimated Jaccard similarity of word shingles at which
+                a chunk is treated as a duplicate of an existing one
+            num_perm: Number of MinHash permutations (signature length)
+            shingle_size: Words per shingle
+            seed: Seed for the permutations; must not change once the index has data
+        """
+        self.redis_client = redis_client
+        self.threshold = threshold if threshold is not None else float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+        self.num_perm = num_perm or int(os.getenv("DEDUP_NUM_PERM", "128"))
+        self.shingle_size = shingle_size or int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+        self.bands, self.rows = lsh_parameters(self.num_perm, self.threshold)
+
+        # Universal hash family h(x) = (a * x + b) mod p; a, b < 2^31 and
+        # x < 2^32 keep the intermediate product within uint64
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=self.num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=self.num_perm, dtype=np.int64).astype(np.uint64)
+
+        logger.info(
+            f"Chunk deduplication: threshold {self.threshold}, {self.num_perm} permutations, "
+            f"{self.bands} bands x {self.rows} rows"
+        )
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Hash the word shingles of a text to unique 32-bit values"""
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        size = min(self.shingle_size, len(tokens)) or 1
+        grams = {" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+        return np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little") for g in grams),
+            dtype=np.uint64, count=len(grams)
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text as uint32 array of length num_perm"""
+        hashes = self.shingles(text)
+        permuted = (hashes[:, np.newaxis] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        bands = signature.reshape(self.bands, self.rows)
+        return [
+            BAND_KEY.format(i, hashlib.blake2b(band.tobytes(), digest_size=8).hexdigest())
+            for i, band in enumerate(bands)
+        ]
+
+    def similarity(self, sig1: np.ndarray, sig2: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(sig1 == sig2))
+
+    def find_duplicates(self, chunk_ids: List[str], chunks: List[str]) -> Tuple[Dict[int, str], List[np.ndarray]]:
+        """
+        Find chunks that are near-duplicates of indexed chunks or of earlier
+        chunks in the same list
+
+        Args:
+            chunk_ids: IDs the chunks would be stored under
+            chunks: Chunk texts
+
+        Returns:
+            Tuple of (mapping of chunk index to the canonical chunk ID it
+            duplicates, with unique chunks absent; MinHash signature per chunk)
+        """
+        signatures = [self.signature(chunk) for chunk in chunks]
+        all_band_keys = [self.band_keys(sig) for sig in signatures]
+
+        # Look up every band of every chunk in one round trip
+        pipe = self.redis_client.pipeline()
+        for keys in all_band_keys:
+            for key in keys:
+                pipe.smembers(key)
+        members = pipe.execute()
+
+        candidates_per_chunk = []
+        for n in range(len(chunks)):
+            candidates = set()
+            for found in members[n * self.bands:(n + 1) * self.bands]:
+                candidates.update(found)
+            candidates_per_chunk.append(sorted(candidates))
+
+        # Fetch candidate signatures to confirm the estimated similarity
+        candidate_ids = sorted({c for cands in candidates_per_chunk for c in cands})
+        stored = {}
+        if candidate_ids:
+            values = self.redis_client.mget([SIGNATURE_KEY.format(c) for c in candidate_ids])
+            stored = {
+                c: np.frombuffer(bytes.fromhex(v), dtype=np.uint32)
+                for c, v in zip(candidate_ids, values) if v
+            }
+
+        duplicates: Dict[int, str] = {}
+        local_bands: Dict[str, List[int]] = {}
+        for n, signature in enumerate(signatures):
+            best_id, best_score = None, self.threshold
+            for candidate in candidates_per_chunk[n]:
+                if candidate in stored:
+                    score = self.similarity(signature, stored[candidate])
+                    if score >= best_score:
+                        best_id, best_score = candidate, score
+
+            # Earlier unique chunks of this document are not in Redis yet
+            for earlier in {i for key in all_band_keys[n] for i in local_bands.get(key, ())}:
+                score = self.similarity(signature, signatures[earlier])
+                if score >= best_score:
+                    best_id, best_score = chunk_ids[earlier], score
+
+            if best_id is not None:
+                duplicates[n] = best_id
+            else:
+                for key in all_band_keys[n]:
+                    local_bands.setdefault(key, []).append(n)
+
+        return duplicates, signatures
+
+    def index(self, file_id: str, filename: str, chunk_ids: List[str],
+              duplicates: Dict[int, str], signatures: List[np.ndarray]) -> None:
+        """
+        Persist the signatures of newly stored chunks and the references of
+        duplicate ones, after the vectors have been written
+
+        Args:
+            file_id: Document the chunks belong to
+            filename: Original file name
+            chunk_ids: IDs of all chunks, as passed to find_duplicates
+            duplicates: Mappings returned by find_duplicates
+            signatures: Signatures returned by find_duplicates
+        """
+        pipe = self.redis_client.pipeline()
+        for n, chunk_id in enumerate(chunk_ids):
+            canonical = duplicates.get(n)
+            if canonical is None:
+                signature = signatures[n]
+                pipe.set(SIGNATURE_KEY.format(chunk_id), signature.tobytes().hex())
+                for key in self.band_keys(signature):
+                    pipe.sadd(key, chunk_id)
+            else:
+                pipe.hset(REFERENCE_KEY.format(chunk_id), mapping={
+                    "canonical": canonical, "file_id": file_id, "filename": filename, "chunk_id": n
+                })
+                pipe.sadd(REFERENCES_KEY.format(canonical), chunk_id)
+                pipe.sadd(FILE_REFERENCES_KEY.format(file_id), chunk_id)
+        pipe.execute()
+
+    def reference_counts(self, chunk_ids: List[str]) -> List[int]:
+        """Number of duplicate chunks referencing each canonical chunk"""
+        pipe = self.redis_client.pipeline()
+        for chunk_id in chunk_ids:
+            pipe.scard(REFERENCES_KEY.format(chunk_id))
+        return pipe.execute()
+
+    def remove_file(self, file_id: str, canonical_ids: List[str]) -> Tuple[List[str], Dict[str, Dict[str, str]]]:
+        """
+        Remove a document from the index
+
+        The document's references are dropped. Its canonical chunks that are
+        still referenced by other documents are kept and handed over to one
+        of those references, so the other documents keep their content.
+
+        Args:
+            file_id: Document being deleted
+            canonical_ids: IDs of the document's stored (canonical) chunks
+
+        Returns:
+            Tuple of (chunk IDs whose vectors can be deleted,
+            {chunk ID: new metadata} for vectors to keep under a new owner)
+        """
+        own_refs = self.redis_client.smembers(FILE_REFERENCES_KEY.format(file_id))
+        pipe = self.redis_client.pipeline()
+        for ref in own_refs:
+            pipe.hget(REFERENCE_KEY.format(ref), "canonical")
+        canonicals = pipe.execute() if own_refs else []
+
+        pipe = self.redis_client.pipeline()
+        for ref, canonical in zip(own_refs, canonicals):
+            pipe.delete(REFERENCE_KEY.format(ref))
+            if canonical:
+                pipe.srem(REFERENCES_KEY.format(canonical), ref)
+        pipe.delete(FILE_REFERENCES_KEY.format(file_id))
+        pipe.execute()
+
+        to_delete, rehomed = [], {}
+        for chunk_id in canonical_ids:
+            refs = self.redis_client.smembers(REFERENCES_KEY.format(chunk_id))
+            if not refs:
+                to_delete.append(chunk_id)
+                continue
+
+            # Promote the first remaining reference to owner of the stored chunk
+            promoted = sorted(refs)[0]
+            record = self.redis_client.hgetall(REFERENCE_KEY.format(promoted))
+            pipe = self.redis_client.pipeline()
+            pipe.delete(REFERENCE_KEY.format(promoted))
+            pipe.srem(REFERENCES_KEY.format(chunk_id), promoted)
+            pipe.srem(FILE_REFERENCES_KEY.format(record.get("file_id")), promoted)
+            pipe.execute()
+            rehomed[chunk_id] = {
+                "file_id": record.get("file_id"),
+                "filename": record.get("filename"),
+                "chunk_id": int(record.get("chunk_id", 0))
+            }
+
+        self._drop_signatures(to_delete)
+        return to_delete, rehomed
+
+    def _drop_signatures(self, chunk_ids: List[str]) -> None:
+        if not chunk_ids:
+            return
+        values = self.redis_client.mget([SIGNATURE_KEY.format(c) for c in chunk_ids])
+        pipe = self.redis_client.pipeline()
+        for chunk_id, value in zip(chunk_ids, values):
+            if value:
+                signature = np.frombuffer(bytes.fromhex(value), dtype=np.uint32)
+                for key in self.band_keys(signature):
+                    pipe.srem(key, chunk_id)
+            pipe.delete(SIGNATURE_KEY.format(chunk_id), REFERENCES_KEY.format(chunk_id))
+        pipe.execute()
+
+
+def clear_index(redis_client) -> int:
+    """Delete the whole deduplication index; returns the number of keys removed"""
+    removed = 0
+    keys = []
+    for key in redis_client.scan_iter("dedup:*", count=1000):
+        keys.append(key)
+        if len(keys) >= 1000:
+            removed += redis_client.delete(*keys)
+            keys = []
+    if keys:
+        removed += redis_client.delete(*keys)
+    return removed
@@ -3,22 +3,33 @@ import logging
 from typing import List
 import numpy as np
 import os
+import time
+
+from instrumentation import Instrumentation
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingManager:
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, dimensions: int = None,
+                 instrumentation: Instrumentation = None):
         """
         Initialize embedding manager with sentence transformer model
         
         Args:
             model_name: Name of the sentence transformer model
+            dimensions: Keep only the first N dimensions (Matryoshka truncation);
+                0 or None keeps the full model dimensionality
+            instrumentation: Receives the inference time of every batch
         """
         # Use environment variable if model_name not provided
         if model_name is None:
             model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        if dimensions is None:
+            dimensions = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
             
         self.model_name = model_name
+        self.dimensions = dimensions or None
+        self.instrumentation = instrumentation or Instrumentation()
         try:
             # Set cache directory from environment or default
             cache_dir = os.getenv("SENTENCE_TRANSFORMERS_HOME", "/tmp/sentence_transformers")
@@ -39,7 +50,35 @@ class EmbeddingManager:
                 logger.error(f"Fallback model also failed: {e2}")
                 raise Exception(f"Could not load any embedding model. Original error: {e}, Fallback error: {e2}")
 
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        if self.dimensions:
+            logger.info(f"Truncating embeddings to {self.dimensions} dimensions")
+
+    @property
+    def embedding_dimensions(self) -> int:
+        """Dimensionality of the vectors returned by generate_embeddings"""
+        full_dimensions = self.model.get_sentence_embedding_dimension()
+        if self.dimensions:
+            return min(self.dimensions, full_dimensions)
+        return full_dimensions
+
+    @staticmethod
+    def truncate(embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+        """
+        Truncate embeddings to their first dimensions and re-normalize
+        
+        Args:
+            embeddings: Array of shape (n, dim)
+            dimensions: Number of leading dimensions to keep
+            
+        Returns:
+            Unit-length float32 array of shape (n, dimensions)
+        """
+        truncated = np.ascontiguousarray(embeddings[:, :dimensions], dtype=np.float32)
+        norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return truncated / norms
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts
         
@@ -47,20 +86,22 @@ class EmbeddingManager:
             texts: List of text strings
             
         Returns:
-            List of embedding vectors
+            Float32 array of shape (len(texts), embedding_dimensions)
         """
         try:
             if not texts:
-                return []
+                return np.empty((0, self.embedding_dimensions), dtype=np.float32)
             
             logger.info(f"Generating embeddings for {len(texts)} texts")
             
             # Generate embeddings
-            embeddings = self.model.encode(texts, convert_to_tensor=False)
+            start = time.perf_counter()
+            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            self.instrumentation.embedded(texts, time.perf_counter() - start)
             
-            # Convert to list format
-            if isinstance(embeddings, np.ndarray):
-                embeddings = embeddings.tolist()
+            if self.dimensions and self.dimensions < embeddings.shape[1]:
+                embeddings = self.truncate(embeddings, self.dimensions)
             
             logger.info(f"Successfully generated {len(embeddings)} embeddings")
             return embeddings
@@ -69,7 +110,25 @@ class EmbeddingManager:
             logger.error(f"Error generating embeddings: {e}")
             raise
 
-    def generate_single_embedding(self, text: str) -> List[float]:
+    def warm_up(self, batch_size: int = 8) -> float:
+        """
+        Run a dummy batch through the model so the first real request
+        doesn't pay for lazy initialization (kernel selection, allocations)
+        
+        Args:
+            batch_size: Number of dummy texts to encode
+            
+        Returns:
+            Warm-up time in seconds
+        """
+        start = time.perf_counter()
+        texts = ["Warm-up sentence for the embedding model."] * max(batch_size, 1)
+        self.model.encode(texts, convert_to_numpy=True)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Embedding model warmed up in {elapsed:.2f}s")
+        return elapsed
+
+    def generate_single_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text
         
@@ -80,14 +139,13 @@ class EmbeddingManager:
             Embedding vector
         """
         try:
-            embeddings = self.generate_embeddings([text])
-            return embeddings[0] if embeddings else []
+            return self.generate_embeddings([text])[0]
             
         except Exception as e:
             logger.error(f"Error generating single embedding: {e}")
             raise
 
-    def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
+    def calculate_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
         """
         Calculate cosine similarity between two embeddings
         
@@ -117,8 +175,8 @@ class EmbeddingManager:
             logger.error(f"Error calculating similarity: {e}")
             return 0.0
 
-    def find_most_similar(self, query_embedding: List[float], 
-                         candidate_embeddings: List[List[float]], 
+    def find_most_similar(self, query_embedding: np.ndarray, 
+                         candidate_embeddings: np.ndarray, 
                          top_k: int = 5) -> List[tuple]:
         """
         Find most similar embeddings to query
@@ -132,17 +190,19 @@ class EmbeddingManager:
             List of tuples (index, similarity_score) sorted by similarity
         """
         try:
-            similarities = []
-            
-            for i, candidate in enumerate(candidate_embeddings):
-                similarity = self.calculate_similarity(query_embedding, candidate)
-                similarities.append((i, similarity))
+            query = np.asarray(query_embedding, dtype=np.float32)
+            candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+            if candidates.size == 0:
+                return []
             
-            # Sort by similarity score (descending)
-            similarities.sort(key=lambda x: x[1], reverse=True)
+            # Cosine similarity against all candidates at once
+            norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(query)
+            norms[norms == 0] = np.inf
+            similarities = (candidates @ query) / norms
             
-            # Return top_k results
-            return similarities[:top_k]
+            # Return top_k results sorted by similarity score (descending)
+            top = np.argsort(-similarities)[:top_k]
+            return [(int(i), float(similarities[i])) for i in top]
             
         except Exception as e:
             logger.error(f"Error finding most similar embeddings: {e}")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Embedding storage evaluation
+Reports the recall / latency / memory trade-off of each storage precision
+and truncated dimensionality against the full float32 baseline.
+
+Usage:
+    python evaluate_quantization.py --pdf-dir ./samples
+    python evaluate_quantization.py --texts passages.txt --queries questions.txt --dims 384,256,128
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from embeddings import EmbeddingManager
+from pdf_processor import PDFProcessor
+from quantization import EmbeddingQuantizer, SUPPORTED_PRECISIONS
+
+
+def load_corpus(args) -> List[str]:
+    """Load passages from a text file (one per line) or a directory of PDFs"""
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    processor = PDFProcessor()
+    passages = []
+    for filename in sorted(os.listdir(args.pdf_dir)):
+        if filename.lower().endswith(".pdf"):
+            passages.extend(processor.extract_and_chunk_text(os.path.join(args.pdf_dir, filename)))
+    return passages
+
+
+def load_queries(args, corpus: List[str]) -> List[str]:
+    """Load queries from a file, or derive them from the first sentence of sampled passages"""
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    rng = random.Random(args.seed)
+    sample = rng.sample(corpus, min(args.num_queries, len(corpus)))
+    return [re.split(r"(?<=[.!?])\s+", passage)[0][:200] for passage in sample]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row"""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, part, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
+
+
+def evaluate(doc_embeddings: np.ndarray, query_embeddings: np.ndarray,
+             precision: str, dimensions: int, k: int, baseline: np.ndarray) -> dict:
+    """Evaluate one storage configuration"""
+    quantizer = EmbeddingQuantizer(precision)
+
+    docs = EmbeddingManager.truncate(doc_embeddings, dimensions)
+    queries = EmbeddingManager.truncate(query_embeddings, dimensions)
+    codes, scales = quantizer.quantize(docs)
+
+    latencies = []
+    hits = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        scores = quantizer.scores(codes, scales, queries[i])
+        found = top_k(scores, k)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits.append(len(set(found.tolist()) & set(baseline[i].tolist())) / len(baseline[i]))
+
+    bytes_per_vector = quantizer.bytes_per_vector(dimensions)
+    return {
+        "precision": precision,
+        "dimensions": dimensions,
+        f"recall@{k}": round(float(np.mean(hits)), 4),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 4),
+        "bytes_per_vector": bytes_per_vector,
+        "index_mb": round(bytes_per_vector * len(docs) / (1024 * 1024), 3),
+        "compression": round(doc_embeddings.shape[1] * 4 / bytes_per_vector, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate embedding storage precision and truncation")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pdf-dir", help="Directory of PDFs to chunk and embed")
+    source.add_argument("--texts", help="Text file with one passage per line")
+    parser.add_argument("--queries", help="Text file with one query per line")
+    parser.add_argument("--num-queries", type=int, default=100, help="Queries to sample when --queries is not given")
+    parser.add_argument("--precisions", default=",".join(SUPPORTED_PRECISIONS))
+    parser.add_argument("--dims", default="", help="Comma separated dimensions (default: full, 1/2, 1/3)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    if not corpus:
+        print("No passages found", file=sys.stderr)
+        sys.exit(1)
+    queries = load_queries(args, corpus)
+
+    # Embed once at full dimensionality; every configuration is derived from it
+    manager = EmbeddingManager(dimensions=0)
+    doc_embeddings = manager.generate_embeddings(corpus)
+    query_embeddings = manager.generate_embeddings(queries)
+    full_dimensions = doc_embeddings.shape[1]
+
+    if args.dims:
+        dims = [int(d) for d in args.dims.split(",")]
+    else:
+        dims = [full_dimensions, full_dimensions // 2, full_dimensions // 3]
+
+    baseline = top_k(query_embeddings @ doc_embeddings.T, args.k)
+
+    results = []
+    for dimensions in dims:
+        for precision in args.precisions.split(","):
+            results.append(evaluate(doc_embeddings, query_embeddings, precision.strip(),
+                                    dimensions, args.k, baseline))
+
+    print(f"Model: {manager.model_name} | passages: {len(corpus)} | queries: {len(queries)}")
+    header = f"{'precision':<10}{'dims':>6}{'recall@' + str(args.k):>12}{'p50 ms':>10}{'p95 ms':>10}{'bytes/vec':>11}{'index MB':>10}{'ratio':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['precision']:<10}{r['dimensions']:>6}{r[f'recall@{args.k}']:>12.4f}"
+              f"{r['latency_p50_ms']:>10.3f}{r['latency_p95_ms']:>10.3f}"
+              f"{r['bytes_per_vector']:>11}{r['index_mb']:>10.3f}{r['compression']:>7.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "model": manager.model_name,
+                "passages": len(corpus),
+                "queries": len(queries),
+                "k": args.k,
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
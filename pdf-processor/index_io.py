@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Bulk export / import of the vector index
+Dumps ids, documents, metadata and embeddings of a collection into a
+directory of columnar files and restores it without re-embedding anything.
+
+Layout of an export directory:
+    manifest.json     - collection name, row count, dimensions, precision, document records
+    embeddings.npy    - (count, dim) matrix in the storage precision (memory-mappable)
+    scales.npy        - (count,) float32 per-vector scales (int8 precision)
+    records.parquet   - id, document, JSON-encoded metadata and sentence index,
+                        one row group per batch
+
+Usage:
+    python index_io.py export /app/exports/backup-2024-01-01
+    python index_io.py import /app/exports/backup-2024-01-01 --replace
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dedup import clear_index
+from quantization import EmbeddingQuantizer, to_chroma
+from sentence_index import clear_sentence_indexes, load_sentence_indexes, split_index_fields, store_sentence_indexes
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+
+# Incremented whenever the indexed content changes, so caches built on
+# search results can tell they are stale
+KB_GENERATION_KEY = "kb:generation"
+# Pub/sub channel announcing each change with its generation (ingested,
+# deleted, cleared, imported), so stats can be maintained incrementally
+KB_EVENTS_CHANNEL = "kb:events"
+# Chunk texts sent with an "ingested" event (dashboard samples)
+KB_EVENT_SAMPLES = 3
+
+RECORD_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("document", pa.string()),
+    ("metadata", pa.string()),
+    # JSON sentence index (null without one); missing in older exports
+    ("sentence_index", pa.string()),
+])
+
+
+def export_collection(chroma_client, collection_name: str, output_dir: str,
+                      redis_client=None, quantizer: EmbeddingQuantizer = None,
+                      batch_size: int = None) -> Dict[str, Any]:
+    """
+    Export a Chroma collection to a directory of columnar files
+
+    Args:
+        chroma_client: Chroma client
+        collection_name: Collection to export
+        output_dir: Target directory (created if missing)
+        redis_client: Optional Redis client; document records and sentence
+            indexes are exported with the vectors
+        quantizer: Storage precision for the embedding matrix (defaults to EMBEDDING_PRECISION)
+        batch_size: Rows fetched from Chroma per request
+
+    Returns:
+        The written manifest
+    """
+    quantizer = quantizer or EmbeddingQuantizer()
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    os.makedirs(output_dir, exist_ok=True)
+
+    collection = chroma_client.get_collection(collection_name)
+    count = collection.count()
+
+    first = collection.get(limit=1, include=["embeddings"])
+    dimensions = len(first["embeddings"][0]) if first["ids"] else 0
+
+    logger.info(f"Exporting {count} rows ({dimensions} dims, {quantizer.precision}) to {output_dir}")
+
+    embeddings_path = os.path.join(output_dir, "embeddings.npy")
+    scales_path = os.path.join(output_dir, "scales.npy")
+    if count == 0:
+        # NumPy cannot memory-map zero-length arrays
+        np.save(embeddings_path, np.empty((0, dimensions), dtype=np.dtype(quantizer.precision)))
+        np.save(scales_path, np.empty((0,), dtype=np.float32))
+        codes = scales = None
+    else:
+        codes = np.lib.format.open_memmap(
+            embeddings_path, mode="w+",
+            dtype=np.dtype(quantizer.precision), shape=(count, dimensions)
+        )
+        scales = np.lib.format.open_memmap(
+            scales_path, mode="w+",
+            dtype=np.float32, shape=(count,)
+        )
+
+    written = 0
+    with pq.ParquetWriter(os.path.join(output_dir, "records.parquet"), RECORD_SCHEMA) as writer:
+        while written < count:
+            batch = collection.get(
+                limit=min(batch_size, count - written),
+                offset=written,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not batch["ids"]:
+                break
+
+            rows = len(batch["ids"])
+            batch_codes, batch_scales = quantizer.quantize(np.asarray(batch["embeddings"], dtype=np.float32))
+            codes[written:written + rows] = batch_codes
+            scales[written:written + rows] = batch_scales
+
+            indexes = load_sentence_indexes(redis_client, batch["ids"]) if redis_client is not None else []
+            writer.write_table(pa.table({
+                "id": batch["ids"],
+                "document": batch["documents"],
+                "metadata": [json.dumps(m or {}) for m in batch["metadatas"]],
+                "sentence_index": [json.dumps(index) if index else None for index in indexes] or [None] * rows,
+            }, schema=RECORD_SCHEMA))
+
+            written += rows
+            logger.info(f"Exported {written}/{count} rows")
+
+    if codes is not None:
+        codes.flush()
+        scales.flush()
+    del codes, scales
+
+    documents = []
+    if redis_client is not None:
+        for key in redis_client.scan_iter("pdf:*"):
+            record = redis_client.hgetall(key)
+            if record:
+                documents.append({"file_id": key.split(":", 1)[1], **record})
+
+    # The matrices are preallocated for the initial count; rows past `count`
+    # (if the collection shrank during export) are ignored on import.
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "collection": collection_name,
+        "collection_metadata": collection.metadata or {},
+        "count": written,
+        "dimensions": dimensions,
+        "precision": quantizer.precision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "documents": documents,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Export complete: {written} rows, {len(documents)} document records")
+    return manifest
+
+
+def import_collection(chroma_client, input_dir: str, collection_name: Optional[str] = None,
+                      redis_client=None, replace: bool = False,
+                      batch_size: int = None) -> Dict[str, Any]:
+    """
+    Bulk-load an export directory into a Chroma collection
+
+    The embedding matrix is memory-mapped and streamed to Chroma in large
+    batches next to the matching Parquet row groups; the model is never used.
+
+    Args:
+        chroma_client: Chroma client
+        input_dir: Directory written by export_collection
+        collection_name: Target collection (defaults to the exported name)
+        redis_client: Optional Redis client; document records and sentence
+            indexes are restored when given
+        replace: Drop the target collection (and with redis_client its
+            document records and indexes) before loading
+        batch_size: Rows sent to Chroma per request
+
+    Returns:
+        Summary with the number of rows and documents imported
+    """
+    with open(os.path.join(input_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported export format version: {manifest.get('format_version')}")
+
+    collection_name = collection_name or manifest["collection"]
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    batch_size = min(batch_size, getattr(chroma_client, "max_batch_size", batch_size) or batch_size)
+    quantizer = EmbeddingQuantizer(manifest["precision"])
+    count = manifest["count"]
+
+    if replace:
+        try:
+            chroma_client.delete_collection(collection_name)
+        except Exception:
+            pass
+        # Document and batch records and the near-duplicate and sentence
+        # indexes refer to the dropped collection, as after clearing it
+        if redis_client is not None:
+            for pattern in ("pdf:*", "batch:*"):
+                keys = list(redis_client.scan_iter(pattern))
+                if keys:
+                    redis_client.delete(*keys)
+            clear_index(redis_client)
+            clear_sentence_indexes(redis_client)
+            bump_kb_generation(redis_client, collection_name, {"type": "cleared"})
+    collection = chroma_client.get_or_create_collection(
+        name=collection_name,
+        metadata=manifest.get("collection_metadata") or None
+    )
+
+    mmap_mode = "r" if count else None
+    codes = np.load(os.path.join(input_dir, "embeddings.npy"), mmap_mode=mmap_mode)
+    scales = np.load(os.path.join(input_dir, "scales.npy"), mmap_mode=mmap_mode)
+
+    logger.info(f"Importing {count} rows into '{collection_name}' in batches of {batch_size}")
+
+    loaded = 0
+    records = pq.ParquetFile(os.path.join(input_dir, "records.parquet"))
+    for batch in records.iter_batches(batch_size=batch_size):
+        if loaded >= count:
+            break
+        columns = batch.to_pydict()
+        rows = min(len(columns["id"]), count - loaded)
+
+        ids = columns["id"][:rows]
+        # Older exports carry the sentence index in the chunk metadata; it moves to Redis
+        metadatas, indexes = [], {}
+        for chunk_id, metadata, index in zip(ids, columns["metadata"][:rows],
+                                             columns.get("sentence_index") or [None] * rows):
+            metadata, legacy_index = split_index_fields(json.loads(metadata))
+            metadatas.append(metadata)
+            if index or legacy_index:
+                indexes[chunk_id] = json.loads(index) if index else legacy_index
+
+        embeddings = quantizer.dequantize(codes[loaded:loaded + rows], scales[loaded:loaded + rows])
+        collection.upsert(
+            ids=ids,
+            embeddings=to_chroma(embeddings),
+            documents=columns["document"][:rows],
+            metadatas=metadatas
+        )
+        if redis_client is not None and indexes:
+            store_sentence_indexes(redis_client, list(indexes), list(indexes.values()))
+
+        loaded += rows
+        logger.info(f"Imported {loaded}/{count} rows")
+
+    documents = manifest.get("documents", [])
+    if redis_client is not None:
+        pipe = redis_client.pipeline()
+        for record in documents:
+            record = dict(record)
+            file_id = record.pop("file_id")
+            pipe.hset(f"pdf:{file_id}", mapping=record)
+        pipe.execute()
+        bump_kb_generation(redis_client, collection_name, {"type": "imported", "rows": loaded})
+
+    logger.info(f"Import complete: {loaded} rows, {len(documents)} document records")
+    return {"collection": collection_name, "rows": loaded, "documents": len(documents)}
+
+
+def bump_kb_generation(redis_client, collection_name: str, event: Dict[str, Any]) -> int:
+    """
+    Mark the indexed content as changed and announce the change
+
+    Args:
+        redis_client: Redis client
+        collection_name: Collection that changed
+        event: What changed ("type" plus details); the collection and the
+            new generation are added before it is published
+
+    Returns:
+        The new generation
+    """
+    generation = redis_client.incr(KB_GENERATION_KEY)
+    publish_kb_event(redis_client, dict(event, collection=collection_name, generation=generation))
+    return generation
+
+
+def publish_kb_event(redis_client, event: Dict[str, Any]) -> None:
+    """Announce a knowledge-base change on KB_EVENTS_CHANNEL (best effort)"""
+    try:
+        redis_client.publish(KB_EVENTS_CHANNEL, json.dumps(event))
+    except Exception as e:
+        logger.warning(f"Failed to publish knowledge-base event: {e}")
+
+
+def list_exports(export_dir: str) -> List[Dict[str, Any]]:
+    """
+    List export directories with their manifest summary
+
+    Args:
+        export_dir: Parent directory holding exports
+
+    Returns:
+        One entry per export, newest first
+    """
+    exports = []
+    if not os.path.isdir(export_dir):
+        return exports
+
+    for name in os.listdir(export_dir):
+        manifest_path = os.path.join(export_dir, name, "manifest.json")
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            exports.append({
+                "name": name,
+                "collection": manifest.get("collection"),
+                "count": manifest.get("count"),
+                "dimensions": manifest.get("dimensions"),
+                "precision": manifest.get("precision"),
+                "created_at": manifest.get("created_at"),
+            })
+
+    exports.sort(key=lambda e: e.get("created_at") or "", reverse=True)
+    return exports
+
+
+def main():
+    import chromadb
+    import redis
+
+    parser = argparse.ArgumentParser(description="Export or import the vector index")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Export directory")
+    parser.add_argument("--collection", help="Collection name (default: COLLECTION_NAME on export, exported name on import)")
+    parser.add_argument("--precision", help="Embedding precision for export (default: EMBEDDING_PRECISION)")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--replace", action="store_true", help="Drop the target collection before import")
+    parser.add_argument("--no-redis", action="store_true", help="Skip document records in Redis")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    chroma_client = chromadb.HttpClient(
+        host=os.getenv("CHROMA_HOST", "localhost"),
+        port=int(os.getenv("CHROMA_PORT", "8000"))
+    )
+    redis_client = None
+    if not args.no_redis:
+        redis_client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            decode_responses=True
+        )
+
+    if args.command == "export":
+        collection_name = args.collection or os.getenv("COLLECTION_NAME", "pdf_documents")
+        export_collection(chroma_client, collection_name, args.path,
+                          redis_client=redis_client,
+                          quantizer=EmbeddingQuantizer(args.precision),
+                          batch_size=args.batch_size)
+    else:
+        import_collection(chroma_client, args.path, collection_name=args.collection,
+                          redis_client=redis_client, replace=args.replace,
+                          batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
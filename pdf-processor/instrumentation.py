@@ -0,0 +1,29 @@
+"""
+Instrumentation hooks of the embedding and retrieval modules
+EmbeddingManager and Retriever report through an Instrumentation object
+instead of importing a metrics or tracing module, so the action server can
+import them for in-process retrieval (RETRIEVAL_MODE=local) and record into
+its own metrics. This base class records nothing; each service passes a
+subclass wired to its metrics and trace.
+"""
+
+from contextlib import nullcontext
+from typing import ContextManager, List
+
+
+class Instrumentation:
+    """Hooks called by EmbeddingManager and Retriever; the defaults do nothing"""
+
+    def span(self, name: str) -> ContextManager:
+        """Times a step of the current request's trace"""
+        return nullcontext()
+
+    def chroma_call(self, operation: str) -> ContextManager:
+        """Times one Chroma call (get_collection, query)"""
+        return nullcontext()
+
+    def embedded(self, texts: List[str], seconds: float) -> None:
+        """Called after the model embedded a batch of texts"""
+
+    def search_results(self, count: int) -> None:
+        """Called with the number of results a search returned"""
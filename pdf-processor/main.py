@@ -1,17 +1,72 @@
 import asyncio
+import json
 import logging
 import os
+import re
+import time
 import uuid
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 
 import aiofiles
 import chromadb
-import redis
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+import redis.asyncio as aioredis
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from pdf_processor import PDFProcessor
+from dedup import ChunkDeduplicator, clear_index
 from embeddings import EmbeddingManager
+from quantization import EmbeddingQuantizer, to_chroma
+from sentence_index import (
+    SENTENCE_INDEX_ENABLED,
+    build_sentence_index,
+    clear_sentence_indexes,
+    delete_sentence_indexes,
+    store_sentence_indexes,
+)
+from retrieval import Retriever
+from index_io import (
+    KB_EVENT_SAMPLES,
+    KB_GENERATION_KEY,
+    bump_kb_generation as bump_collection_generation,
+    export_collection,
+    import_collection,
+    list_exports,
+)
+from progress import (
+    BATCH_CHANNEL,
+    BATCH_FILES_KEY,
+    FILE_CHANNEL,
+    TERMINAL_STAGES,
+    ProgressBroker,
+    ProgressTracker,
+    event_from_record,
+    stream_progress,
+)
+from metrics import (
+    CHROMA_SECONDS,
+    DEDUP_CHUNKS_TOTAL,
+    DEPENDENCY_INIT_SECONDS,
+    DEPENDENCY_READY,
+    HTTP_REQUEST_SECONDS,
+    INGESTION_QUEUE_DEPTH,
+    INGESTION_SECONDS,
+    INGESTION_TOTAL,
+    SEARCH_SECONDS,
+    InstrumentedRedis,
+    ServiceInstrumentation,
+)
+from tracing import (
+    PROFILE_HEADER,
+    TRACE_HEADER,
+    SamplingProfiler,
+    finish_profile,
+    should_profile,
+    span,
+    start_trace,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,92 +80,247 @@ CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/uploads")
+EXPORT_DIR = os.getenv("EXPORT_DIR", "/app/exports")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "pdf_documents")
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
 ALLOWED_FILE_TYPES = os.getenv("ALLOWED_FILE_TYPES", "pdf").split(",")
-MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "5"))
-SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+BATCH_TTL_SECONDS = int(os.getenv("BATCH_TTL_SECONDS", "86400"))
+STARTUP_RETRIES = int(os.getenv("STARTUP_RETRIES", "10"))
+STARTUP_RETRY_DELAY = float(os.getenv("STARTUP_RETRY_DELAY", "2"))
+EMBEDDING_WARMUP_BATCH = int(os.getenv("EMBEDDING_WARMUP_BATCH", "8"))
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
 
 # Initialize ChromaDB client (for vector embeddings) - will be initialized on startup
 chroma_client = None
 redis_client = None
 embedding_manager = None
+embedding_quantizer = None
 pdf_processor = None
+progress_broker = None
+chunk_deduplicator = None
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize all services on startup with proper retries"""
-    global chroma_client, redis_client, embedding_manager, pdf_processor
-    
-    # Initialize Redis client
-    try:
-        redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-        redis_client.ping()
-        logger.info(f"Redis client initialized: {REDIS_HOST}:{REDIS_PORT}")
-    except Exception as e:
-        logger.error(f"Failed to initialize Redis client: {e}")
-        raise
-    
-    # Initialize PDF processor
-    try:
-        pdf_processor = PDFProcessor()
-        logger.info("PDF processor initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize PDF processor: {e}")
-        raise
-    
-    # Initialize embedding manager  
-    try:
-        embedding_manager = EmbeddingManager()
-        logger.info("Embedding manager initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize embedding manager: {e}")
-        raise
+# Query embedding, vector search and threshold filtering (shared with the
+# action server's in-process mode); model and client are attached on startup
+retriever = Retriever(collection_name=COLLECTION_NAME, instrumentation=ServiceInstrumentation())
+
+# Startup dependencies; requests other than probes and metrics are rejected
+# with 503 until every one of them is ready
+DEPENDENCIES = ("redis", "chroma", "embedding_model", "warmup")
+readiness: Dict[str, Dict[str, Any]] = {
+    name: {"ready": False, "error": None, "seconds": None} for name in DEPENDENCIES
+}
+initialization_task = None
+
+# Paths served while dependencies are still initializing
+UNGATED_PATHS = ("/", "/livez", "/readyz", "/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+def mark_ready(name: str, started: float) -> None:
+    """Record a dependency as initialized"""
+    elapsed = time.perf_counter() - started
+    readiness[name].update(ready=True, error=None, seconds=round(elapsed, 3))
+    DEPENDENCY_READY.labels(name).set(1)
+    DEPENDENCY_INIT_SECONDS.labels(name).set(elapsed)
+    logger.info(f"{name} ready in {elapsed:.2f}s")
+
+def is_ready() -> bool:
+    return all(state["ready"] for state in readiness.values())
+
+async def with_retries(name: str, init, retries: int = None):
+    """
+    Run a blocking initializer in a worker thread, retrying on failure
     
-    # Initialize ChromaDB client with retries
-    retries = 10
+    Args:
+        name: Dependency name reported by /readyz
+        init: Callable performing the initialization
+        retries: Number of attempts (defaults to STARTUP_RETRIES)
+        
+    Returns:
+        The initializer's return value
+    """
+    retries = retries or STARTUP_RETRIES
     for attempt in range(retries):
         try:
-            chroma_client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-            # Test connection
-            chroma_client.heartbeat()
-            logger.info(f"ChromaDB client initialized: {CHROMA_HOST}:{CHROMA_PORT}")
-            break
+            return await asyncio.to_thread(init)
         except Exception as e:
+            readiness[name]["error"] = str(e)
             if attempt == retries - 1:
-                logger.error(f"Failed to initialize ChromaDB client after {retries} attempts: {e}")
+                logger.error(f"Failed to initialize {name} after {retries} attempts: {e}")
                 raise
-            else:
-                logger.warning(f"Failed to initialize ChromaDB client (attempt {attempt + 1}/{retries}): {e}")
-                await asyncio.sleep(2)
+            logger.warning(f"Failed to initialize {name} (attempt {attempt + 1}/{retries}): {e}")
+            await asyncio.sleep(STARTUP_RETRY_DELAY)
+
+async def init_redis():
+    global redis_client, progress_broker, chunk_deduplicator
+    started = time.perf_counter()
     
-    # Initialize collection with retries
-    for attempt in range(retries):
-        try:
-            collection = chroma_client.get_or_create_collection(
-                name=COLLECTION_NAME,
-                metadata={"description": "PDF document embeddings for RAG"}
-            )
-            logger.info(f"Collection '{COLLECTION_NAME}' ready")
-            return
-        except Exception as e:
-            if attempt == retries - 1:
-                logger.error(f"Failed to initialize collection after {retries} attempts: {e}")
-                raise
-            else:
-                logger.warning(f"Failed to initialize collection (attempt {attempt + 1}/{retries}): {e}")
-                await asyncio.sleep(2)
+    def connect():
+        client = InstrumentedRedis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+        client.ping()
+        return client
+    
+    redis_client = await with_retries("redis", connect)
+    retriever.redis_client = redis_client
+    # Progress streams share one pub/sub subscription on an async connection
+    progress_broker = ProgressBroker(
+        aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    )
+    if DEDUP_ENABLED:
+        chunk_deduplicator = ChunkDeduplicator(redis_client)
+    logger.info(f"Redis client initialized: {REDIS_HOST}:{REDIS_PORT}")
+    mark_ready("redis", started)
+
+async def init_chroma():
+    global chroma_client
+    started = time.perf_counter()
+    
+    def connect():
+        client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+        client.heartbeat()
+        client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            metadata={"description": "PDF document embeddings for RAG"}
+        )
+        return client
+    
+    chroma_client = await with_retries("chroma", connect)
+    retriever.chroma_client = chroma_client
+    logger.info(f"ChromaDB client initialized: {CHROMA_HOST}:{CHROMA_PORT}, collection '{COLLECTION_NAME}' ready")
+    mark_ready("chroma", started)
+
+async def init_embeddings():
+    global embedding_manager, embedding_quantizer
+    started = time.perf_counter()
+    # Loading the model is not retried: a failure here is a configuration
+    # problem (or a missing baked model), not a transient one
+    embedding_manager = await with_retries(
+        "embedding_model", lambda: EmbeddingManager(instrumentation=ServiceInstrumentation()), retries=1
+    )
+    retriever.embedding_manager = embedding_manager
+    embedding_quantizer = EmbeddingQuantizer()
+    mark_ready("embedding_model", started)
+    
+    started = time.perf_counter()
+    if EMBEDDING_WARMUP_BATCH > 0:
+        await asyncio.to_thread(embedding_manager.warm_up, EMBEDDING_WARMUP_BATCH)
+    mark_ready("warmup", started)
+
+async def initialize_services():
+    """Initialize all dependencies concurrently"""
+    global pdf_processor
+    started = time.perf_counter()
+    pdf_processor = PDFProcessor()
+    results = await asyncio.gather(init_redis(), init_chroma(), init_embeddings(), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures:
+        raise failures[0]
+    try:
+        await asyncio.to_thread(retriever.check_dimensions)
+    except Exception as e:
+        # A mismatched collection would fail every search and ingestion; fail /livez instead
+        readiness["chroma"].update(ready=False, error=str(e))
+        DEPENDENCY_READY.labels("chroma").set(0)
+        logger.error(str(e))
+        raise
+    logger.info(f"All services initialized in {time.perf_counter() - started:.2f}s")
+
+@app.on_event("startup")
+async def startup_event():
+    """
+    Start initializing all services concurrently
+    
+    The server starts accepting connections immediately so /livez and
+    /readyz can answer probes; everything else waits for readiness.
+    """
+    global initialization_task
+    for name in DEPENDENCIES:
+        DEPENDENCY_READY.labels(name).set(0)
+    initialization_task = asyncio.create_task(initialize_services())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the progress subscription"""
+    if progress_broker is not None:
+        await progress_broker.stop()
+
+@app.middleware("http")
+async def require_ready(request: Request, call_next):
+    """Reject requests that need a dependency until startup has finished"""
+    if request.url.path in UNGATED_PATHS or is_ready():
+        return await call_next(request)
+    pending = [name for name, state in readiness.items() if not state["ready"]]
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service is starting", "pending": pending},
+        headers={"Retry-After": "1"}
+    )
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record per-route request latency"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Continue the caller's trace and report spans in a Server-Timing header"""
+    trace = start_trace(request.headers.get(TRACE_HEADER))
+    profiler = None
+    if should_profile(request.headers.get(PROFILE_HEADER)):
+        profiler = SamplingProfiler()
+        profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiler is not None:
+            finish_profile(profiler, trace, "pdf-processor")
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers[TRACE_HEADER] = trace.trace_id
+    return response
 
 @app.get("/")
 async def root():
     return {"message": "PDF Processing Service is running"}
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is serving and initialization has not failed"""
+    if initialization_task is not None and initialization_task.done() and initialization_task.exception():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed", "error": str(initialization_task.exception())}
+        )
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe: reports each startup dependency; 503 until all are ready"""
+    ready = is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "dependencies": readiness}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
         # Check ChromaDB
-        chroma_client.heartbeat()
+        with CHROMA_SECONDS.labels("heartbeat").time():
+            chroma_client.heartbeat()
         
         # Check Redis
         redis_client.ping()
@@ -120,9 +330,24 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         return {"status": "unhealthy", "error": str(e)}
 
+def kb_generation() -> int:
+    """Current knowledge-base generation"""
+    return int(redis_client.get(KB_GENERATION_KEY) or 0)
+
+def bump_kb_generation(event: Dict[str, Any]) -> None:
+    """
+    Mark the indexed content as changed and announce the change
+
+    Args:
+        event: What changed ("type" plus details); the collection and the
+            new generation are added before it is published
+    """
+    bump_collection_generation(redis_client, COLLECTION_NAME, event)
+
 @app.post("/upload-pdf")
-async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Upload and process a PDF file"""
+async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                     batch_id: Optional[str] = None):
+    """Upload and process a PDF file, optionally as part of a batch followed at /progress/batch/{batch_id}"""
     # Check file extension against allowed types
     file_extension = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
     if file_extension not in ALLOWED_FILE_TYPES:
@@ -131,6 +356,8 @@ async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(
             status_code=400, 
             detail=f"Only {allowed_types_str} files are supported. Received: {file_extension}"
         )
+    if batch_id is not None and not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", batch_id):
+        raise HTTPException(status_code=400, detail=f"Invalid batch id: {batch_id}")
     
     try:
         # Read and check file size
@@ -153,69 +380,142 @@ async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(
             await f.write(content)
         
         # Store processing status in Redis
-        redis_client.hset(f"pdf:{file_id}", mapping={
+        record = {
             "filename": file.filename,
             "status": "processing",
+            "stage": "queued",
             "file_path": file_path
-        })
+        }
+        if batch_id:
+            record["batch_id"] = batch_id
+        pipe = redis_client.pipeline()
+        pipe.hset(f"pdf:{file_id}", mapping=record)
+        if batch_id:
+            pipe.sadd(BATCH_FILES_KEY.format(batch_id), file_id)
+            pipe.expire(BATCH_FILES_KEY.format(batch_id), BATCH_TTL_SECONDS)
+        pipe.execute()
         
         # Add background task to process PDF
-        background_tasks.add_task(process_pdf_background, file_id, file_path, file.filename)
+        background_tasks.add_task(process_pdf_background, file_id, file_path, file.filename, batch_id)
+        INGESTION_QUEUE_DEPTH.inc()
         
-        return JSONResponse(content={
+        response = {
             "file_id": file_id,
             "filename": file.filename,
             "status": "processing",
+            "progress_url": f"/progress/{file_id}",
             "message": "PDF uploaded successfully and is being processed"
-        })
+        }
+        if batch_id:
+            response["batch_id"] = batch_id
+        return JSONResponse(content=response)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading PDF: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to upload PDF: {str(e)}")
 
-async def process_pdf_background(file_id: str, file_path: str, filename: str):
+async def process_pdf_background(file_id: str, file_path: str, filename: str, batch_id: str = None):
     """Background task to process PDF and create embeddings"""
+    # Extraction and embedding are CPU bound; run them off the event loop so
+    # progress streams and other requests keep being served meanwhile
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(ingest_pdf, file_id, file_path, filename, batch_id)
+    finally:
+        INGESTION_QUEUE_DEPTH.dec()
+        INGESTION_SECONDS.observe(time.perf_counter() - start)
+
+def ingest_pdf(file_id: str, file_path: str, filename: str, batch_id: str = None):
+    """Extract, embed and store a PDF in batches, publishing progress after each step"""
+    progress = ProgressTracker(redis_client, file_id, filename, batch_id)
     try:
         logger.info(f"Starting to process PDF: {filename}")
+        progress.update(stage="extracting", force=True)
         
         # Extract text from PDF
-        text_chunks = pdf_processor.extract_and_chunk_text(file_path)
+        text_chunks = pdf_processor.extract_and_chunk_text(file_path, progress.page_callback)
         
         if not text_chunks:
-            redis_client.hset(f"pdf:{file_id}", "status", "failed")
-            redis_client.hset(f"pdf:{file_id}", "error", "No text found in PDF")
+            progress.update(stage="failed", status="failed", error="No text found in PDF", force=True)
+            INGESTION_TOTAL.labels("failed").inc()
             return
         
-        # Generate embeddings
-        embeddings = embedding_manager.generate_embeddings(text_chunks)
-        
-        # Store in ChromaDB
-        collection = chroma_client.get_collection(COLLECTION_NAME)
-        
-        # Prepare data for ChromaDB
-        ids = [f"{file_id}_{i}" for i in range(len(text_chunks))]
-        metadatas = [{"file_id": file_id, "filename": filename, "chunk_id": i} 
-                    for i in range(len(text_chunks))]
-        
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=text_chunks,
-            metadatas=metadatas
-        )
+        total = len(text_chunks)
+        chunk_ids = [f"{file_id}_{i}" for i in range(total)]
+        
+        # Near-duplicates of already indexed chunks (boilerplate pages, repeated
+        # tables) are stored as references to the canonical chunk, not as vectors
+        duplicates, signatures = {}, None
+        if chunk_deduplicator is not None:
+            progress.update(stage="deduplicating", force=True)
+            duplicates, signatures = chunk_deduplicator.find_duplicates(chunk_ids, text_chunks)
+        unique = [i for i in range(total) if i not in duplicates]
+        DEDUP_CHUNKS_TOTAL.labels("unique").inc(len(unique))
+        DEDUP_CHUNKS_TOTAL.labels("duplicate").inc(len(duplicates))
+        
+        progress.update(stage="embedding", chunks_total=len(unique), chunks_duplicate=len(duplicates),
+                        chunks_embedded=0, chunks_stored=0, force=True)
+        
+        with CHROMA_SECONDS.labels("get_collection").time():
+            collection = chroma_client.get_collection(COLLECTION_NAME)
+        
+        # Embed and store in batches so progress is visible on large documents
+        for offset in range(0, len(unique), INGEST_BATCH_SIZE):
+            indices = unique[offset:offset + INGEST_BATCH_SIZE]
+            batch = [text_chunks[i] for i in indices]
+            
+            # Chroma 0.4 stores float32 only; EMBEDDING_PRECISION applies to exports
+            embeddings = embedding_manager.generate_embeddings(batch)
+            progress.update(stage="embedding", chunks_embedded=offset + len(batch))
+            
+            # Prepare data for ChromaDB
+            ids = [chunk_ids[i] for i in indices]
+            metadatas = [{"file_id": file_id, "filename": filename, "chunk_id": i} for i in indices]
+            
+            # Sentences, token IDs and sentence embeddings for the extractive answer path,
+            # kept in Redis so chunk metadata stays small
+            if SENTENCE_INDEX_ENABLED:
+                indexes = build_sentence_index(batch, embedding_manager.generate_embeddings)
+                store_sentence_indexes(redis_client, ids, indexes)
+            
+            with CHROMA_SECONDS.labels("add").time():
+                collection.add(
+                    ids=ids,
+                    embeddings=to_chroma(embeddings),
+                    documents=batch,
+                    metadatas=metadatas
+                )
+            progress.update(stage="storing", chunks_stored=offset + len(batch))
+        
+        if chunk_deduplicator is not None:
+            chunk_deduplicator.index(file_id, filename, chunk_ids, duplicates, signatures)
         
         # Update status in Redis
-        redis_client.hset(f"pdf:{file_id}", mapping={
+        redis_client.hset(f"pdf:{file_id}", mapping={"chunks_count": total, "duplicate_chunks": len(duplicates)})
+        bump_kb_generation({
+            "type": "ingested",
+            "file_id": file_id,
+            "filename": filename,
             "status": "completed",
-            "chunks_count": len(text_chunks)
+            # Stored vectors; chunks_count and duplicate_chunks mirror the document record
+            "chunks": len(unique),
+            "chunks_count": total,
+            "duplicate_chunks": len(duplicates),
+            "samples": [{"id": chunk_ids[i], "document": text_chunks[i]} for i in unique[:KB_EVENT_SAMPLES]]
         })
+        progress.update(stage="completed", status="completed", force=True)
         
-        logger.info(f"Successfully processed PDF: {filename} ({len(text_chunks)} chunks)")
+        INGESTION_TOTAL.labels("completed").inc()
+        logger.info(
+            f"Successfully processed PDF: {filename} ({total} chunks, {len(duplicates)} near-duplicates referenced)"
+        )
         
     except Exception as e:
         logger.error(f"Error processing PDF {filename}: {e}")
-        redis_client.hset(f"pdf:{file_id}", "status", "failed")
-        redis_client.hset(f"pdf:{file_id}", "error", str(e))
+        progress.update(stage="failed", status="failed", error=str(e), force=True)
+        INGESTION_TOTAL.labels("failed").inc()
 
 @app.get("/status/{file_id}")
 async def get_processing_status(file_id: str):
@@ -230,47 +530,102 @@ async def get_processing_status(file_id: str):
         logger.error(f"Error getting status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/progress/{file_id}")
+async def stream_file_progress(file_id: str):
+    """Stream ingestion progress of one file as Server-Sent Events"""
+    if not redis_client.exists(f"pdf:{file_id}"):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    async def snapshot():
+        record = await asyncio.to_thread(redis_client.hgetall, f"pdf:{file_id}")
+        return [event_from_record(file_id, record)] if record else []
+    
+    events = stream_progress(
+        progress_broker, FILE_CHANNEL.format(file_id), snapshot,
+        lambda event: event.get("stage") in TERMINAL_STAGES
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/progress/batch/{batch_id}")
+async def stream_batch_progress(batch_id: str, expected: Optional[int] = None):
+    """
+    Stream ingestion progress of every file uploaded with a batch_id
+    
+    The stream ends once `expected` files (default: the files registered
+    when the stream opened) have completed or failed.
+    """
+    batch_key = BATCH_FILES_KEY.format(batch_id)
+    finished_files = set()
+    target = {"count": expected}
+    
+    def finished(event):
+        if event.get("stage") in TERMINAL_STAGES:
+            finished_files.add(event["file_id"])
+        return target["count"] is not None and len(finished_files) >= target["count"]
+    
+    async def snapshot():
+        file_ids = await asyncio.to_thread(redis_client.smembers, batch_key)
+        if target["count"] is None:
+            target["count"] = len(file_ids)
+        pipe = redis_client.pipeline()
+        ordered = sorted(file_ids)
+        for file_id in ordered:
+            pipe.hgetall(f"pdf:{file_id}")
+        records = await asyncio.to_thread(pipe.execute)
+        return [event_from_record(file_id, record) for file_id, record in zip(ordered, records) if record]
+    
+    # Validate the batch before the response starts streaming
+    if expected is None and not redis_client.exists(batch_key):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    events = stream_progress(progress_broker, BATCH_CHANNEL.format(batch_id), snapshot, finished)
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/embed")
+async def embed_text(text: str):
+    """Embed a query with the knowledge-base model, along with the current knowledge-base generation"""
+    try:
+        with span("embed"):
+            embedding = retriever.embed_query(text)
+        return {
+            "embedding": embedding.tolist(),
+            "model": embedding_manager.model_name,
+            "generation": kb_generation()
+        }
+    except Exception as e:
+        logger.error(f"Error embedding text: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/search")
-async def search_documents(query: str, max_results: int = None):
-    """Search through processed documents"""
-    if max_results is None:
-        max_results = MAX_SEARCH_RESULTS
-        
+async def search_documents(query: str, max_results: int = None, include_sentences: bool = False,
+                           include_embeddings: bool = False):
+    """
+    Search through processed documents
+    
+    With include_sentences, each result carries its precomputed sentence index
+    ("sentence_index") and the response includes the query embedding, so the
+    caller can rank sentences without another round trip. With
+    include_embeddings, each result carries its stored chunk embedding
+    ("embedding", base64 little-endian float32) so the caller can re-score
+    the results for follow-up questions.
+    """
+    start = time.perf_counter()
     try:
-        # Generate query embedding
-        query_embedding = embedding_manager.generate_embeddings([query])[0]
+        results, query_embedding = retriever.search(query, max_results, include_sentences, include_embeddings)
         
-        # Search in ChromaDB
-        collection = chroma_client.get_collection(COLLECTION_NAME)
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=max_results
-        )
-        
-        if not results["documents"][0]:
-            return {"results": [], "message": "No relevant documents found"}
-        
-        # Format results and filter by similarity threshold
-        formatted_results = []
-        for i in range(len(results["documents"][0])):
-            distance = results["distances"][0][i] if results["distances"] else 0.0
-            # Convert distance to similarity (lower distance = higher similarity)
-            similarity = 1.0 - distance if distance else 1.0
-            
-            # Only include results above similarity threshold
-            if similarity >= SIMILARITY_THRESHOLD:
-                formatted_results.append({
-                    "content": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": distance,
-                    "similarity": similarity
-                })
+        if not results:
+            return {"results": [], "message": "No relevant documents found", "generation": kb_generation()}
         
-        return {"results": formatted_results, "query": query}
+        response = {"results": results, "query": query, "generation": kb_generation()}
+        if include_sentences or include_embeddings:
+            response["query_embedding"] = query_embedding.tolist()
+        return response
         
     except Exception as e:
         logger.error(f"Error searching documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        SEARCH_SECONDS.observe(time.perf_counter() - start)
 
 @app.get("/documents")
 async def list_documents():
@@ -309,12 +664,34 @@ async def delete_document(file_id: str):
         collection = chroma_client.get_collection(COLLECTION_NAME)
         
         # Get all chunk IDs for this file
-        results = collection.get(where={"file_id": file_id})
-        if results["ids"]:
-            collection.delete(ids=results["ids"])
-        
-        # Delete from Redis
+        with CHROMA_SECONDS.labels("get").time():
+            results = collection.get(where={"file_id": file_id})
+        to_delete = results["ids"]
+        
+        # Chunks other documents reference are handed over instead of deleted
+        rehomed = {}
+        if chunk_deduplicator is not None:
+            to_delete, rehomed = chunk_deduplicator.remove_file(file_id, results["ids"])
+            if rehomed:
+                with CHROMA_SECONDS.labels("update").time():
+                    collection.update(ids=list(rehomed), metadatas=list(rehomed.values()))
+        
+        if to_delete:
+            with CHROMA_SECONDS.labels("delete").time():
+                collection.delete(ids=to_delete)
+        
+        # Delete from Redis (rehomed chunks keep their ID and sentence index)
         redis_client.delete(f"pdf:{file_id}")
+        delete_sentence_indexes(redis_client, to_delete)
+        rehomed_by_file: Dict[str, int] = {}
+        for metadata in rehomed.values():
+            rehomed_by_file[metadata["file_id"]] = rehomed_by_file.get(metadata["file_id"], 0) + 1
+        bump_kb_generation({
+            "type": "deleted",
+            "file_id": file_id,
+            "deleted": len(to_delete),
+            "rehomed": rehomed_by_file
+        })
         
         # Delete file from filesystem
         file_path = doc_data.get("file_path")
@@ -323,6 +700,8 @@ async def delete_document(file_id: str):
         
         return {"message": f"Document {file_id} deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -339,9 +718,12 @@ async def clear_all_documents():
         )
         
         # Clear Redis
-        keys = redis_client.keys("pdf:*")
+        keys = redis_client.keys("pdf:*") + redis_client.keys("batch:*")
         if keys:
             redis_client.delete(*keys)
+        clear_index(redis_client)
+        clear_sentence_indexes(redis_client)
+        bump_kb_generation({"type": "cleared"})
         
         # Clear upload directory
         for filename in os.listdir(UPLOAD_DIR):
@@ -355,6 +737,69 @@ async def clear_all_documents():
         logger.error(f"Error clearing documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _export_path(name: str) -> str:
+    """Resolve an export name inside EXPORT_DIR, rejecting path traversal"""
+    if not re.fullmatch(r"[A-Za-z0-9_.-]+", name) or name.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid export name: {name}")
+    return os.path.join(EXPORT_DIR, name)
+
+@app.get("/index/exports")
+async def get_index_exports():
+    """List available index exports"""
+    try:
+        return {"exports": list_exports(EXPORT_DIR)}
+    except Exception as e:
+        logger.error(f"Error listing exports: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/index/export")
+async def export_index(name: str = None):
+    """Export the vector index (ids, documents, metadata, embeddings) to EXPORT_DIR"""
+    if name is None:
+        name = f"{COLLECTION_NAME}-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}"
+    output_dir = _export_path(name)
+    
+    try:
+        manifest = await asyncio.to_thread(
+            export_collection, chroma_client, COLLECTION_NAME, output_dir,
+            redis_client=redis_client, quantizer=embedding_quantizer
+        )
+        return {
+            "name": name,
+            "path": output_dir,
+            "count": manifest["count"],
+            "dimensions": manifest["dimensions"],
+            "precision": manifest["precision"]
+        }
+    except Exception as e:
+        logger.error(f"Error exporting index: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/index/import")
+async def import_index(name: str, replace: bool = False):
+    """Bulk-load an export from EXPORT_DIR into the vector index without re-embedding"""
+    input_dir = _export_path(name)
+    manifest_path = os.path.join(input_dir, "manifest.json")
+    if not os.path.isfile(manifest_path):
+        raise HTTPException(status_code=404, detail=f"Export not found: {name}")
+    with open(manifest_path) as f:
+        dimensions = json.load(f).get("dimensions")
+    if dimensions and dimensions != embedding_manager.embedding_dimensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Export has {dimensions}-dimensional vectors; the current model produces "
+                   f"{embedding_manager.embedding_dimensions} (EMBEDDING_DIMENSIONS)"
+        )
+    
+    try:
+        return await asyncio.to_thread(
+            import_collection, chroma_client, input_dir,
+            collection_name=COLLECTION_NAME, redis_client=redis_client, replace=replace
+        )
+    except Exception as e:
+        logger.error(f"Error importing index: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
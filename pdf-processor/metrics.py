@@ -0,0 +1,120 @@
+"""
+Prometheus metrics for the PDF processing service
+"""
+
+import time
+from typing import List
+
+import redis
+from prometheus_client import Counter, Gauge, Histogram
+
+from instrumentation import Instrumentation
+from tracing import span
+
+# Request latency buckets (seconds) shared by the stage histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "pdf_processor_http_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+PDF_EXTRACTION_SECONDS = Histogram(
+    "pdf_extraction_seconds",
+    "Time spent extracting text from one PDF",
+    buckets=LATENCY_BUCKETS
+)
+PDF_PAGES_TOTAL = Counter("pdf_pages_extracted_total", "PDF pages extracted")
+
+CHUNKING_SECONDS = Histogram(
+    "pdf_chunking_seconds",
+    "Time spent splitting one document into chunks",
+    buckets=LATENCY_BUCKETS
+)
+CHUNKS_TOTAL = Counter("pdf_chunks_created_total", "Text chunks created")
+
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "embedding_batch_seconds",
+    "Model inference time per embedding batch",
+    buckets=LATENCY_BUCKETS
+)
+EMBEDDING_TEXT_SECONDS = Histogram(
+    "embedding_per_text_seconds",
+    "Model inference time per text (batch time divided by batch size)",
+    buckets=LATENCY_BUCKETS
+)
+EMBEDDING_TEXTS_TOTAL = Counter("embedding_texts_total", "Texts embedded by the model")
+EMBEDDING_CHARACTERS_TOTAL = Counter("embedding_characters_total", "Characters embedded by the model")
+
+CHROMA_SECONDS = Histogram(
+    "chroma_operation_seconds",
+    "ChromaDB call latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+REDIS_SECONDS = Histogram(
+    "redis_command_seconds",
+    "Redis command latency",
+    ["command"],
+    buckets=LATENCY_BUCKETS
+)
+
+SEARCH_SECONDS = Histogram(
+    "search_request_seconds",
+    "Total /search latency (embedding, vector query and filtering)",
+    buckets=LATENCY_BUCKETS
+)
+SEARCH_RESULTS = Histogram(
+    "search_results_returned",
+    "Results returned per search after the similarity threshold",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50)
+)
+
+INGESTION_QUEUE_DEPTH = Gauge("ingestion_queue_depth", "PDFs accepted but not yet fully processed")
+INGESTION_TOTAL = Counter("ingestion_total", "Processed PDFs by outcome", ["status"])
+INGESTION_SECONDS = Histogram(
+    "ingestion_seconds",
+    "End-to-end background processing time per PDF",
+    buckets=LATENCY_BUCKETS
+)
+DEDUP_CHUNKS_TOTAL = Counter("dedup_chunks_total", "Chunks checked for near-duplicates by outcome", ["outcome"])
+
+DEPENDENCY_READY = Gauge("dependency_ready", "Whether a startup dependency is initialized (1) or not (0)", ["dependency"])
+DEPENDENCY_INIT_SECONDS = Gauge(
+    "dependency_init_seconds",
+    "Time taken to initialize each startup dependency, including retries",
+    ["dependency"]
+)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records the latency of every command"""
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            command = str(args[0]).lower() if args else "unknown"
+            REDIS_SECONDS.labels(command).observe(time.perf_counter() - start)
+
+
+class ServiceInstrumentation(Instrumentation):
+    """Records the embedding and retrieval hooks in this service's metrics and trace"""
+
+    def span(self, name: str):
+        return span(name)
+
+    def chroma_call(self, operation: str):
+        return CHROMA_SECONDS.labels(operation).time()
+
+    def embedded(self, texts: List[str], seconds: float) -> None:
+        EMBEDDING_BATCH_SECONDS.observe(seconds)
+        EMBEDDING_TEXT_SECONDS.observe(seconds / len(texts))
+        EMBEDDING_TEXTS_TOTAL.inc(len(texts))
+        EMBEDDING_CHARACTERS_TOTAL.inc(sum(len(t) for t in texts))
+
+    def search_results(self, count: int) -> None:
+        SEARCH_RESULTS.observe(count)
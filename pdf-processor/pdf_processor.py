@@ -1,7 +1,9 @@
 import PyPDF2
 import logging
 import os
-from typing import List
+from typing import Callable, List, Optional
+
+from metrics import CHUNKING_SECONDS, CHUNKS_TOTAL, PDF_EXTRACTION_SECONDS, PDF_PAGES_TOTAL
 
 logger = logging.getLogger(__name__)
 
@@ -17,25 +19,31 @@ class PDFProcessor:
         self.chunk_size = chunk_size or int(os.getenv("CHUNK_SIZE", "1000"))
         self.chunk_overlap = chunk_overlap or int(os.getenv("CHUNK_OVERLAP", "200"))
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def extract_text_from_pdf(self, pdf_path: str,
+                              progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
         """
         Extract text from PDF file
         
         Args:
             pdf_path: Path to the PDF file
+            progress_callback: Called with (pages_done, pages_total) after each page
             
         Returns:
             Extracted text as a string
         """
         try:
-            with open(pdf_path, 'rb') as file:
+            with PDF_EXTRACTION_SECONDS.time(), open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 text = ""
+                pages_total = len(pdf_reader.pages)
                 
-                for page in pdf_reader.pages:
+                for pages_done, page in enumerate(pdf_reader.pages, start=1):
                     page_text = page.extract_text()
                     if page_text:
                         text += page_text + "\n"
+                    PDF_PAGES_TOTAL.inc()
+                    if progress_callback is not None:
+                        progress_callback(pages_done, pages_total)
                 
                 return text.strip()
                 
@@ -82,12 +90,14 @@ class PDFProcessor:
                 
         return chunks
 
-    def extract_and_chunk_text(self, pdf_path: str) -> List[str]:
+    def extract_and_chunk_text(self, pdf_path: str,
+                               progress_callback: Optional[Callable[[int, int], None]] = None) -> List[str]:
         """
         Extract text from PDF and split into chunks
         
         Args:
             pdf_path: Path to the PDF file
+            progress_callback: Called with (pages_done, pages_total) after each page
             
         Returns:
             List of text chunks
@@ -96,14 +106,16 @@ class PDFProcessor:
             logger.info(f"Extracting text from PDF: {pdf_path}")
             
             # Extract text
-            text = self.extract_text_from_pdf(pdf_path)
+            text = self.extract_text_from_pdf(pdf_path, progress_callback)
             
             if not text:
                 logger.warning(f"No text extracted from PDF: {pdf_path}")
                 return []
             
             # Chunk text
-            chunks = self.chunk_text(text)
+            with CHUNKING_SECONDS.time():
+                chunks = self.chunk_text(text)
+            CHUNKS_TOTAL.inc(len(chunks))
             
             logger.info(f"Successfully extracted and chunked PDF: {pdf_path} ({len(chunks)} chunks)")
             return chunks
@@ -0,0 +1,219 @@
+"""
+Ingestion progress publishing and Server-Sent Event streaming
+The ingestion pipeline publishes stage progress to Redis pub/sub channels
+(one per file, one per upload batch) and mirrors the latest state into the
+file's status hash. SSE clients are fanned out from a single pattern
+subscription per process, so idle watchers cost no Redis connections.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", "0.25"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+FILE_CHANNEL = "progress:file:{}"
+BATCH_CHANNEL = "progress:batch:{}"
+BATCH_FILES_KEY = "batch:{}:files"
+
+TERMINAL_STAGES = ("completed", "failed")
+
+# Share of the overall progress bar spent in each stage
+_EXTRACTION_WEIGHT = 0.3
+_EMBEDDING_WEIGHT = 0.35
+_STORAGE_WEIGHT = 0.35
+
+_INT_FIELDS = ("pages_done", "pages_total", "chunks_total", "chunks_duplicate", "chunks_embedded", "chunks_stored")
+
+
+def progress_fraction(state: Dict[str, Any]) -> float:
+    """Overall completion between 0 and 1 for a progress state"""
+    if state.get("stage") == "completed":
+        return 1.0
+
+    def ratio(done, total):
+        return min(int(state.get(done) or 0) / int(state[total]), 1.0) if int(state.get(total) or 0) else 0.0
+
+    fraction = _EXTRACTION_WEIGHT * ratio("pages_done", "pages_total")
+    fraction += _EMBEDDING_WEIGHT * ratio("chunks_embedded", "chunks_total")
+    fraction += _STORAGE_WEIGHT * ratio("chunks_stored", "chunks_total")
+    return round(fraction, 4)
+
+
+def event_from_record(file_id: str, record: Dict[str, str]) -> Dict[str, Any]:
+    """Build a progress event from a pdf:{file_id} status hash"""
+    event = {"file_id": file_id, "filename": record.get("filename"), "status": record.get("status")}
+    event["stage"] = record.get("stage") or record.get("status")
+    if record.get("batch_id"):
+        event["batch_id"] = record["batch_id"]
+    for field in _INT_FIELDS:
+        if field in record:
+            event[field] = int(record[field])
+    if record.get("error"):
+        event["error"] = record["error"]
+    event["progress"] = progress_fraction(event)
+    return event
+
+
+class ProgressTracker:
+    """Publishes the progress of one file through the ingestion stages"""
+
+    def __init__(self, redis_client, file_id: str, filename: str, batch_id: str = None):
+        """
+        Initialize progress tracker
+
+        Args:
+            redis_client: Synchronous Redis client
+            file_id: File being processed
+            filename: Original file name
+            batch_id: Upload batch the file belongs to, if any
+        """
+        self.redis_client = redis_client
+        self.file_id = file_id
+        self.batch_id = batch_id
+        self.state: Dict[str, Any] = {"file_id": file_id, "filename": filename, "status": "processing"}
+        if batch_id:
+            self.state["batch_id"] = batch_id
+        self._last_publish = 0.0
+        self._last_stage = None
+
+    def update(self, force: bool = False, **fields) -> None:
+        """
+        Merge fields into the progress state and publish it
+
+        Updates within the same stage are rate limited to one per
+        PROGRESS_MIN_INTERVAL; stage changes are always published.
+        """
+        self.state.update(fields)
+        stage = self.state.get("stage")
+        now = time.monotonic()
+        if not force and stage == self._last_stage and now - self._last_publish < PROGRESS_MIN_INTERVAL:
+            return
+        self._last_stage = stage
+        self._last_publish = now
+        self.publish()
+
+    def publish(self) -> None:
+        self.state["progress"] = progress_fraction(self.state)
+        record = {k: v for k, v in self.state.items() if k in _INT_FIELDS or k in ("stage", "status", "error")}
+        message = json.dumps(self.state)
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hset(f"pdf:{self.file_id}", mapping={k: str(v) for k, v in record.items()})
+            pipe.publish(FILE_CHANNEL.format(self.file_id), message)
+            if self.batch_id:
+                pipe.publish(BATCH_CHANNEL.format(self.batch_id), message)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish progress for {self.file_id}: {e}")
+
+    def page_callback(self, pages_done: int, pages_total: int) -> None:
+        """Callback for PDFProcessor page-by-page extraction"""
+        self.update(stage="extracting", pages_done=pages_done, pages_total=pages_total)
+
+
+class ProgressBroker:
+    """
+    Fans out progress messages from one Redis pattern subscription to any
+    number of in-process listeners (one asyncio.Queue per SSE client)
+    """
+
+    def __init__(self, async_redis_client):
+        self.redis_client = async_redis_client
+        self.listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.psubscribe("progress:*")
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    for queue in list(self.listeners.get(message["channel"], ())):
+                        queue.put_nowait(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Progress subscription lost, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        self.start()
+        queue: asyncio.Queue = asyncio.Queue()
+        self.listeners.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        listeners = self.listeners.get(channel)
+        if listeners is not None:
+            listeners.discard(queue)
+            if not listeners:
+                del self.listeners[channel]
+
+
+def format_sse(event: Dict[str, Any], name: str = "progress") -> str:
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_progress(broker: ProgressBroker, channel: str,
+                          snapshot: Callable[[], Awaitable[List[Dict[str, Any]]]],
+                          finished: Callable[[Dict[str, Any]], bool]) -> AsyncIterator[str]:
+    """
+    Stream progress events for a channel as SSE
+
+    Subscribes before reading the snapshot so no event published in
+    between is lost. Once `finished` returns True an `end` event is sent
+    (so EventSource clients know not to reconnect) and the stream closes.
+
+    Args:
+        broker: Shared progress broker
+        channel: Redis channel to follow
+        snapshot: Coroutine returning the current state as events
+        finished: Predicate called with every event sent
+    """
+    queue = broker.subscribe(channel)
+    try:
+        for event in await snapshot():
+            yield format_sse(event)
+            if finished(event):
+                yield format_sse({}, "end")
+                return
+
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            event = json.loads(data)
+            yield format_sse(event)
+            if finished(event):
+                yield format_sse({}, "end")
+                return
+    finally:
+        broker.unsubscribe(channel, queue)
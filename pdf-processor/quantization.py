@@ -0,0 +1,141 @@
+import logging
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_PRECISIONS = ("float32", "float16", "int8")
+
+
+class EmbeddingQuantizer:
+    def __init__(self, precision: str = None):
+        """
+        Initialize embedding quantizer for compact exports and evaluation
+
+        Chroma 0.4 only stores float32 vectors, so the live collection keeps
+        full precision; the quantized codes are written by index exports.
+
+        Args:
+            precision: Storage precision, one of float32, float16 or int8
+        """
+        if precision is None:
+            precision = os.getenv("EMBEDDING_PRECISION", "float32")
+
+        precision = precision.lower()
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(
+                f"Unsupported embedding precision '{precision}'. "
+                f"Expected one of: {', '.join(SUPPORTED_PRECISIONS)}"
+            )
+
+        self.precision = precision
+        logger.info(f"Embedding storage precision: {precision}")
+
+    def quantize(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize float32 embeddings to the configured storage precision
+
+        int8 uses symmetric scalar quantization with one scale per vector,
+        so that vectors of different magnitudes keep their full code range.
+
+        Args:
+            embeddings: Array of shape (n, dim)
+
+        Returns:
+            Tuple of (codes, scales) where codes has shape (n, dim) in the
+            storage dtype and scales has shape (n,) as float32
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings[np.newaxis, :]
+
+        scales = np.ones(embeddings.shape[0], dtype=np.float32)
+
+        if self.precision == "float32":
+            return embeddings, scales
+
+        if self.precision == "float16":
+            return embeddings.astype(np.float16), scales
+
+        # int8: scale each vector so its largest component maps to +/-127
+        max_abs = np.abs(embeddings).max(axis=1)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+        codes = np.rint(embeddings / scales[:, np.newaxis])
+        codes = np.clip(codes, -127, 127).astype(np.int8)
+        return codes, scales
+
+    def dequantize(self, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """
+        Restore float32 embeddings from stored codes
+
+        Args:
+            codes: Quantized codes of shape (n, dim)
+            scales: Per-vector scales of shape (n,)
+
+        Returns:
+            Float32 array of shape (n, dim)
+        """
+        embeddings = np.asarray(codes).astype(np.float32)
+        if self.precision == "int8":
+            embeddings *= np.asarray(scales, dtype=np.float32)[:, np.newaxis]
+        return embeddings
+
+    def scores(self, codes: np.ndarray, scales: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        Compute dot-product scores between queries and stored codes
+
+        int8 scores are computed on the raw codes and rescaled afterwards,
+        so per-vector scales never have to be applied to the stored matrix.
+
+        Args:
+            codes: Quantized codes of shape (n, dim)
+            scales: Per-vector scales of shape (n,)
+            queries: Float32 query vectors of shape (q, dim)
+
+        Returns:
+            Score matrix of shape (q, n)
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+
+        if self.precision == "float32":
+            return queries @ codes.T
+
+        # NumPy has no BLAS kernels for float16/int8 matmul, so upcast the operand
+        raw = queries @ codes.T.astype(np.float32)
+        if self.precision == "float16":
+            return raw
+        return raw * np.asarray(scales, dtype=np.float32)[np.newaxis, :]
+
+    def bytes_per_vector(self, dimensions: int) -> int:
+        """
+        Storage footprint of one vector, including its scale
+
+        Args:
+            dimensions: Vector dimensionality
+
+        Returns:
+            Number of bytes
+        """
+        itemsize = np.dtype(self.precision).itemsize
+        scale_bytes = 4 if self.precision == "int8" else 0
+        return dimensions * itemsize + scale_bytes
+
+
+def to_chroma(embeddings: np.ndarray) -> List[List[float]]:
+    """
+    Convert an embedding matrix to the list payload the Chroma client expects
+
+    chromadb 0.4.x validates embeddings as nested Python lists, so this is the
+    single place where arrays are converted; everything upstream stays NumPy.
+
+    Args:
+        embeddings: Float32 array of shape (n, dim)
+
+    Returns:
+        Nested list of floats
+    """
+    return np.asarray(embeddings, dtype=np.float32).tolist()
@@ -0,0 +1,174 @@
+"""
+Vector retrieval
+Query embedding (with a small LRU cache), the Chroma query and the similarity
+threshold filter. Used by the pdf-processor's /embed and /search endpoints,
+and imported by the action server when it retrieves in-process
+(RETRIEVAL_MODE=local), so both paths return identical results.
+
+Only depends on the quantization, sentence index and instrumentation modules
+(and the shared sentences module); metrics and trace spans go through the
+Instrumentation passed in by each service.
+"""
+
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from instrumentation import Instrumentation
+from quantization import to_chroma
+from sentence_index import load_sentence_indexes, split_index_fields
+
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "pdf_documents")
+MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "5"))
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+
+class Retriever:
+    """Embeds queries and searches the knowledge-base collection"""
+
+    def __init__(self, embedding_manager=None, chroma_client=None, collection_name: str = None,
+                 similarity_threshold: float = None, cache_size: int = None, redis_client=None,
+                 instrumentation: Instrumentation = None):
+        """
+        Initialize retriever
+
+        Args:
+            embedding_manager: EmbeddingManager holding the knowledge-base model
+                (may be attached later, once loaded)
+            chroma_client: Chroma client (may be attached later, once connected)
+            collection_name: Collection holding the chunk embeddings
+            similarity_threshold: Minimum similarity of returned results
+            cache_size: Number of recent query embeddings kept
+            redis_client: Synchronous Redis client holding the sentence indexes
+                (may be attached later, once connected)
+            instrumentation: Receives trace spans, Chroma call times and result counts
+        """
+        self.embedding_manager = embedding_manager
+        self.chroma_client = chroma_client
+        self.collection_name = collection_name or COLLECTION_NAME
+        self.similarity_threshold = similarity_threshold if similarity_threshold is not None else SIMILARITY_THRESHOLD
+        self.cache_size = cache_size or QUERY_EMBEDDING_CACHE_SIZE
+        self.redis_client = redis_client
+        self.instrumentation = instrumentation or Instrumentation()
+        # Recent query embeddings, so a question embedded for the semantic cache
+        # is not embedded again by the search that follows a cache miss
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return self.embedding_manager.model_name
+
+    def check_dimensions(self) -> None:
+        """
+        Verify that stored vectors match the model's output dimensions
+
+        Raises:
+            RuntimeError: The collection was built with another model or
+                EMBEDDING_DIMENSIONS setting
+        """
+        if self.collection_name not in [c.name for c in self.chroma_client.list_collections()]:
+            return
+        collection = self.chroma_client.get_collection(self.collection_name)
+        with self.instrumentation.chroma_call("get"):
+            sample = collection.get(limit=1, include=["embeddings"])
+        if not sample["ids"]:
+            return
+        stored = len(sample["embeddings"][0])
+        expected = self.embedding_manager.embedding_dimensions
+        if stored != expected:
+            raise RuntimeError(
+                f"Collection '{self.collection_name}' holds {stored}-dimensional vectors but "
+                f"{self.embedding_manager.model_name} with EMBEDDING_DIMENSIONS="
+                f"{self.embedding_manager.dimensions or 0} produces {expected}; "
+                f"restore the previous setting, or clear or re-import the collection"
+            )
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, reusing recent embeddings of the same text"""
+        with self._lock:
+            embedding = self._query_embeddings.get(query)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(query)
+                return embedding
+        embedding = self.embedding_manager.generate_embeddings([query])[0]
+        with self._lock:
+            self._query_embeddings[query] = embedding
+            while len(self._query_embeddings) > self.cache_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def search(self, query: str, max_results: int = None, include_sentences: bool = False,
+               include_embeddings: bool = False) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """
+        Search the knowledge base
+
+        Args:
+            query: Search text
+            max_results: Number of nearest chunks to query (before the threshold)
+            include_sentences: Attach each chunk's sentence index (from Redis) as "sentence_index"
+            include_embeddings: Attach each chunk's stored embedding as "embedding"
+                (base64 little-endian float32)
+
+        Returns:
+            Tuple of (results above the similarity threshold, nearest first;
+            query embedding)
+        """
+        if max_results is None:
+            max_results = MAX_SEARCH_RESULTS
+
+        with self.instrumentation.span("embed"):
+            query_embedding = self.embed_query(query)
+
+        with self.instrumentation.span("chroma_query"):
+            with self.instrumentation.chroma_call("get_collection"):
+                collection = self.chroma_client.get_collection(self.collection_name)
+            include = ["documents", "metadatas", "distances"]
+            if include_embeddings:
+                include.append("embeddings")
+            with self.instrumentation.chroma_call("query"):
+                results = collection.query(
+                    query_embeddings=to_chroma(query_embedding[None, :]),
+                    n_results=max_results,
+                    include=include
+                )
+
+        formatted_results = []
+        for i in range(len(results["documents"][0])):
+            distance = results["distances"][0][i] if results["distances"] else 0.0
+            # Convert distance to similarity (lower distance = higher similarity)
+            similarity = 1.0 - distance if distance else 1.0
+
+            # Only include results above similarity threshold
+            if similarity >= self.similarity_threshold:
+                # Chunks ingested before the index moved to Redis carry it in their metadata
+                metadata, sentence_index = split_index_fields(results["metadatas"][0][i])
+                result = {
+                    "id": results["ids"][0][i],
+                    "content": results["documents"][0][i],
+                    "metadata": metadata,
+                    "distance": distance,
+                    "similarity": similarity
+                }
+                if include_sentences and sentence_index is not None:
+                    result["sentence_index"] = sentence_index
+                if include_embeddings:
+                    embedding = np.asarray(results["embeddings"][0][i], dtype="<f4")
+                    result["embedding"] = base64.b64encode(embedding.tobytes()).decode("ascii")
+                formatted_results.append(result)
+
+        if include_sentences and self.redis_client is not None:
+            missing = [result for result in formatted_results if "sentence_index" not in result]
+            with self.instrumentation.span("sentence_index"):
+                indexes = load_sentence_indexes(self.redis_client, [result["id"] for result in missing])
+            for result, sentence_index in zip(missing, indexes):
+                if sentence_index is not None:
+                    result["sentence_index"] = sentence_index
+
+        self.instrumentation.search_results(len(formatted_results))
+        return formatted_results, query_embedding
@@ -0,0 +1,136 @@
+"""
+Per-chunk sentence index
+At ingest each chunk is split into sentences, and the sentence offsets, their
+hashed token IDs and their embeddings are stored in Redis under the chunk's
+ID, next to (not inside) the chunk's Chroma metadata. The action server's
+extractive answer path scores these directly (BM25 and embedding similarity)
+instead of re-segmenting text on every question.
+
+Segmentation and tokenization come from the shared sentences module, which
+the action server's sentence_ranker.py uses too.
+"""
+
+import base64
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sentences import sentence_spans, token_ids
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_INDEX_ENABLED = os.getenv("SENTENCE_INDEX_ENABLED", "true").lower() == "true"
+SENTENCE_INDEX_VERSION = 1
+# Redis key prefix; the index of a chunk is a JSON string under prefix + chunk ID
+SENTENCE_INDEX_PREFIX = "sentences:"
+
+# Index fields
+SPANS_FIELD = "sentence_spans"            # JSON [[start, end, n_tokens], ...] into the chunk text
+TOKENS_FIELD = "sentence_tokens"          # base64 uint32 token IDs, all sentences concatenated
+EMBEDDINGS_FIELD = "sentence_embeddings"  # base64 int8 codes of the unit vectors, one row per sentence
+SCALES_FIELD = "sentence_scales"          # base64 float32 dequantization scale per sentence
+VERSION_FIELD = "sentence_index_version"
+INDEX_FIELDS = (SPANS_FIELD, TOKENS_FIELD, EMBEDDINGS_FIELD, SCALES_FIELD, VERSION_FIELD)
+
+
+def build_sentence_index(chunks: List[str],
+                         embed: Callable[[List[str]], np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Build the sentence index for a batch of chunks
+
+    Args:
+        chunks: Chunk texts
+        embed: Embeds a list of texts (the knowledge-base embedding model)
+
+    Returns:
+        One index dict per chunk, to store with store_sentence_indexes
+    """
+    spans_per_chunk = [sentence_spans(chunk) for chunk in chunks]
+    sentences = [chunk[start:end] for chunk, spans in zip(chunks, spans_per_chunk) for start, end in spans]
+    # One model call for every sentence in the batch
+    embeddings = np.asarray(embed(sentences), dtype=np.float32) if sentences else np.empty((0, 0), np.float32)
+    if len(embeddings):
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings = embeddings / norms
+
+    index = []
+    row = 0
+    for chunk, spans in zip(chunks, spans_per_chunk):
+        ids = [token_ids(chunk[start:end]) for start, end in spans]
+        vectors = embeddings[row:row + len(spans)]
+        row += len(spans)
+        # int8 with a per-sentence scale keeps the index (and decode time) small
+        scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.empty(0, np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        index.append({
+            SPANS_FIELD: json.dumps([[start, end, len(tokens)] for (start, end), tokens in zip(spans, ids)]),
+            TOKENS_FIELD: base64.b64encode(
+                (np.concatenate(ids) if ids else np.empty(0, np.uint32)).tobytes()
+            ).decode("ascii"),
+            EMBEDDINGS_FIELD: base64.b64encode(codes.tobytes()).decode("ascii"),
+            SCALES_FIELD: base64.b64encode(scales.astype(np.float32).tobytes()).decode("ascii"),
+            VERSION_FIELD: SENTENCE_INDEX_VERSION,
+        })
+    return index
+
+
+def store_sentence_indexes(redis_client, chunk_ids: Sequence[str], indexes: Sequence[Dict[str, Any]]) -> None:
+    """Save the sentence indexes of chunks (one pipeline round trip)"""
+    pipe = redis_client.pipeline(transaction=False)
+    for chunk_id, index in zip(chunk_ids, indexes):
+        pipe.set(SENTENCE_INDEX_PREFIX + chunk_id, json.dumps(index))
+    pipe.execute()
+
+
+def load_sentence_indexes(redis_client, chunk_ids: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Sentence indexes of chunks
+
+    Returns:
+        One index per chunk ID, None where the chunk has none
+    """
+    if not chunk_ids:
+        return []
+    indexes = []
+    for chunk_id, value in zip(chunk_ids, redis_client.mget([SENTENCE_INDEX_PREFIX + i for i in chunk_ids])):
+        try:
+            indexes.append(json.loads(value) if value else None)
+        except ValueError as e:
+            logger.warning(f"Unreadable sentence index for {chunk_id}: {e}")
+            indexes.append(None)
+    return indexes
+
+
+def delete_sentence_indexes(redis_client, chunk_ids: Sequence[str]) -> None:
+    """Drop the sentence indexes of deleted chunks"""
+    if chunk_ids:
+        redis_client.delete(*(SENTENCE_INDEX_PREFIX + chunk_id for chunk_id in chunk_ids))
+
+
+def clear_sentence_indexes(redis_client) -> None:
+    """Drop every sentence index"""
+    keys = list(redis_client.scan_iter(f"{SENTENCE_INDEX_PREFIX}*", count=1000))
+    for start in range(0, len(keys), 1000):
+        redis_client.delete(*keys[start:start + 1000])
+
+
+def split_index_fields(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Separate a sentence index from the rest of a chunk's metadata
+
+    Chunks ingested before the index moved to Redis carry it in their
+    metadata; importing an export moves it out (see index_io.py).
+
+    Returns:
+        Tuple of (metadata without index fields, index fields or None)
+    """
+    if not metadata or SPANS_FIELD not in metadata:
+        return metadata, None
+    clean = {key: value for key, value in metadata.items() if key not in INDEX_FIELDS}
+    index = {key: metadata[key] for key in INDEX_FIELDS if key in metadata}
+    return clean, index
@@ -0,0 +1,54 @@
+"""
+Sentence segmentation and word token IDs
+The pdf-processor indexes chunk sentences with these at ingest
+(sentence_index.py), the action server scores questions against that index
+(sentence_ranker.py) and packs the LLM context from the same sentences
+(context_packer.py), so all of them segment and tokenize identically.
+
+Shared by the action server and pdf-processor: each image copies this one
+file in (docker-compose "shared" build context). Outside Docker, put shared/
+on PYTHONPATH.
+"""
+
+import re
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+# Sentence ends, and blank lines between paragraphs (PDF line wraps and table
+# rows are single line breaks and stay inside their sentence)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?؟。])\s+|\n\s*\n")
+# Fragments without any word character (stray punctuation, rules) are dropped;
+# short facts such as "Sugar 12g" are kept
+WORD_CHARACTER = re.compile(r"\w")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """Character offsets of the sentences in text, whitespace trimmed"""
+    spans = []
+    start = 0
+    for boundary in list(SENTENCE_BOUNDARY.finditer(text)) + [None]:
+        end = boundary.start() if boundary else len(text)
+        segment = text[start:end]
+        stripped = segment.strip()
+        if WORD_CHARACTER.search(stripped):
+            left = start + (len(segment) - len(segment.lstrip()))
+            spans.append((left, left + len(stripped)))
+        if boundary:
+            start = boundary.end()
+    return spans
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of text, whitespace trimmed"""
+    return [text[start:end] for start, end in sentence_spans(text)]
+
+
+def token_ids(text: str) -> np.ndarray:
+    """Stable 32-bit IDs of the lowercased word tokens in text"""
+    return np.array(
+        [zlib.crc32(token.encode("utf-8")) for token in TOKEN_PATTERN.findall(text.lower())],
+        dtype=np.uint32
+    )
@@ -0,0 +1,185 @@
+"""
+Request tracing and sampling profiler
+Trace IDs are propagated between services in the X-Trace-Id header; each
+service records timed spans for the current request and reports them in a
+Server-Timing response header. Profiling is opt-in per request.
+
+Shared by the action server, pdf-processor and web UI: each image copies this
+one file in (docker-compose "shared" build context). Outside Docker, put
+shared/ on PYTHONPATH.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "X-Trace-Id"
+PROFILE_HEADER = "X-Profile"
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+
+_TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Timed spans recorded for one request"""
+
+    def __init__(self, trace_id: str = None):
+        if not trace_id or not _TRACE_ID_PATTERN.match(trace_id):
+            trace_id = uuid.uuid4().hex
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, float]] = []
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as a named span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, (time.perf_counter() - start) * 1000)
+
+    def add_span(self, name: str, duration_ms: float) -> None:
+        """Record a span measured elsewhere (e.g. by a downstream service)"""
+        self.spans.append({"name": name, "dur": round(duration_ms, 2)})
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        """Format spans plus the total as a Server-Timing header value"""
+        entries = [f"{s['name']};dur={s['dur']}" for s in self.spans]
+        entries.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+def start_trace(trace_id: str = None) -> Trace:
+    """Begin a trace for the current request context"""
+    trace = Trace(trace_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block on the current trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def parse_server_timing(header: str) -> List[Dict[str, float]]:
+    """Parse a Server-Timing header into span dicts"""
+    spans = []
+    for entry in (header or "").split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        if not parts[0]:
+            continue
+        for param in parts[1:]:
+            if param.startswith("dur="):
+                try:
+                    spans.append({"name": parts[0], "dur": float(param[4:])})
+                except ValueError:
+                    pass
+    return spans
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a single thread
+
+    A daemon thread snapshots the target thread's stack every interval and
+    aggregates identical stacks. The output is in collapsed ("folded") format,
+    one `frame;frame;frame count` line per stack, which flamegraph.pl,
+    speedscope and inferno read directly. Async handlers share the event
+    loop thread, so samples can include other requests running concurrently.
+    """
+
+    def __init__(self, thread_id: int = None, interval_ms: float = None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = (interval_ms or PROFILE_INTERVAL_MS) / 1000.0
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, name: str, directory: str = None) -> Optional[str]:
+        """
+        Write collected stacks in folded format
+
+        Args:
+            name: File name stem, usually the trace ID
+            directory: Output directory (defaults to PROFILE_DIR)
+
+        Returns:
+            Path of the written file, or None if nothing was sampled
+        """
+        if not self.samples:
+            return None
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def should_profile(flag: Optional[str]) -> bool:
+    """Whether a request asked for profiling and profiling is enabled"""
+    return PROFILING_ENABLED and str(flag or "").lower() in ("1", "true", "yes")
+
+
+def finish_profile(profiler: SamplingProfiler, trace: Trace, label: str) -> None:
+    """Stop a profiler and dump its stacks if the request was slow"""
+    profiler.stop()
+    elapsed = trace.elapsed_ms()
+    if elapsed < PROFILE_SLOW_MS:
+        return
+    path = profiler.dump(f"{label}-{trace.trace_id}")
+    if path:
+        logger.info(f"Profile for slow request {trace.trace_id} ({elapsed:.0f} ms) written to {path}")
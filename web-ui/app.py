@@ -5,16 +5,36 @@ Provides a web interface to view documents, collections, and interact with the R
 """
 
 from fastapi import FastAPI, Request, HTTPException, File, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import requests
+import httpx
 import os
 import asyncio
 import chromadb
-from typing import List, Dict, Any
+import redis.asyncio as aioredis
+from typing import List, Dict, Any, Optional
 import json
+import time
+import uuid
 from datetime import datetime
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from collection_browser import BrowseError, BrowseQuery, StaleCursor, clamp_limit
+from collection_stats import CollectionStats
+from health_monitor import HealthMonitor, UnhealthyService
+from metrics import CHAT_TTFT_SECONDS, HTTP_REQUEST_SECONDS, UPSTREAM_REQUEST_SECONDS
+from tracing import (
+    PROFILE_HEADER,
+    TRACE_HEADER,
+    SamplingProfiler,
+    current_trace,
+    finish_profile,
+    parse_server_timing,
+    should_profile,
+    span,
+    start_trace,
+)
 
 app = FastAPI(title="RAG System UI", description="Web interface for RAG document management")
 
@@ -25,8 +45,100 @@ templates = Jinja2Templates(directory="templates")
 # Configuration
 PDF_PROCESSOR_URL = os.getenv("PDF_PROCESSOR_URL", "http://localhost:8001")
 RASA_SERVER_URL = os.getenv("RASA_SERVER_URL", "http://localhost:5005")
+ACTION_SERVER_URL = os.getenv("ACTION_SERVER_URL", "http://localhost:5055")
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+RASA_TIMEOUT = float(os.getenv("RASA_TIMEOUT", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+UPLOAD_TIMEOUT = float(os.getenv("UPLOAD_TIMEOUT", "120"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Seconds between keepalive comments on the system status stream
+STATUS_STREAM_KEEPALIVE = float(os.getenv("STATUS_STREAM_KEEPALIVE", "15"))
+# Channel the action server publishes partial answers to (see actions.py)
+CHAT_STREAM_CHANNEL = "chat-stream:{}"
+
+# Async Redis client, used to collect spans published by the action server
+redis_client = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+
+# One pooled async client for every upstream call (pdf-processor, Rasa, health
+# checks), so a slow upstream only delays its own request, never the event loop
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(HTTP_TIMEOUT),
+    limits=httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+)
+# Long-lived progress streams have no read timeout
+STREAM_TIMEOUT = httpx.Timeout(HTTP_TIMEOUT, read=None)
+
+# Chroma's client is synchronous; it is shared and only called from worker threads
+chroma_client = None
+
+def get_chroma_client():
+    global chroma_client
+    if chroma_client is None:
+        chroma_client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    return chroma_client
+
+# Collection counts and samples, kept up to date from the pdf-processor's knowledge-base events
+collection_stats = CollectionStats(get_chroma_client, redis_client)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record per-route request latency"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Start a trace per request and report spans in a Server-Timing header"""
+    trace = start_trace(request.headers.get(TRACE_HEADER))
+    profiler = None
+    if should_profile(request.headers.get(PROFILE_HEADER)):
+        profiler = SamplingProfiler()
+        profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiler is not None:
+            finish_profile(profiler, trace, "web-ui")
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers[TRACE_HEADER] = trace.trace_id
+    return response
+
+async def merge_action_trace(trace) -> None:
+    """Add the spans the action server published for this trace"""
+    try:
+        spans = await redis_client.get(f"trace:{trace.trace_id}")
+    except Exception:
+        return
+    if not spans:
+        return
+    rasa_ms = next((s["dur"] for s in trace.spans if s["name"] == "rasa"), None)
+    for action_span in json.loads(spans):
+        trace.add_span(action_span["name"], action_span["dur"])
+        if action_span["name"] == "action" and rasa_ms is not None:
+            # Time spent in Rasa itself (NLU, policies, action call overhead)
+            trace.add_span("rasa_overhead", max(rasa_ms - action_span["dur"], 0.0))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
@@ -37,110 +149,330 @@ async def dashboard(request: Request):
 async def get_documents():
     """Get all documents from PDF processor"""
     try:
-        response = requests.get(f"{PDF_PROCESSOR_URL}/documents")
+        with UPSTREAM_REQUEST_SECONDS.labels("pdf_processor", "documents").time():
+            response = await http_client.get(f"{PDF_PROCESSOR_URL}/documents")
         response.raise_for_status()
         return response.json()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch documents: {str(e)}")
 
 @app.get("/api/collections")
-async def get_chroma_collections():
-    """Get ChromaDB collections information"""
+async def get_chroma_collections(request: Request):
+    """
+    Get ChromaDB collections information
+
+    Counts, per-document chunk counts and samples come from the cached
+    collection statistics; a matching If-None-Match gets 304 Not Modified.
+    """
     try:
-        client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-        collections = client.list_collections()
-        
-        collections_info = []
-        for collection in collections:
-            try:
-                coll_obj = client.get_collection(collection.name)
-                count = coll_obj.count()
-                
-                # Get some sample documents
-                samples = coll_obj.peek(limit=3)
-                
-                collections_info.append({
-                    "name": collection.name,
-                    "id": collection.id,
-                    "count": count,
-                    "metadata": collection.metadata or {},
-                    "sample_documents": samples.get("documents", [])[:3] if samples else []
-                })
-            except Exception as e:
-                collections_info.append({
-                    "name": collection.name,
-                    "id": collection.id,
-                    "count": "Error",
-                    "metadata": {},
-                    "sample_documents": [],
-                    "error": str(e)
-                })
-        
-        return {"collections": collections_info}
+        payload, etag = await collection_stats.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch collections: {str(e)}")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
+
+@app.post("/api/collections/resync")
+async def resync_collection_stats():
+    """
+    Rebuild the cached collection statistics with a full metadata scan
+
+    Also counts documents that have no pdf-processor record. Reads every
+    chunk's metadata, so it is only run on request.
+    """
+    try:
+        payload, etag = await collection_stats.resync()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resync collection statistics: {str(e)}")
+    return JSONResponse(content=payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 @app.get("/api/collection/{collection_name}")
-async def get_collection_details(collection_name: str, limit: int = 50):
-    """Get detailed information about a specific collection"""
+async def get_collection_details(collection_name: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                                 fields: Optional[str] = None, where: Optional[str] = None,
+                                 file_id: Optional[str] = None, contains: Optional[str] = None):
+    """
+    Browse a collection one page at a time
+
+    Pass next_cursor back as cursor for the following page (null on the last
+    page). The cursor is an offset checked against the last row returned: a
+    change before it answers 409 and browsing restarts from the first page.
+    fields selects "document" and/or "metadata"; where (Chroma metadata
+    filter as JSON), file_id and contains filter the rows. Embeddings are
+    never fetched.
+    """
     try:
-        client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-        collection = client.get_collection(collection_name)
-        
-        # Get documents with metadata
-        results = collection.get(limit=limit, include=["documents", "metadatas", "embeddings"])
-        
-        return {
-            "name": collection_name,
-            "count": collection.count(),
-            "documents": results.get("documents", []),
-            "metadatas": results.get("metadatas", []),
-            "ids": results.get("ids", []),
-            "has_embeddings": len(results.get("embeddings", [])) > 0
-        }
+        query = BrowseQuery(collection_name, fields, where, file_id, contains)
+        offset, after = query.decode_cursor(cursor)
+    except BrowseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page_size = clamp_limit(limit)
+
+    def fetch():
+        collection = get_chroma_client().get_collection(collection_name)
+        with UPSTREAM_REQUEST_SECONDS.labels("chroma", "get").time():
+            return query.fetch(collection, offset, page_size, after)
+
+    try:
+        rows, more = await asyncio.to_thread(fetch)
+    except StaleCursor as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch collection details: {str(e)}")
 
+    # The total comes from the cached collection statistics, not another Chroma call
+    try:
+        stats, _ = await collection_stats.get()
+        count = next((c["count"] for c in stats["collections"] if c["name"] == collection_name), None)
+    except Exception:
+        count = None
+    return {
+        "name": collection_name,
+        "count": count,
+        "fields": query.fields,
+        "rows": rows,
+        "next_cursor": query.encode_cursor(offset + len(rows), rows[-1]["id"]) if more else None
+    }
+
+@app.get("/api/collection/{collection_name}/export")
+async def export_collection(collection_name: str, fields: Optional[str] = None, where: Optional[str] = None,
+                            file_id: Optional[str] = None, contains: Optional[str] = None,
+                            cursor: Optional[str] = None):
+    """
+    Stream a collection (or the rows matching a filter) as NDJSON
+
+    One JSON object per line, with the same fields and filters as the
+    browse endpoint. Rows are read EXPORT_PAGE_SIZE at a time and written as
+    they arrive. If the collection changes before the next page mid-export,
+    the stream ends with an {"error": ...} line instead of skipping rows.
+    """
+    try:
+        query = BrowseQuery(collection_name, fields, where, file_id, contains)
+        offset, after = query.decode_cursor(cursor)
+        collection = await asyncio.to_thread(get_chroma_client().get_collection, collection_name)
+    except BrowseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {str(e)}")
+
+    async def lines():
+        pages = query.iter_pages(collection, offset, after)
+        while True:
+            try:
+                with UPSTREAM_REQUEST_SECONDS.labels("chroma", "export_page").time():
+                    rows = await asyncio.to_thread(next, pages, None)
+            except StaleCursor as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+                return
+            if rows is None:
+                return
+            yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={
+        "Content-Disposition": f'attachment; filename="{collection_name}.ndjson"',
+        "X-Accel-Buffering": "no"
+    })
+
 @app.get("/api/search")
 async def search_documents(query: str, limit: int = 10):
     """Search documents using the PDF processor API"""
     try:
-        response = requests.get(f"{PDF_PROCESSOR_URL}/search", params={"query": query, "limit": limit})
+        trace = current_trace()
+        with span("search"), UPSTREAM_REQUEST_SECONDS.labels("pdf_processor", "search").time():
+            response = await http_client.get(
+                f"{PDF_PROCESSOR_URL}/search",
+                params={"query": query, "max_results": limit},
+                headers={TRACE_HEADER: trace.trace_id}
+            )
+        for pdf_span in parse_server_timing(response.headers.get("Server-Timing")):
+            if pdf_span["name"] != "total":
+                trace.add_span(f"pdf_{pdf_span['name']}", pdf_span["dur"])
         response.raise_for_status()
         return response.json()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 @app.post("/api/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(file: UploadFile = File(...), batch_id: Optional[str] = None):
     """Upload a document via the PDF processor"""
     try:
         files = {"file": (file.filename, file.file, file.content_type)}
-        response = requests.post(f"{PDF_PROCESSOR_URL}/upload-pdf", files=files)
+        params = {"batch_id": batch_id} if batch_id else None
+        with UPSTREAM_REQUEST_SECONDS.labels("pdf_processor", "upload").time():
+            response = await http_client.post(
+                f"{PDF_PROCESSOR_URL}/upload-pdf", files=files, params=params, timeout=UPLOAD_TIMEOUT
+            )
         response.raise_for_status()
         return response.json()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+async def relay_event_stream(path: str, params: Dict[str, Any] = None) -> StreamingResponse:
+    """Relay a Server-Sent Event stream from the PDF processor"""
+    request = http_client.build_request("GET", f"{PDF_PROCESSOR_URL}{path}", params=params, timeout=STREAM_TIMEOUT)
+    try:
+        upstream = await http_client.send(request, stream=True)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Progress stream unavailable: {str(e)}")
+    if upstream.status_code != 200:
+        await upstream.aread()
+        await upstream.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail=upstream.text)
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(relay(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.on_event("startup")
+async def start_background_tasks():
+    health_monitor.start()
+    collection_stats.start()
+
+@app.on_event("shutdown")
+async def close_clients():
+    await health_monitor.stop()
+    await collection_stats.stop()
+    await http_client.aclose()
+
+@app.get("/api/progress/{file_id}")
+async def stream_file_progress(file_id: str):
+    """Ingestion progress of one document as Server-Sent Events"""
+    return await relay_event_stream(f"/progress/{file_id}")
+
+@app.get("/api/progress/batch/{batch_id}")
+async def stream_batch_progress(batch_id: str, expected: Optional[int] = None):
+    """Ingestion progress of an upload batch as Server-Sent Events"""
+    params = {"expected": expected} if expected is not None else None
+    return await relay_event_stream(f"/progress/batch/{batch_id}", params)
+
+def wants_fresh_answer(request: Request) -> bool:
+    """A "Cache-Control: no-cache" request skips the action server's answer caches"""
+    return "no-cache" in request.headers.get("Cache-Control", "")
+
 @app.post("/api/chat")
-async def chat_with_rasa(message: str):
+async def chat_with_rasa(message: str, request: Request):
     """Send message to Rasa chatbot"""
     try:
+        trace = current_trace()
+        # Rasa passes message metadata through to the action server's tracker
         payload = {
             "sender": "web-ui-user",
-            "message": message
+            "message": message,
+            "metadata": {
+                "trace_id": trace.trace_id,
+                "profile": request.headers.get(PROFILE_HEADER),
+                "no_cache": wants_fresh_answer(request)
+            }
         }
-        response = requests.post(f"{RASA_SERVER_URL}/webhooks/rest/webhook", json=payload)
+        with span("rasa"), UPSTREAM_REQUEST_SECONDS.labels("rasa", "webhook").time():
+            response = await http_client.post(
+                f"{RASA_SERVER_URL}/webhooks/rest/webhook", json=payload, timeout=RASA_TIMEOUT
+            )
         response.raise_for_status()
-        return {"responses": response.json()}
+        await merge_action_trace(trace)
+        return {"responses": response.json(), "trace_id": trace.trace_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_with_rasa_streaming(message: str, request: Request, sender: str = "web-ui-user"):
+    """
+    Send message to Rasa chatbot and stream the answer as Server-Sent Events
+    
+    Events: "delta" (answer tokens as the LLM produces them), "reset" (discard
+    partial text, the LLM call is being retried), "message" (the final Rasa
+    responses), "done" (trace_id and timings) and "error".
+    """
+    trace = current_trace()
+    stream_id = uuid.uuid4().hex
+    channel = CHAT_STREAM_CHANNEL.format(stream_id)
+    pubsub = redis_client.pubsub()
+    try:
+        # Subscribe before Rasa runs the action so no token is missed
+        await pubsub.subscribe(channel)
+    except Exception as e:
+        await pubsub.close()
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+    
+    payload = {
+        "sender": sender,
+        "message": message,
+        "metadata": {
+            "trace_id": trace.trace_id,
+            "profile": request.headers.get(PROFILE_HEADER),
+            "no_cache": wants_fresh_answer(request),
+            "stream_id": stream_id
+        }
+    }
+    start = time.perf_counter()
+    rasa_call = asyncio.create_task(
+        http_client.post(f"{RASA_SERVER_URL}/webhooks/rest/webhook", json=payload, timeout=RASA_TIMEOUT)
+    )
+    
+    async def events():
+        ttft_ms = None
+        
+        def relay(raw) -> str:
+            nonlocal ttft_ms
+            event = json.loads(raw["data"])
+            if event["type"] == "delta" and ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+                CHAT_TTFT_SECONDS.observe(ttft_ms / 1000)
+            return format_sse(event["type"], event)
+        
+        try:
+            while not rasa_call.done():
+                raw = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.05)
+                if raw is not None:
+                    yield relay(raw)
+            # Tokens published just before the action returned
+            while (raw := await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.01)) is not None:
+                yield relay(raw)
+            
+            response = rasa_call.result()
+            rasa_ms = (time.perf_counter() - start) * 1000
+            UPSTREAM_REQUEST_SECONDS.labels("rasa", "webhook").observe(rasa_ms / 1000)
+            response.raise_for_status()
+            trace.add_span("rasa", rasa_ms)
+            await merge_action_trace(trace)
+            
+            responses = response.json()
+            yield format_sse("message", {"responses": responses})
+            yield format_sse("done", {
+                "trace_id": trace.trace_id,
+                "ttft_ms": ttft_ms,
+                "total_ms": rasa_ms,
+                "server_timing": trace.server_timing()
+            })
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Chat failed: {str(e)}"})
+        finally:
+            if not rasa_call.done():
+                rasa_call.cancel()
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.close()
+            except Exception:
+                pass
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.delete("/api/documents/{file_id}")
 async def delete_document(file_id: str):
     """Delete a document"""
     try:
-        response = requests.delete(f"{PDF_PROCESSOR_URL}/documents/{file_id}")
+        with UPSTREAM_REQUEST_SECONDS.labels("pdf_processor", "delete").time():
+            response = await http_client.delete(f"{PDF_PROCESSOR_URL}/documents/{file_id}")
         response.raise_for_status()
         return {"message": "Document deleted successfully"}
     except Exception as e:
@@ -150,36 +482,74 @@ async def delete_document(file_id: str):
 async def clear_all_documents():
     """Clear all documents from the knowledge base"""
     try:
-        response = requests.delete(f"{PDF_PROCESSOR_URL}/clear-knowledge-base")
+        with UPSTREAM_REQUEST_SECONDS.labels("pdf_processor", "clear").time():
+            response = await http_client.delete(f"{PDF_PROCESSOR_URL}/documents")
         response.raise_for_status()
         return {"message": "Knowledge base cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Clear failed: {str(e)}")
 
+def http_probe(url: str, json_response: bool = True):
+    """Health probe for an HTTP endpoint that answers 200 when the service is up"""
+    async def probe():
+        response = await http_client.get(url)
+        if response.status_code != 200:
+            raise UnhealthyService(f"HTTP {response.status_code}")
+        return response.json() if json_response else "OK"
+    return probe
+
+async def redis_probe():
+    await redis_client.ping()
+    return "PONG"
+
+# One monitor probes every service on a schedule; status requests and streams read its cache
+health_monitor = HealthMonitor({
+    "pdf_processor": http_probe(f"{PDF_PROCESSOR_URL}/health"),
+    "rasa_server": http_probe(f"{RASA_SERVER_URL}/", json_response=False),
+    "chroma_db": http_probe(f"http://{CHROMA_HOST}:{CHROMA_PORT}/api/v1/heartbeat"),
+    "action_server": http_probe(f"{ACTION_SERVER_URL}/health"),
+    "redis": redis_probe,
+})
+
 @app.get("/api/system-status")
-async def get_system_status():
-    """Get overall system health status"""
-    services = {
-        "pdf_processor": {"url": f"{PDF_PROCESSOR_URL}/health", "status": "unknown"},
-        "rasa_server": {"url": f"{RASA_SERVER_URL}/", "status": "unknown"},
-        "chroma_db": {"url": f"http://{CHROMA_HOST}:{CHROMA_PORT}/api/v1/heartbeat", "status": "unknown"}
-    }
-    
-    # Check each service
-    for service_name, service_info in services.items():
+async def get_system_status(refresh: bool = False):
+    """
+    Get overall system health status
+
+    Served from the health monitor's latest check round; refresh=true (or a
+    request before the first round) runs a round first, and concurrent
+    refreshes share it.
+    """
+    if refresh or health_monitor.last_round is None:
+        return await health_monitor.refresh()
+    return health_monitor.snapshot()
+
+@app.get("/api/system-status/stream")
+async def stream_system_status(request: Request):
+    """
+    System health as Server-Sent Events
+
+    Sends a "status" event with the current snapshot on connect and again
+    whenever a service changes state, with keepalive comments in between.
+    """
+    queue = health_monitor.subscribe()
+
+    async def events():
         try:
-            response = requests.get(service_info["url"], timeout=5)
-            if response.status_code == 200:
-                services[service_name]["status"] = "healthy"
-                services[service_name]["response"] = response.json() if service_name != "rasa_server" else "OK"
-            else:
-                services[service_name]["status"] = "unhealthy"
-        except Exception as e:
-            services[service_name]["status"] = "error"
-            services[service_name]["error"] = str(e)
-    
-    return services
+            yield format_sse("status", {"version": health_monitor.version, "services": health_monitor.snapshot()})
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), STATUS_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {payload}\n\n"
+        finally:
+            health_monitor.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8002, reload=True)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8002, reload=True)
@@ -0,0 +1,190 @@
+"""
+Collection browsing and export
+Pages through a Chroma collection with an opaque cursor, an optional
+metadata / document filter and a choice of fields. Embeddings are never
+requested, and chunk metadata no longer holds the sentence index (it is
+kept in Redis). Exports stream the same rows as NDJSON one page at a time,
+so memory use does not depend on the collection size.
+
+Chroma's get() only pages by offset, so a cursor is an offset plus the ID
+of the last row returned. The next page is read from one row earlier and
+must start with that ID; if rows before the cursor were deleted or
+inserted, the pages have shifted and the cursor is rejected as stale
+instead of silently skipping or repeating rows.
+"""
+
+import base64
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BROWSE_DEFAULT_LIMIT = int(os.getenv("BROWSE_DEFAULT_LIMIT", "50"))
+BROWSE_MAX_LIMIT = int(os.getenv("BROWSE_MAX_LIMIT", "500"))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+# Selectable row fields (the ID is always returned) and the Chroma include they map to
+FIELDS = {"document": "documents", "metadata": "metadatas"}
+
+
+class BrowseError(ValueError):
+    """Invalid browse parameters (reported as 400)"""
+
+
+class StaleCursor(BrowseError):
+    """The collection changed before the cursor's position (reported as 409)"""
+
+
+def public_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Chunk metadata without a sentence index left in it by ingestion before the index moved to Redis"""
+    return {key: value for key, value in (metadata or {}).items() if not key.startswith("sentence_")}
+
+
+class BrowseQuery:
+    """A filtered, field-selected view of one collection"""
+
+    def __init__(self, collection_name: str, fields: Optional[str] = None, where: Optional[str] = None,
+                 file_id: Optional[str] = None, contains: Optional[str] = None):
+        """
+        Parse browse parameters
+
+        Args:
+            collection_name: Collection to browse
+            fields: Comma-separated row fields ("document", "metadata"); both by default
+            where: Chroma metadata filter as JSON, e.g. {"filename": "menu.pdf"}
+            file_id: Shortcut for a file_id metadata filter (combined with where)
+            contains: Only rows whose document contains this text
+
+        Raises:
+            BrowseError: Unknown field or malformed filter
+        """
+        self.collection_name = collection_name
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(FIELDS)
+        unknown = [field for field in self.fields if field not in FIELDS]
+        if unknown:
+            raise BrowseError(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(FIELDS)})")
+
+        filters = []
+        if where:
+            try:
+                parsed = json.loads(where)
+            except json.JSONDecodeError as e:
+                raise BrowseError(f"where is not valid JSON: {e}") from e
+            if not isinstance(parsed, dict):
+                raise BrowseError("where must be a JSON object")
+            if parsed:
+                filters.append(parsed)
+        if file_id:
+            filters.append({"file_id": file_id})
+        self.where = filters[0] if len(filters) == 1 else ({"$and": filters} if filters else None)
+        self.where_document = {"$contains": contains} if contains else None
+
+    @property
+    def include(self) -> List[str]:
+        return [FIELDS[field] for field in self.fields]
+
+    def fingerprint(self) -> str:
+        """Identifies the collection and filter a cursor belongs to"""
+        payload = json.dumps([self.collection_name, self.where, self.where_document], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+    def encode_cursor(self, offset: int, last_id: str) -> str:
+        """
+        Cursor for the page after offset rows, the last of them being last_id
+        """
+        raw = json.dumps({"offset": offset, "after": last_id, "query": self.fingerprint()}).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor: Optional[str]) -> Tuple[int, Optional[str]]:
+        """
+        Position a cursor points at
+
+        Returns:
+            Tuple of (offset, ID of the row before it); (0, None) without a cursor
+
+        Raises:
+            BrowseError: Malformed cursor, or a cursor issued for another collection or filter
+        """
+        if not cursor:
+            return 0, None
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            offset = int(state["offset"])
+            after = str(state["after"])
+            query = state["query"]
+        except Exception as e:
+            raise BrowseError("Invalid cursor") from e
+        if query != self.fingerprint() or offset < 1:
+            raise BrowseError("Cursor does not belong to this collection and filter")
+        return offset, after
+
+    def fetch(self, collection, offset: int, limit: int,
+              after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Read one page (blocking Chroma call; run in a thread)
+
+        Args:
+            collection: Chroma collection
+            offset: Rows to skip
+            limit: Rows to return
+            after: ID expected at offset - 1 (from the cursor); checked when given
+
+        Returns:
+            Tuple of (rows, whether more rows follow)
+
+        Raises:
+            StaleCursor: The row before offset is no longer after
+        """
+        # One extra row tells whether there is a next page without a count query,
+        # and one row before the page checks that the pages have not shifted
+        skip = 1 if after is not None and offset > 0 else 0
+        results = collection.get(
+            where=self.where,
+            where_document=self.where_document,
+            limit=limit + 1 + skip,
+            offset=offset - skip,
+            include=self.include
+        )
+        ids = results["ids"]
+        if skip and (not ids or ids[0] != after):
+            raise StaleCursor("The collection changed before this cursor; start again from the first page")
+        rows = []
+        for i in range(skip, min(len(ids), limit + skip)):
+            row = {"id": ids[i]}
+            if "document" in self.fields:
+                row["document"] = results["documents"][i]
+            if "metadata" in self.fields:
+                row["metadata"] = public_metadata(results["metadatas"][i])
+            rows.append(row)
+        return rows, len(ids) > limit + skip
+
+    def iter_pages(self, collection, offset: int = 0, after: Optional[str] = None,
+                   page_size: int = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Pages of rows until the end of the collection (blocking; call next() in a thread)
+
+        Args:
+            collection: Chroma collection
+            offset: Rows to skip
+            after: ID expected at offset - 1 (from the cursor)
+            page_size: Rows per Chroma request
+
+        Raises:
+            StaleCursor: The collection changed before the next page
+        """
+        page_size = page_size or EXPORT_PAGE_SIZE
+        while True:
+            rows, more = self.fetch(collection, offset, page_size, after)
+            if rows:
+                yield rows
+            if not more:
+                return
+            offset += len(rows)
+            after = rows[-1]["id"]
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Page size within 1..BROWSE_MAX_LIMIT"""
+    if limit is None:
+        return BROWSE_DEFAULT_LIMIT
+    return max(1, min(limit, BROWSE_MAX_LIMIT))
@@ -0,0 +1,287 @@
+"""
+Cached collection statistics for the dashboard
+Per-collection chunk counts come from Chroma's count(), per-document chunk
+counts from the pdf-processor's document records in Redis (pdf:<file_id>)
+and sample chunks from one small read per collection, so building the
+statistics never reads chunk metadata. They are then kept up to date from
+the pdf-processor's knowledge-base events (ingested, deleted, cleared,
+imported) instead of being rebuilt on every dashboard refresh. Events carry
+the knowledge-base generation; a gap in the sequence, a reconnect, a clear,
+an import or an unfamiliar collection rebuilds them, as does a periodic
+refresh for changes made outside the pdf-processor.
+
+A full scan of chunk metadata, which also counts documents that have no
+record (e.g. collections imported under another name), only runs when
+requested with resync().
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import UPSTREAM_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Seconds between rebuilds from counts and document records (0 = only on startup, gaps and reconnects)
+STATS_RESYNC_INTERVAL = float(os.getenv("STATS_RESYNC_INTERVAL", "300"))
+# Rows per Chroma request while scanning metadata (manual resync only)
+STATS_SCAN_PAGE_SIZE = int(os.getenv("STATS_SCAN_PAGE_SIZE", "1000"))
+STATS_SAMPLE_SIZE = 3
+# The pdf-processor's collection, whose documents the pdf:* records describe
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "pdf_documents")
+
+# Same names as the pdf-processor (index_io.py, main.py)
+KB_GENERATION_KEY = "kb:generation"
+KB_EVENTS_CHANNEL = "kb:events"
+DOCUMENT_KEY_PATTERN = "pdf:*"
+
+
+class CollectionStats:
+    """Serves collection statistics from memory, updated incrementally"""
+
+    def __init__(self, chroma_client_factory: Callable[[], Any], redis_client,
+                 resync_interval: float = None, page_size: int = None):
+        """
+        Initialize collection statistics
+
+        Args:
+            chroma_client_factory: Returns the shared synchronous Chroma client
+            redis_client: Async Redis client (decode_responses=True), for the
+                generation, the document records and the event channel
+            resync_interval: Seconds between rebuilds (0 disables them)
+            page_size: Rows per Chroma request during a full scan
+        """
+        self.chroma_client_factory = chroma_client_factory
+        self.redis_client = redis_client
+        self.resync_interval = STATS_RESYNC_INTERVAL if resync_interval is None else resync_interval
+        self.page_size = page_size or STATS_SCAN_PAGE_SIZE
+        self.collections: Dict[str, Dict[str, Any]] = {}
+        self.generation: Optional[int] = None
+        self.computed_at: Optional[float] = None
+        self.updated_at: Optional[float] = None
+        self.payload: Dict[str, Any] = {}
+        self.etag = ""
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def get(self) -> Tuple[Dict[str, Any], str]:
+        """
+        Current statistics
+
+        Returns:
+            Tuple of (payload, ETag); the first call waits for the initial build
+        """
+        if self.computed_at is None:
+            async with self._lock:
+                if self.computed_at is None:
+                    await self._rebuild()
+        return self.payload, self.etag
+
+    async def refresh(self) -> None:
+        """Rebuild the statistics from counts and document records"""
+        async with self._lock:
+            await self._rebuild()
+
+    async def resync(self) -> Tuple[Dict[str, Any], str]:
+        """
+        Rebuild the statistics with a full scan of every collection's chunk metadata
+
+        Returns:
+            Tuple of (payload, ETag)
+        """
+        async with self._lock:
+            await self._rebuild(full=True)
+        return self.payload, self.etag
+
+    async def _rebuild(self, full: bool = False) -> None:
+        # Read the generation first: events newer than it are applied on top of the rebuild
+        try:
+            generation = int(await self.redis_client.get(KB_GENERATION_KEY) or 0)
+            records = await self._document_records()
+        except Exception as e:
+            logger.warning(f"Failed to read knowledge-base generation or document records: {e}")
+            generation, records = None, {}
+        collections = await asyncio.to_thread(self._read_collections, records, full)
+        self.collections = {entry["name"]: entry for entry in collections}
+        self.generation = generation
+        self.computed_at = time.time()
+        self._changed()
+
+    async def _document_records(self) -> Dict[str, Dict[str, str]]:
+        """The pdf-processor's document records by file ID (one pipelined round trip)"""
+        keys = [key async for key in self.redis_client.scan_iter(DOCUMENT_KEY_PATTERN, count=1000)]
+        if not keys:
+            return {}
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        values = await pipe.execute()
+        return {key.split(":", 1)[1]: record for key, record in zip(keys, values) if record}
+
+    @staticmethod
+    def _document(filename: Optional[str], record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "filename": filename,
+            "status": record.get("status"),
+            "chunks": int(record.get("chunks_count") or 0),
+            "duplicate_chunks": int(record.get("duplicate_chunks") or 0),
+        }
+
+    def _read_collections(self, records: Dict[str, Dict[str, str]], full: bool) -> List[Dict[str, Any]]:
+        """Count and sample every collection (blocking Chroma calls; run in a thread)"""
+        client = self.chroma_client_factory()
+        with UPSTREAM_REQUEST_SECONDS.labels("chroma", "list_collections").time():
+            collections = client.list_collections()
+
+        entries = []
+        for collection in collections:
+            entry = {
+                "name": collection.name,
+                "id": str(collection.id),
+                "metadata": collection.metadata or {},
+                "count": 0,
+                "documents": {},
+                "samples": [],
+            }
+            if collection.name == COLLECTION_NAME:
+                entry["documents"] = {
+                    file_id: self._document(record.get("filename"), record) for file_id, record in records.items()
+                }
+            try:
+                with UPSTREAM_REQUEST_SECONDS.labels("chroma", "count").time():
+                    entry["count"] = collection.count()
+                with UPSTREAM_REQUEST_SECONDS.labels("chroma", "get").time():
+                    samples = collection.get(limit=STATS_SAMPLE_SIZE, include=["documents"])
+                entry["samples"] = [
+                    {"id": chunk_id, "document": document}
+                    for chunk_id, document in zip(samples["ids"], samples["documents"] or [])
+                ]
+                if full:
+                    with UPSTREAM_REQUEST_SECONDS.labels("chroma", "stats_scan").time():
+                        self._scan_documents(collection, entry)
+            except Exception as e:
+                entry["count"] = "Error"
+                entry["error"] = str(e)
+            entries.append(entry)
+        return entries
+
+    def _scan_documents(self, collection, entry: Dict[str, Any]) -> None:
+        """Add documents without a record, counting their stored chunks from metadata"""
+        stored: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        while True:
+            page = collection.get(limit=self.page_size, offset=offset, include=["metadatas"])
+            for metadata in page["metadatas"] or []:
+                file_id = (metadata or {}).get("file_id")
+                if file_id is not None and file_id not in entry["documents"]:
+                    document = stored.setdefault(file_id, {"filename": metadata.get("filename"), "chunks": 0})
+                    document["chunks"] += 1
+            offset += len(page["ids"])
+            if len(page["ids"]) < self.page_size:
+                break
+        entry["documents"].update(stored)
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Apply a knowledge-base event
+
+        Args:
+            event: Event published by the pdf-processor on KB_EVENTS_CHANNEL
+        """
+        async with self._lock:
+            if self.computed_at is None:
+                # The initial build will include the change
+                return
+            generation = event.get("generation")
+            if self.generation is not None and generation is not None and generation <= self.generation:
+                # Already part of the last build
+                return
+            entry = self.collections.get(event.get("collection"))
+            consecutive = self.generation is not None and generation == self.generation + 1
+            if (not consecutive or entry is None or not isinstance(entry["count"], int)
+                    or event.get("type") not in ("ingested", "deleted")):
+                # Missed events, a new collection, or a change too large to patch
+                await self._rebuild()
+                return
+
+            if event["type"] == "ingested":
+                # "chunks" counts the stored vectors; the record fields describe the document
+                entry["documents"][event["file_id"]] = self._document(event.get("filename"), event)
+                entry["count"] += event["chunks"]
+                missing = STATS_SAMPLE_SIZE - len(entry["samples"])
+                if missing > 0:
+                    entry["samples"].extend((event.get("samples") or [])[:missing])
+            else:
+                entry["documents"].pop(event["file_id"], None)
+                entry["count"] -= event.get("deleted", 0)
+                prefix = f"{event['file_id']}_"
+                entry["samples"] = [sample for sample in entry["samples"] if not sample["id"].startswith(prefix)]
+            self.generation = generation
+            self._changed()
+
+    def _changed(self) -> None:
+        """Rebuild the response payload and its ETag once per change"""
+        self.updated_at = time.time()
+        collections = []
+        for entry in self.collections.values():
+            info = {
+                "name": entry["name"],
+                "id": entry["id"],
+                "count": entry["count"],
+                "metadata": entry["metadata"],
+                "sample_documents": [sample["document"] for sample in entry["samples"]],
+                "documents": [
+                    dict(document, file_id=file_id)
+                    for file_id, document in sorted(entry["documents"].items(),
+                                                    key=lambda item: item[1]["filename"] or "")
+                ],
+            }
+            if "error" in entry:
+                info["error"] = entry["error"]
+            collections.append(info)
+        body = {"collections": collections, "generation": self.generation}
+        self.etag = '"' + hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:16] + '"'
+        self.payload = dict(body, computed_at=self.computed_at, updated_at=self.updated_at)
+
+    async def _listen(self) -> None:
+        """Follow KB_EVENTS_CHANNEL, rebuilding after (re)connecting and periodically"""
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                # Subscribe before rebuilding so no event after the rebuild is missed
+                await pubsub.subscribe(KB_EVENTS_CHANNEL)
+                await self.refresh()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        await self.apply(json.loads(message["data"]))
+                    elif self.resync_interval and time.time() - self.computed_at >= self.resync_interval:
+                        await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Collection stats listener failed, reconnecting: {e}")
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
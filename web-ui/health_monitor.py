@@ -0,0 +1,191 @@
+"""
+Background health monitor for the dashboard
+One task probes every backing service concurrently on a fixed schedule and
+keeps the latest result with a short latency history. /api/system-status
+serves that snapshot and /api/system-status/stream pushes it to dashboards
+when a service changes state, so the cost of health checks does not grow
+with the number of open dashboards.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from metrics import SERVICE_UP, UPSTREAM_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "10"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+# Response times kept per service
+HEALTH_HISTORY_SIZE = int(os.getenv("HEALTH_HISTORY_SIZE", "30"))
+
+# A probe returns the service's response (or None) and raises when the service is down
+Probe = Callable[[], Awaitable[Any]]
+
+
+class UnhealthyService(Exception):
+    """The service answered, but reported itself unhealthy"""
+
+
+class HealthMonitor:
+    """Probes services on a schedule and pushes state changes to subscribers"""
+
+    def __init__(self, probes: Dict[str, Probe], interval: float = None, timeout: float = None,
+                 history_size: int = None):
+        """
+        Initialize health monitor
+
+        Args:
+            probes: Service name -> coroutine function checking that service
+            interval: Seconds between check rounds
+            timeout: Seconds a single probe may take before the service counts as down
+            history_size: Number of response times kept per service
+        """
+        self.probes = probes
+        self.interval = interval or HEALTH_CHECK_INTERVAL
+        self.timeout = timeout or HEALTH_CHECK_TIMEOUT
+        self.services: Dict[str, Dict[str, Any]] = {
+            name: {"status": "unknown"} for name in probes
+        }
+        self.history: Dict[str, deque] = {
+            name: deque(maxlen=history_size or HEALTH_HISTORY_SIZE) for name in probes
+        }
+        self.version = 0
+        # Time of the last completed check round (None until the first one)
+        self.last_round: Optional[float] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        # Check rounds started and completed; refresh() waits for one started after it was called
+        self._rounds_started = 0
+        self._rounds_completed = 0
+        self._round_done = asyncio.Condition()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Latest result of every service, with its response-time history"""
+        return {
+            name: dict(state, history=list(self.history[name]))
+            for name, state in self.services.items()
+        }
+
+    async def refresh(self) -> Dict[str, Any]:
+        """
+        Run a check round now instead of waiting for the schedule
+
+        Waits for a round that starts after the call, so a round already in
+        progress (probing before the request) does not count. Concurrent
+        callers share the same round.
+
+        Returns:
+            The snapshot after the round
+        """
+        target = self._rounds_started + 1
+        self._wake.set()
+        try:
+            async with self._round_done:
+                # At most the round in progress plus the requested one
+                await asyncio.wait_for(
+                    self._round_done.wait_for(lambda: self._rounds_completed >= target),
+                    2 * self.timeout + 1
+                )
+        except asyncio.TimeoutError:
+            pass
+        return self.snapshot()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving the snapshot (pre-formatted as JSON) after every change"""
+        # Only the newest snapshot matters, so a slow dashboard never backs up
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    async def _check(self, name: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        state: Dict[str, Any] = {"checked_at": time.time()}
+        try:
+            with UPSTREAM_REQUEST_SECONDS.labels(name, "health").time():
+                response = await asyncio.wait_for(self.probes[name](), self.timeout)
+            state["status"] = "healthy"
+            if response is not None:
+                state["response"] = response
+        except asyncio.TimeoutError:
+            state["status"] = "error"
+            state["error"] = f"No response within {self.timeout:g}s"
+        except Exception as e:
+            state["status"] = "unhealthy" if isinstance(e, UnhealthyService) else "error"
+            state["error"] = str(e)
+        state["response_time"] = round((time.perf_counter() - start) * 1000, 1)
+        return state
+
+    async def check_all(self) -> bool:
+        """
+        Probe every service concurrently and record the results
+
+        Returns:
+            Whether any service changed state
+        """
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._check(name) for name in names))
+        changed = False
+        for name, state in zip(names, results):
+            previous = self.services[name]
+            if previous.get("status") != state["status"] or previous.get("error") != state.get("error"):
+                changed = True
+                state["changed_at"] = state["checked_at"]
+                if previous.get("status") != "unknown":
+                    logger.info(f"{name} is now {state['status']}")
+            else:
+                state["changed_at"] = previous.get("changed_at")
+            self.services[name] = state
+            self.history[name].append(state["response_time"])
+            SERVICE_UP.labels(name).set(1 if state["status"] == "healthy" else 0)
+        self.last_round = time.time()
+        return changed
+
+    def _publish(self) -> None:
+        self.version += 1
+        # Serialized once for all subscribers
+        payload = json.dumps({"version": self.version, "services": self.snapshot()})
+        for queue in list(self.subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before probing: a refresh requested during this round wakes the next one
+            self._wake.clear()
+            self._rounds_started += 1
+            try:
+                if await self.check_all():
+                    self._publish()
+            except Exception as e:
+                logger.error(f"Health check round failed: {e}")
+            self._rounds_completed = self._rounds_started
+            async with self._round_done:
+                self._round_done.notify_all()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
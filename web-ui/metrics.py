@@ -0,0 +1,31 @@
+"""
+Prometheus metrics for the web UI
+"""
+
+from prometheus_client import Gauge, Histogram
+
+# Request latency buckets (seconds) shared by the histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "web_ui_http_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "web_ui_upstream_request_seconds",
+    "Latency of calls from the web UI to backing services",
+    ["service", "endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+CHAT_TTFT_SECONDS = Histogram(
+    "web_ui_chat_time_to_first_token_seconds",
+    "Time from a streaming chat request to the first relayed answer token",
+    buckets=LATENCY_BUCKETS
+)
+SERVICE_UP = Gauge(
+    "web_ui_service_up",
+    "Whether a backing service passed its last health check",
+    ["service"]
+)
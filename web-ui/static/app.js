@@ -122,8 +122,13 @@ class SipstyDashboard {
 
     // Real-time updates
     startRealTimeUpdates() {
-        // System status updates
-        setInterval(() => this.checkSystemStatus(), this.refreshInterval);
+        // System status is pushed by the server when a service changes state;
+        // fall back to polling where Server-Sent Events are unavailable
+        if (window.EventSource) {
+            this.followSystemStatus();
+        } else {
+            setInterval(() => this.checkSystemStatus(), this.refreshInterval);
+        }
         
         // Connection indicator
         this.updateConnectionIndicator();
@@ -141,57 +146,69 @@ class SipstyDashboard {
         }
     }
 
+    // Follow system status over Server-Sent Events (EventSource reconnects on its own)
+    followSystemStatus() {
+        const source = new EventSource('/api/system-status/stream');
+        source.addEventListener('status', (e) => {
+            this.renderSystemStatus(JSON.parse(e.data).services);
+        });
+    }
+
     // System status check
-    async checkSystemStatus() {
+    async checkSystemStatus(refresh = false) {
         try {
-            const response = await fetch('/api/system-status');
-            const status = await response.json();
-            this.systemStatus = status;
-            
-            let healthyCount = 0;
-            let totalCount = Object.keys(status).length;
-            
-            // Count healthy services
-            Object.values(status).forEach(service => {
-                if (service.status === 'healthy') healthyCount++;
-            });
-            
-            // Update status badge
-            const badge = document.getElementById('system-status-badge');
-            if (badge) {
-                const statusText = `${healthyCount}/${totalCount} Services`;
-                const statusClass = healthyCount === totalCount ? 'status-healthy' : 
-                                   healthyCount > 0 ? 'status-warning' : 'status-unhealthy';
-                
-                badge.className = `status-badge ${statusClass}`;
-                badge.innerHTML = `<i class="fas fa-heartbeat me-1"></i><span>${statusText}</span>`;
-            }
-            
-            // Update system status grid
-            this.updateSystemStatusGrid(status);
-            
+            const response = await fetch(`/api/system-status${refresh ? '?refresh=true' : ''}`);
+            this.renderSystemStatus(await response.json());
         } catch (error) {
             console.error('Failed to check system status:', error);
             this.showNotification('System status check failed', 'error');
         }
     }
 
+    // Render system status badge and grid
+    renderSystemStatus(status) {
+        this.systemStatus = status;
+        
+        let healthyCount = 0;
+        let totalCount = Object.keys(status).length;
+        
+        // Count healthy services
+        Object.values(status).forEach(service => {
+            if (service.status === 'healthy') healthyCount++;
+        });
+        
+        // Update status badge
+        const badge = document.getElementById('system-status-badge');
+        if (badge) {
+            const statusText = `${healthyCount}/${totalCount} Services`;
+            const statusClass = healthyCount === totalCount ? 'status-healthy' : 
+                               healthyCount > 0 ? 'status-warning' : 'status-unhealthy';
+            
+            badge.className = `status-badge ${statusClass}`;
+            badge.innerHTML = `<i class="fas fa-heartbeat me-1"></i><span>${statusText}</span>`;
+        }
+        
+        // Update system status grid
+        this.updateSystemStatusGrid(status);
+    }
+
     // Update system status grid
     updateSystemStatusGrid(status) {
         const grid = document.getElementById('system-status-grid');
         if (!grid) return;
 
         const services = [
-            { key: 'rasa', name: 'Rasa Server', icon: 'fas fa-robot', port: '5005' },
-            { key: 'pdf_processor', name: 'PDF Processor', icon: 'fas fa-file-pdf', port: '8000' },
-            { key: 'chromadb', name: 'ChromaDB', icon: 'fas fa-database', port: '8003' },
+            { key: 'rasa_server', name: 'Rasa Server', icon: 'fas fa-robot', port: '5005' },
+            { key: 'pdf_processor', name: 'PDF Processor', icon: 'fas fa-file-pdf', port: '8001' },
+            { key: 'chroma_db', name: 'ChromaDB', icon: 'fas fa-database', port: '8000' },
             { key: 'redis', name: 'Redis Cache', icon: 'fas fa-memory', port: '6379' },
             { key: 'action_server', name: 'Action Server', icon: 'fas fa-cogs', port: '5055' },
             { key: 'web_ui', name: 'Web UI', icon: 'fas fa-globe', port: '8002' }
         ];
 
         grid.innerHTML = services.map(service => {
-            const serviceStatus = status[service.key] || { status: 'unknown' };
+            // The web UI itself is up if it is serving this page
+            const serviceStatus = status[service.key] || { status: service.key === 'web_ui' ? 'healthy' : 'unknown' };
             const statusClass = serviceStatus.status === 'healthy' ? 'status-healthy' : 
                                serviceStatus.status === 'error' ? 'status-unhealthy' : 'status-unknown';
             
@@ -294,6 +311,10 @@ class SipstyDashboard {
         progressContainer.style.display = 'block';
         resultsContainer.innerHTML = '';
 
+        // Files uploaded together share a batch so their ingestion can be followed on one stream
+        const batchId = `batch-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
+        let uploaded = 0;
+
         for (let i = 0; i < files.length; i++) {
             const file = files[i];
             
@@ -332,18 +353,23 @@ class SipstyDashboard {
                     xhr.onerror = () => reject(new Error('Upload failed'));
                 });
 
-                xhr.open('POST', '/api/upload-pdf');
+                xhr.open('POST', `/api/upload?batch_id=${encodeURIComponent(batchId)}`);
                 xhr.send(formData);
 
                 const result = await uploadPromise;
+                uploaded++;
                 
-                resultsContainer.innerHTML += `
-                    <div class="alert alert-success alert-dismissible fade show">
-                        <i class="fas fa-check-circle me-2"></i>
-                        <strong>${file.name}</strong> uploaded successfully!
-                        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                resultsContainer.insertAdjacentHTML('beforeend', `
+                    <div class="alert alert-info fade show" id="ingest-${result.file_id}">
+                        <div class="d-flex justify-content-between">
+                            <span><i class="fas fa-cog fa-spin me-2"></i><strong>${file.name}</strong></span>
+                            <span class="ingest-stage small">queued</span>
+                        </div>
+                        <div class="progress mt-2" style="height: 6px;">
+                            <div class="progress-bar ingest-bar" style="width: 0%"></div>
+                        </div>
                     </div>
-                `;
+                `);
 
                 this.showNotification(`${file.name} uploaded successfully!`, 'success');
 
@@ -361,9 +387,53 @@ class SipstyDashboard {
         }
 
         progressContainer.style.display = 'none';
+        if (uploaded > 0) {
+            this.followIngestion(batchId, uploaded);
+        }
         await this.loadDocuments();
     }
 
+    // Follow ingestion progress of an upload batch over Server-Sent Events
+    followIngestion(batchId, expected) {
+        const source = new EventSource(`/api/progress/batch/${encodeURIComponent(batchId)}?expected=${expected}`);
+
+        source.addEventListener('progress', (e) => {
+            const event = JSON.parse(e.data);
+            const item = document.getElementById(`ingest-${event.file_id}`);
+            if (!item) return;
+
+            const percent = Math.round((event.progress || 0) * 100);
+            item.querySelector('.ingest-bar').style.width = percent + '%';
+
+            let detail = event.stage;
+            if (event.stage === 'extracting' && event.pages_total) {
+                detail = `extracting page ${event.pages_done}/${event.pages_total}`;
+            } else if (event.stage === 'embedding' && event.chunks_total) {
+                detail = `embedding ${event.chunks_embedded}/${event.chunks_total} chunks`;
+            } else if (event.stage === 'storing' && event.chunks_total) {
+                detail = `storing ${event.chunks_stored}/${event.chunks_total} chunks`;
+            }
+            item.querySelector('.ingest-stage').textContent = detail;
+
+            if (event.stage === 'completed' || event.stage === 'failed') {
+                const ok = event.stage === 'completed';
+                item.className = `alert ${ok ? 'alert-success' : 'alert-danger'} fade show`;
+                item.querySelector('.fa-cog').className = `fas ${ok ? 'fa-check-circle' : 'fa-exclamation-circle'} me-2`;
+                if (!ok) {
+                    item.querySelector('.ingest-stage').textContent = `failed: ${event.error || 'unknown error'}`;
+                }
+                this.showNotification(
+                    `${event.filename} ${ok ? 'processed successfully' : 'failed to process'}`,
+                    ok ? 'success' : 'error'
+                );
+                this.loadDocuments();
+            }
+        });
+
+        // Sent once every file in the batch has finished; closing prevents EventSource reconnecting
+        source.addEventListener('end', () => source.close());
+    }
+
     // Enhanced search functionality
     async performSearch() {
         const query = document.getElementById('searchQuery')?.value.trim();
@@ -532,28 +602,47 @@ class SipstyDashboard {
             // Show typing indicator
             this.addTypingIndicator();
 
-            const response = await fetch('/api/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    message: message,
-                    language: detectedLanguage
-                })
+            // Answer tokens are streamed as the LLM produces them; the final
+            // Rasa message replaces the partial text when the turn completes
+            const response = await fetch(`/api/chat/stream?message=${encodeURIComponent(message)}`, {
+                method: 'POST'
             });
+            if (!response.ok) {
+                throw new Error(`Chat failed: ${response.status}`);
+            }
 
-            const data = await response.json();
-            
-            // Remove typing indicator
+            let streamed = null;
+            let partial = '';
+            await this.readEventStream(response, (event, data) => {
+                if (event === 'delta') {
+                    if (!streamed) {
+                        this.removeTypingIndicator();
+                        streamed = this.addChatMessage('', 'bot');
+                    }
+                    partial += data.text;
+                    streamed.innerHTML = this.formatChatMessage(partial);
+                    streamed.parentNode.scrollTop = streamed.parentNode.scrollHeight;
+                } else if (event === 'reset' && streamed) {
+                    partial = '';
+                    streamed.innerHTML = '';
+                } else if (event === 'message') {
+                    this.removeTypingIndicator();
+                    const texts = data.responses.filter(r => r.text).map(r => r.text);
+                    texts.forEach((text, i) => {
+                        if (i === 0 && streamed) {
+                            streamed.innerHTML = this.formatChatMessage(text);
+                            this.chatHistory[this.chatHistory.length - 1].message = text;
+                        } else {
+                            this.addChatMessage(text, 'bot');
+                        }
+                        this.messagesCount++;
+                    });
+                    this.updateChatStats();
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+            });
             this.removeTypingIndicator();
-            
-            // Add bot response
-            if (data.response) {
-                this.addChatMessage(data.response, 'bot');
-                this.messagesCount++;
-                this.updateChatStats();
-            }
 
         } catch (error) {
             console.error('Chat error:', error);
@@ -563,6 +652,33 @@ class SipstyDashboard {
         }
     }
 
+    // Read a Server-Sent Event stream from a fetch response (EventSource cannot POST)
+    async readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     // Add chat message
     addChatMessage(message, sender) {
         const messagesContainer = document.getElementById('chat-messages');
@@ -583,6 +699,7 @@ class SipstyDashboard {
         
         // Store in chat history
         this.chatHistory.push({ message, sender, timestamp: new Date() });
+        return messageElement;
     }
 
     // Format chat message with markdown-like formatting
@@ -751,7 +868,7 @@ class SipstyDashboard {
 
     // Additional methods for enhanced functionality
     async refreshSystemStatus() {
-        await this.checkSystemStatus();
+        await this.checkSystemStatus(true);
         this.showNotification('System status refreshed', 'info');
     }
 